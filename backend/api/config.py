@@ -0,0 +1,173 @@
+# api/config.py
+import os
+
+
+def _env_int(name, default):
+    """Read an integer setting from the environment"""
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"Warning: Invalid integer for {name}: {value!r}, using {default}")
+        return default
+
+def _env_float(name, default):
+    """Read a float setting from the environment"""
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"Warning: Invalid number for {name}: {value!r}, using {default}")
+        return default
+
+
+def _env_int_list(name, default):
+    """Read a comma-separated list of integers from the environment"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        print(f"Warning: Invalid integer list for {name}: {value!r}, using {default}")
+        return default
+
+
+# MediaPipe FaceMesh pooling
+# Number of static_image_mode=True graphs shared by the one-shot endpoints
+# (/single-tryon, /tryon, /measurements, /calibrate-glasses, /debug-measurements)
+FACE_MESH_STATIC_POOL_SIZE = _env_int("TRYON_FACE_MESH_POOL_SIZE", 4)
+# Maximum number of concurrent /websocket-tryon sessions holding a tracking graph
+FACE_MESH_MAX_SESSIONS = _env_int("TRYON_FACE_MESH_MAX_SESSIONS", 64)
+
+# Inference executor (CPU-bound CV work runs here, never on the event loop)
+# "thread", "process" (stateless one-shot jobs only) or "workers" (inference
+# worker processes holding their own models, frames handed over in shared memory)
+EXECUTOR_KIND = os.environ.get("TRYON_EXECUTOR_KIND", "thread").lower()
+# Worker count; 0 means one per CPU core
+EXECUTOR_WORKERS = _env_int("TRYON_EXECUTOR_WORKERS", 0)
+# Jobs allowed to wait for a worker before new ones are rejected
+EXECUTOR_MAX_QUEUE = _env_int("TRYON_EXECUTOR_MAX_QUEUE", 32)
+# Shared-memory frame buffers per inference worker (frames in flight to it at once)
+WORKER_FRAME_SLOTS = _env_int("TRYON_WORKER_FRAME_SLOTS", 4)
+# Size of one frame buffer; larger decoded frames are pickled instead (1080p BGR is ~6 MB)
+WORKER_FRAME_SLOT_BYTES = _env_int("TRYON_WORKER_FRAME_SLOT_MB", 8) * 1024 * 1024
+# How long start-up waits for a worker to load and warm up its models
+WORKER_START_TIMEOUT_SECONDS = _env_float("TRYON_WORKER_START_TIMEOUT", 300.0)
+
+# Backend directory (model paths below do not depend on the working directory)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# YOLO weights; ultralytics downloads the default yolov8n.pt there when it is missing
+YOLO_MODEL_PATH = os.environ.get("TRYON_YOLO_MODEL") or os.path.join(BACKEND_DIR, "yolov8n.pt")
+
+# YOLO backend: "ultralytics" (PyTorch) or "onnx" (ONNX Runtime on CPU, pip install -r requirements-onnx.txt)
+DETECTOR_BACKEND = os.environ.get("TRYON_DETECTOR_BACKEND", "ultralytics").lower()
+# Exported model for the onnx backend (yolo export model=yolov8n.pt format=onnx imgsz=320)
+ONNX_MODEL_PATH = os.environ.get("TRYON_ONNX_MODEL") or os.path.join(BACKEND_DIR, "yolov8n.onnx")
+# Dynamically quantize the ONNX model's weights to int8 (the copy is cached next to the model)
+ONNX_INT8_ENABLED = _env_int("TRYON_ONNX_INT8", 0) != 0
+# ONNX Runtime intra-op threads; 0 lets ONNX Runtime pick (one per core)
+ONNX_INTRA_OP_THREADS = _env_int("TRYON_ONNX_THREADS", 0)
+
+# YOLO inference profile for face validation
+# COCO class ids to keep (0 = person); the other 79 classes are never used
+YOLO_CLASSES = _env_int_list("TRYON_YOLO_CLASSES", [0])
+YOLO_IMGSZ = _env_int("TRYON_YOLO_IMGSZ", 320)
+YOLO_CONF = _env_float("TRYON_YOLO_CONF", 0.25)
+YOLO_IOU = _env_float("TRYON_YOLO_IOU", 0.45)
+YOLO_MAX_DET = _env_int("TRYON_YOLO_MAX_DET", 5)
+
+# Face validation stage (/single-tryon, /tryon, /debug-measurements): a second
+# detector confirming the FaceMesh face. "mediapipe" runs the short-range face
+# detector (an actual face box and score); "yolo" keeps the YOLO person box
+FACE_VALIDATION_BACKEND = os.environ.get("TRYON_FACE_VALIDATION", "mediapipe").lower()
+# Longest side frames are downscaled to before face detection (the model itself runs at 128x128)
+FACE_DETECTOR_INPUT_SIZE = _env_int("TRYON_FACE_DETECTOR_SIZE", 256)
+FACE_DETECTOR_MIN_CONFIDENCE = _env_float("TRYON_FACE_DETECTOR_CONF", 0.5)
+# Face detector graphs shared by the endpoints (created lazily, like the FaceMesh pool)
+FACE_DETECTOR_POOL_SIZE = _env_int("TRYON_FACE_DETECTOR_POOL_SIZE", 4)
+
+# Accessory image store
+# Upper bound on decoded RGBA accessory pixels kept in memory
+ACCESSORY_CACHE_MAX_BYTES = _env_int("TRYON_ACCESSORY_CACHE_MB", 64) * 1024 * 1024
+# Longest side of a decoded accessory; larger source PNGs are downscaled once
+# at load time (sprites are drawn a few hundred pixels wide at most)
+ACCESSORY_MAX_DIMENSION = _env_int("TRYON_ACCESSORY_MAX_DIMENSION", 1024)
+# How often a cached accessory's file mtime is re-checked
+ACCESSORY_STAT_INTERVAL_SECONDS = _env_float("TRYON_ACCESSORY_STAT_INTERVAL", 2.0)
+
+# Transformed accessory sprite cache (streaming tiers)
+SPRITE_CACHE_MAX_ENTRIES = _env_int("TRYON_SPRITE_CACHE_ENTRIES", 256)
+# Sprite width/height are rounded to this many pixels
+SPRITE_SIZE_STEP_PIXELS = _env_int("TRYON_SPRITE_SIZE_STEP", 2)
+# Head roll is bucketed to this many degrees
+SPRITE_ROLL_STEP_DEGREES = _env_float("TRYON_SPRITE_ROLL_STEP", 1.0)
+
+# /websocket-tryon frame ingestion
+# Frames that waited longer than this (ms since the server received them) are
+# dropped instead of processed; 0 disables the deadline
+WS_FRAME_DEADLINE_MS = _env_int("TRYON_WS_FRAME_DEADLINE_MS", 500)
+
+# Cross-request YOLO micro-batching
+# Frames from concurrent requests are collected into one batched YOLO call of
+# up to this many images; 1 disables batching (one call per frame).
+# Only used with TRYON_FACE_VALIDATION=yolo: the default "mediapipe" face
+# validation runs no YOLO at all, so the batcher then stays idle
+YOLO_BATCH_MAX_SIZE = _env_int("TRYON_YOLO_BATCH_SIZE", 8)
+# How long the first frame of a batch waits for others to join
+YOLO_BATCH_MAX_WAIT_MS = _env_float("TRYON_YOLO_BATCH_WAIT_MS", 4.0)
+
+# Realtime landmark tracking: full FaceMesh only on keyframes, Lucas-Kanade
+# optical flow for the measurement landmarks in between (0 disables)
+LANDMARK_TRACKING_ENABLED = _env_int("TRYON_LANDMARK_TRACKING", 1) != 0
+# Longest run of tracked frames between two keyframes (cadence adapts below it)
+TRACKING_MAX_KEYFRAME_INTERVAL = _env_int("TRYON_TRACKING_MAX_INTERVAL", 6)
+# Per-frame landmark motion, as a fraction of face width, above which keyframes get more frequent
+TRACKING_MOTION_THRESHOLD = _env_float("TRYON_TRACKING_MOTION_THRESHOLD", 0.03)
+# Forward-backward flow error (pixels) above which a landmark counts as lost
+TRACKING_MAX_FB_ERROR = _env_float("TRYON_TRACKING_MAX_FB_ERROR", 1.5)
+
+# Region-of-interest cropping around the previous frame's face
+# (realtime sessions, and /tryon requests that send a session_id); 0 disables
+ROI_CROP_ENABLED = _env_int("TRYON_ROI_CROP", 1) != 0
+# Crop side relative to the landmark bounding box of the last detection
+ROI_EXPAND = _env_float("TRYON_ROI_EXPAND", 1.8)
+# Crops covering more than this fraction of the frame area use the full frame instead
+ROI_MAX_COVERAGE = _env_float("TRYON_ROI_MAX_COVERAGE", 0.6)
+
+# Per-session state (face ROI, adaptive encoding) for /tryon clients that send a session_id;
+# sessions without a frame for this long are forgotten
+SESSION_TTL_SECONDS = _env_float("TRYON_SESSION_TTL", 30.0)
+MAX_TRACKED_SESSIONS = _env_int("TRYON_MAX_SESSIONS", 1024)
+
+# Reduced-resolution JPEG decode (1/2, 1/4, 1/8 scale in libjpeg) for streaming
+# frames whose full-resolution pixels are never composited (transform mode); 0 disables
+REDUCED_DECODE_ENABLED = _env_int("TRYON_REDUCED_DECODE", 1) != 0
+
+# Adaptive JPEG quality / output size per stream (realtime sessions, and /tryon
+# requests that send a session_id); 0 always encodes at the tier's fixed quality
+ADAPTIVE_QUALITY_ENABLED = _env_int("TRYON_ADAPTIVE_QUALITY", 1) != 0
+JPEG_QUALITY_MIN = _env_int("TRYON_JPEG_QUALITY_MIN", 35)
+JPEG_QUALITY_MAX = _env_int("TRYON_JPEG_QUALITY_MAX", 85)
+# Smallest output size, as a fraction of the client's frame size
+OUTPUT_SCALE_MIN = _env_float("TRYON_OUTPUT_SCALE_MIN", 0.5)
+# Latency (frame received to response sent, or client-reported round trip) each tier aims for
+REALTIME_TARGET_LATENCY_MS = _env_int("TRYON_REALTIME_TARGET_LATENCY_MS", 150)
+HIGH_ACCURACY_TARGET_LATENCY_MS = _env_int("TRYON_HIGH_ACCURACY_TARGET_LATENCY_MS", 300)
+
+# Processing size (longer side, pixels) of each tier
+SINGLE_IMAGE_TARGET_SIZE = 640
+REALTIME_TARGET_SIZE = 256
+HIGH_ACCURACY_TARGET_SIZE = 320
+
+# Model loading at startup: every model is loaded in the application lifespan
+# and, unless disabled, run on a blank frame at each tier's processing size so
+# the first request does not pay for graph initialization; /ready reports progress
+MODEL_WARMUP_ENABLED = _env_int("TRYON_MODEL_WARMUP", 1) != 0
+# Warm-up inferences per model and tier size
+MODEL_WARMUP_RUNS = _env_int("TRYON_MODEL_WARMUP_RUNS", 1)
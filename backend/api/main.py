@@ -1,9 +1,36 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from api.routes.tryon import router as tryon_router
+from api.routes.metrics import router as metrics_router
+from api.routes.health import router as health_router
+from api.services.inference_executor import inference_executor
+from api.services.metrics import monitor_event_loop_lag
+from api.services.model_registry import model_registry
+from api.services.yolo_service import yolo_batcher
 
-app = FastAPI(title="AR Try-On API", version="1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Samples event-loop lag for /metrics; a blocked loop shows up as a lagging wake-up
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+    if inference_executor.kind == "workers":
+        # The models live in the inference worker processes; readiness is their start-up
+        model_registry.clear()
+        model_registry.register("inference_workers", inference_executor.start_workers)
+    # Load and warm up every model off the event loop; /ready turns 200 once they are warm
+    model_loading = asyncio.create_task(asyncio.to_thread(model_registry.load_all))
+    yield
+    lag_monitor.cancel()
+    if not model_loading.done():
+        # The loading thread cannot be interrupted; let it finish before the pools shut down
+        await asyncio.wait([model_loading])
+    # Stop the CV worker pools so uvicorn reloads don't leak threads/processes
+    inference_executor.shutdown()
+    yolo_batcher.shutdown()
+
+app = FastAPI(title="AR Try-On API", version="1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,3 +42,5 @@ app.add_middleware(
 
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 app.include_router(tryon_router)
+app.include_router(metrics_router)
+app.include_router(health_router)
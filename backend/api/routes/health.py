@@ -0,0 +1,14 @@
+# api/routes/health.py
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from api.services.model_registry import model_registry
+
+router = APIRouter()
+
+
+@router.get("/ready")
+async def ready():
+    """Readiness probe: 200 once every model is loaded and warmed up, 503 until then (or if one failed)"""
+    stats = model_registry.stats()
+    return JSONResponse(status_code=200 if stats["ready"] else 503, content=stats)
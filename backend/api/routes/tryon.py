@@ -4,30 +4,58 @@ from fastapi.responses import JSONResponse
 import base64, numpy as np, cv2, os
 import asyncio
 import json
+import time
 from api.services.mediapipe_service import (
     detect_face_landmarks_from_array, 
     get_facial_measurements, 
+    landmarks_to_pixels,
     calculate_product_dimensions,
+    face_mesh_manager,
     FACIAL_LANDMARKS
 )
-from api.services.yolo_service import (
-    detect_objects_yolo,
-    detect_face_yolo,
-    enhance_face_detection_with_yolo
+from api.services.yolo_service import yolo_batcher
+from api.services.face_validation import validate_face, enhance_face_detection, face_validation_stats
+from api.services.accessory_store import accessory_store
+from api.services.landmark_tracker import LandmarkTracker
+from api.services.face_roi import roi_registry, roi_from_landmarks, detect_face_landmarks_in_roi
+from api.services.stream_quality import StreamQualityController, quality_registry
+from api.services.inference_executor import inference_executor, InferenceQueueFull
+from api.services.model_registry import model_registry
+from api.services.metrics import (
+    StageTimer,
+    record_stage_timings,
+    REQUEST_LATENCY,
+    REQUESTS_TOTAL,
+    FRAMES_DROPPED,
+    WEBSOCKET_SESSIONS,
+    WEBSOCKET_SESSIONS_TOTAL,
+    LANDMARK_FRAMES
+)
+from api.utils.sprite_cache import sprite_cache
+from api.utils import ws_protocol
+from api.utils.frame_slot import LatestFrameSlot
+from api.utils.image_decode import decode_image, DecodedFrame
+from api.config import (
+    WS_FRAME_DEADLINE_MS,
+    REALTIME_TARGET_LATENCY_MS,
+    HIGH_ACCURACY_TARGET_LATENCY_MS,
+    SINGLE_IMAGE_TARGET_SIZE,
+    REALTIME_TARGET_SIZE,
+    HIGH_ACCURACY_TARGET_SIZE,
+    DETECTOR_BACKEND
 )
 from api.utils.file_utils import (
     place_accessory_on_face, 
     place_accessory_on_face_cached,
     place_product_with_measurements,
+    serialize_placement_info,
+    placement_region,
+    compute_placement_transform,
     draw_measurement_overlay
 )
 
 router = APIRouter()
 
-# Cache the glasses accessory to avoid repeated file reads
-_glasses_cache = None
-_glasses_path = "accessories/glasses.png"
-
 # Product database with accurate dimensions
 PRODUCT_DATABASE = {
     'glasses': {
@@ -98,6 +126,120 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+# "image": server composites and returns the JPEG; "transform": server returns
+# only where to draw the product and the client composites the sprite itself;
+# "patch": server composites and returns only the region it drew on
+RESPONSE_MODES = ("image", "transform", "patch")
+PATCH_FORMATS = ("jpeg", "png")
+# Modes that encode pixels (and so use the stream's adaptive quality)
+ENCODED_RESPONSE_MODES = ("image", "patch")
+
+def _transform_response(facial_measurements, product_type, product_id, product_dimensions,
+                        frame_shape, original_w, original_h):
+    """Response body for response_mode="transform", in the client's (original) frame coordinates"""
+    transform = None
+    if facial_measurements and not facial_measurements.get('detector_only'):
+        transform = compute_placement_transform(
+            facial_measurements, product_type, product_dimensions, frame_shape,
+            scale=original_w / frame_shape[1]
+        )
+    
+    response = {
+        "response_mode": "transform",
+        "product_type": product_type,
+        "product_id": product_id,
+        "frame_size": (original_w, original_h),
+        "product_applied": transform is not None,
+        "transform": transform
+    }
+    if transform is not None:
+        response["facial_measurements"] = {
+            "ipd_mm": round(facial_measurements.get('estimated_ipd_mm', 0), 1),
+            "face_width_mm": round(facial_measurements.get('face_width_mm', 0), 1),
+            "head_yaw_degrees": round(facial_measurements.get('head_yaw_degrees', 0), 1),
+            "head_roll_degrees": round(facial_measurements.get('head_roll_degrees', 0), 1)
+        }
+    return response
+
+def _encode_patch(frame, placement_info, jpeg_quality, patch_format="jpeg"):
+    """
+    Encode only the rectangle the accessory was drawn on (response_mode="patch").
+    Returns (encoded buffer, (x, y, width, height)), or (None, None) when nothing was drawn.
+    """
+    region = placement_region(placement_info, frame.shape)
+    if region is None:
+        return None, None
+    x, y, w, h = region
+    patch = frame[y:y + h, x:x + w]
+    if patch_format == "png":
+        _, buf = cv2.imencode(".png", patch, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    else:
+        _, buf = cv2.imencode(".jpg", patch, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    return buf, region
+
+def _patch_response(buf, region, patch_format, product_type, product_id, original_w, original_h):
+    """Response body for response_mode="patch": the encoded region and where to paste it in the client's frame"""
+    return {
+        "response_mode": "patch",
+        "product_type": product_type,
+        "product_id": product_id,
+        "frame_size": (original_w, original_h),
+        "product_applied": region is not None,
+        "patch_format": patch_format,
+        "patch": dict(zip(("x", "y", "width", "height"), region)) if region is not None else None,
+        "patch_base64": base64.b64encode(buf).decode("utf-8") if buf is not None else None
+    }
+
+def _source_measurements(landmarks_3d, frame_shape):
+    """
+    Facial measurements in full-resolution coordinates. Detection runs on the
+    downscaled frame, but its landmarks are normalized, so the product is
+    composited straight onto the original frame and no upscale pass is needed.
+    """
+    return get_facial_measurements(
+        landmarks_to_pixels(landmarks_3d, frame_shape), landmarks_3d, frame_shape
+    )
+
+def _measurement_shape(source_frame, original_w, original_h, response_mode):
+    """
+    Frame shape the measurements are taken in. Transform mode decodes at
+    reduced scale but measures in the client's frame, so its placement is
+    sized and quantized exactly as the drawing modes would at full resolution.
+    """
+    if response_mode == "transform":
+        return (original_h, original_w) + source_frame.shape[2:]
+    return source_frame.shape
+
+def _scale_bbox(bbox, factor):
+    """Processing-frame bounding box in original frame pixels"""
+    return [int(value * factor) for value in bbox]
+
+def _add_face_validation(facial_measurements, enhanced_detection, frame_scale):
+    """Record the face-validation outcome in the measurements (box in original frame pixels)"""
+    facial_measurements['face_validation'] = enhanced_detection['validation_face_detected']
+    facial_measurements['face_validation_backend'] = enhanced_detection['validation_backend']
+    if enhanced_detection['validation_face_detected']:
+        facial_measurements['face_validation_bbox'] = _scale_bbox(enhanced_detection['validation_face_bbox'], frame_scale)
+        facial_measurements['face_validation_score'] = enhanced_detection['validation_face_score']
+
+def _add_decode_time(stages, data):
+    """Frames decoded in the API process for the inference workers charge that time to the decode stage"""
+    if isinstance(data, DecodedFrame):
+        stages["decode"] = stages.get("decode", 0.0) + data.decode_seconds
+
+def _scale_output(frame, output_scale):
+    """Shrink the composited frame before encoding when a stream's controller asks for a smaller output"""
+    if output_scale >= 1.0:
+        return frame
+    h, w = frame.shape[:2]
+    return cv2.resize(frame, (max(1, int(w * output_scale)), max(1, int(h * output_scale))),
+                      interpolation=cv2.INTER_AREA)
+
+def _observe_request(tier, started, status):
+    """Record end-to-end latency and outcome of one request/frame"""
+    REQUEST_LATENCY.observe(time.perf_counter() - started, tier=tier)
+    REQUESTS_TOTAL.inc(tier=tier, status=status)
+
 def get_hat_accessory(product_id="product_4"):
     """Get hat accessory image based on product ID"""
     # Map product IDs to their image files
@@ -105,29 +247,14 @@ def get_hat_accessory(product_id="product_4"):
         'product_4': 'hat.png'  # Updated Hat image
     }
     
-    image_file = product_images.get(product_id, 'hat.png')  # Default fallback
-    image_path = f"accessories/{image_file}"
+    if product_id not in product_images:
+        product_id = 'product_4'  # Default fallback
+    image_path = f"accessories/{product_images[product_id]}"
     
-    if os.path.exists(image_path):
-        hat_image = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
-        if hat_image is not None:
-            print(f"DEBUG: Hat image loaded successfully - Shape: {hat_image.shape}, Channels: {hat_image.shape[2] if len(hat_image.shape) > 2 else 'Grayscale'}")
-            # Check if the hat has alpha channel
-            if len(hat_image.shape) == 3 and hat_image.shape[2] == 4:
-                print(f"DEBUG: Hat has alpha channel - RGBA format")
-            else:
-                print(f"DEBUG: WARNING - Hat may not have alpha channel")
-        else:
-            print(f"DEBUG: ERROR - Failed to load hat image from {image_path}")
-        return hat_image
-    else:
-        print(f"Warning: Hat image file not found: {image_path}")
-        return None
+    return accessory_store.get(product_id, image_path)
 
 def get_glasses_accessory(product_id="product_1"):
-    """Get cached glasses accessory or load from file based on product ID"""
-    global _glasses_cache
-    
+    """Get cached glasses accessory (decoded once by the accessory store) based on product ID"""
     # Map product IDs to their image files
     product_images = {
         'product_1': 'glasses.png',           # Classic Aviator
@@ -135,30 +262,37 @@ def get_glasses_accessory(product_id="product_1"):
         'product_3': 'winter-sport-glasses.png' # Winter Sport Glasses (fixed filename)
     }
     
-    image_file = product_images.get(product_id, 'glasses.png')  # Default fallback
-    image_path = f"accessories/{image_file}"
+    if product_id not in product_images:
+        product_id = 'product_1'  # Default fallback
+    image_path = f"accessories/{product_images[product_id]}"
     
-    if os.path.exists(image_path):
-        return cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
-    else:
-        print(f"Warning: Image file not found: {image_path}")
+    glasses_image = accessory_store.get(product_id, image_path)
+    if glasses_image is None and product_id != 'product_1':
         # Fallback to default glasses image
-        fallback_path = "accessories/glasses.png"
-        if os.path.exists(fallback_path):
-            return cv2.imread(fallback_path, cv2.IMREAD_UNCHANGED)
-        return None
+        glasses_image = accessory_store.get('product_1', "accessories/glasses.png")
+    return glasses_image
 
 @router.get("/debug")
 async def debug_info():
     """Debug endpoint to check system status"""
     return {
         "yolo_available": True,  # Full version
+        "detector_backend": DETECTOR_BACKEND,
+        "face_validation": face_validation_stats(),
         "accessories_exist": {
             "glasses": os.path.exists("accessories/glasses.png")
         },
         "current_dir": os.getcwd(),
         "numpy_version": np.__version__,
         "active_requests": len(_active_requests),
+        "face_mesh_pool": face_mesh_manager.stats(),
+        "inference_executor": inference_executor.stats(),
+        "accessory_store": accessory_store.stats(),
+        "sprite_cache": sprite_cache.stats(),
+        "yolo_batcher": yolo_batcher.stats(),
+        "roi_sessions": roi_registry.stats(),
+        "quality_sessions": quality_registry.stats(),
+        "models": model_registry.stats(),
         "product_database": list(PRODUCT_DATABASE.keys()),
         "status": "three_tier_tryon_system_ready",
         "endpoints": {
@@ -199,6 +333,147 @@ async def get_products():
         "total_products": sum(len(products) for products in PRODUCT_DATABASE.values())
     }
 
+def _process_single_image(data, product_type, product_id, show_measurements):
+    """
+    CPU-bound part of /single-tryon, run on the inference executor.
+    Returns (response_data, stage timings), or None for an undecodable image.
+    """
+    timer = StageTimer()
+    frame, _ = decode_image(data)
+    if frame is None:
+        return None
+    timer.lap("decode")
+
+    # Full-resolution frame: detection runs on a downscaled copy, the product is drawn here
+    source_frame = frame
+    original_h, original_w = frame.shape[:2]
+    
+    # HIGH QUALITY: Larger image size for maximum accuracy
+    target_size = SINGLE_IMAGE_TARGET_SIZE  # Increased for maximum quality
+    if original_w > target_size or original_h > target_size:
+        scale = min(target_size/original_w, target_size/original_h)
+        new_w, new_h = int(original_w * scale), int(original_h * scale)
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_CUBIC)
+    frame_scale = original_w / frame.shape[1]
+    timer.lap("resize")
+
+    # COMPREHENSIVE: MediaPipe landmarks confirmed by the face-validation detector
+    facial_measurements = None
+    product_dimensions = None
+    placement_info = None
+    
+    try:
+        print(f"SINGLE IMAGE: Starting comprehensive face detection with MediaPipe + face validation")
+        
+        # Get facial landmarks with 3D data (MediaPipe)
+        landmarks_2d, landmarks_3d = detect_face_landmarks_from_array(frame)
+        timer.lap("mediapipe")
+        
+        # Face validation (face detector or YOLO, see TRYON_FACE_VALIDATION)
+        validation = validate_face(frame)
+        
+        # Enhance detection with combined approach
+        enhanced_detection = enhance_face_detection(landmarks_2d, validation)
+        timer.lap("face_validation")
+        
+        if landmarks_2d is not None and landmarks_3d is not None:
+            print(f"SINGLE IMAGE: Found {len(landmarks_2d)} MediaPipe landmarks")
+            # Calculate comprehensive facial measurements (original frame coordinates)
+            facial_measurements = _source_measurements(landmarks_3d, source_frame.shape)
+            
+            if facial_measurements:
+                print(f"SINGLE IMAGE: Facial measurements calculated successfully")
+                
+                # Add face validation to measurements
+                _add_face_validation(facial_measurements, enhanced_detection, frame_scale)
+                if enhanced_detection['validation_face_detected']:
+                    print(f"SINGLE IMAGE: Face validation successful ({validation.backend})")
+                else:
+                    print(f"SINGLE IMAGE: Face validation failed ({validation.backend}) - using MediaPipe only")
+                
+                # Get product dimensions from database
+                print(f"SINGLE IMAGE: Looking up product - type: {product_type}, id: {product_id}")
+                if product_type in PRODUCT_DATABASE and product_id in PRODUCT_DATABASE[product_type]:
+                    product_dimensions = PRODUCT_DATABASE[product_type][product_id]
+                    print(f"SINGLE IMAGE: Found product dimensions: {product_dimensions}")
+                else:
+                    print(f"SINGLE IMAGE: Product not found in database, calculating generic dimensions")
+                    product_dimensions = calculate_product_dimensions(product_type, facial_measurements)
+                    
+    except Exception as e:
+        print(f"SINGLE IMAGE: Enhanced detection error: {e}")
+        facial_measurements = None
+    timer.lap("measurements")
+
+    # HIGH QUALITY: Accurate Product Placement
+    product_applied = False
+    try:
+        if product_type == 'glasses':
+            glasses_accessory = get_glasses_accessory(product_id)
+            
+            if glasses_accessory is not None and facial_measurements:
+                source_frame, placement_info = place_product_with_measurements(
+                    source_frame, glasses_accessory, facial_measurements, 
+                    product_type, product_dimensions
+                )
+                product_applied = True
+                
+        elif product_type == 'hat':
+            # For hats, load hat accessories
+            hat_accessory = get_hat_accessory(product_id)
+            if hat_accessory is not None and facial_measurements:
+                print(f"SINGLE IMAGE: Hat accessory loaded for {product_id}")
+                # Actually place the hat using the same placement function as glasses
+                source_frame, placement_info = place_product_with_measurements(
+                    source_frame, hat_accessory, facial_measurements, 
+                    product_type, product_dimensions
+                )
+                product_applied = True
+                print(f"SINGLE IMAGE: Hat placed successfully")
+                
+    except Exception as e:
+        print(f"SINGLE IMAGE: Product placement error: {e}")
+    timer.lap("placement")
+
+    # HIGH QUALITY: Measurement overlay (on by default for single images)
+    if show_measurements and facial_measurements:
+        source_frame = draw_measurement_overlay(source_frame, facial_measurements, product_dimensions)
+        timer.lap("overlay")
+
+    # HIGH QUALITY: Maximum JPEG quality for screenshots
+    _, buf = cv2.imencode(".jpg", source_frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    timer.lap("encode")
+    b64 = base64.b64encode(buf).decode("utf-8")
+    timer.lap("base64")
+    
+    # Comprehensive response with all data
+    response_data = {
+        "image_base64": b64, 
+        "status": "single_image_complete",
+        "mode": "single_image",
+        "quality": "maximum",
+        "product_applied": product_applied,
+        "product_type": product_type,
+        "product_id": product_id
+    }
+    
+    if facial_measurements:
+        response_data["facial_measurements"] = {
+            "ipd_mm": round(facial_measurements.get('estimated_ipd_mm', 0), 1),
+            "face_width_mm": round(facial_measurements.get('face_width_mm', 0), 1),
+            "head_yaw_degrees": round(facial_measurements.get('head_yaw_degrees', 0), 1),
+            "head_roll_degrees": round(facial_measurements.get('head_roll_degrees', 0), 1),
+            "pixels_per_mm": round(facial_measurements.get('pixels_per_mm', 0), 3)
+        }
+    
+    if product_dimensions:
+        response_data["product_dimensions"] = product_dimensions
+        
+    if placement_info:
+        response_data["placement_info"] = serialize_placement_info(placement_info)
+    
+    return response_data, timer.stages
+
 # 1. SINGLE IMAGE TRY-ON - High quality, slower, for screenshots
 @router.post("/single-tryon")
 async def single_image_tryon(
@@ -224,272 +499,480 @@ async def single_image_tryon(
     for pt in PRODUCT_DATABASE:
         print(f"  {pt}: {list(PRODUCT_DATABASE[pt].keys())}")
     
+    started = time.perf_counter()
     try:
-        data = await file.read()
-        np_img = np.frombuffer(data, np.uint8)
-        frame = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
-        if frame is None:
+        data = await inference_executor.prepare_frame(await file.read())
+        result = await inference_executor.run(
+            _process_single_image, data, product_type, product_id, show_measurements
+        )
+        if result is None:
+            _observe_request("single_image", started, "invalid_image")
             return JSONResponse(status_code=400, content={"error": "Invalid image"})
-
-        # Store original dimensions for scaling back
-        original_h, original_w = frame.shape[:2]
+        response_data, stages = result
+        _add_decode_time(stages, data)
+        record_stage_timings("single_image", stages)
+        _observe_request("single_image", started, "ok")
+        return response_data
         
-        # HIGH QUALITY: Larger image size for maximum accuracy
-        target_size = 640  # Increased for maximum quality
-        if original_w > target_size or original_h > target_size:
-            scale = min(target_size/original_w, target_size/original_h)
-            new_w, new_h = int(original_w * scale), int(original_h * scale)
-            frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_CUBIC)
-
-        # COMPREHENSIVE: Use both MediaPipe and YOLO for maximum accuracy
-        facial_measurements = None
-        product_dimensions = None
-        placement_info = None
+    except InferenceQueueFull as e:
+        FRAMES_DROPPED.inc(tier="single_image", reason="queue_full")
+        _observe_request("single_image", started, "queue_full")
+        return JSONResponse(status_code=503, content={"error": str(e)})
+    except Exception as e:
+        print(f"SINGLE IMAGE: Error: {e}")
+        _observe_request("single_image", started, "error")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+def _process_realtime_frame(frame_data, product_type, product_id, landmark_tracker, binary=False,
+                            response_mode="image", jpeg_quality=70, output_scale=1.0, patch_format="jpeg"):
+    """
+    CPU-bound part of /websocket-tryon for one frame, run on the inference executor.
+    `frame_data` is base64 text, raw JPEG bytes when `binary` is set, or a
+    DecodedFrame from the worker pool; binary responses carry the encoded JPEG
+    as `image_jpeg` instead of `image_base64`.
+    With response_mode="transform" nothing is drawn or encoded; with "patch"
+    only the drawn region is encoded (binary responses add its `patch` region).
+    `jpeg_quality` and `output_scale` come from the session's StreamQualityController.
+    Returns (response, stage timings), or None for an undecodable frame.
+    """
+    timer = StageTimer()
+    # FAST PROCESSING: Smaller image size for speed
+    target_size = REALTIME_TARGET_SIZE  # Smaller for speed
+    
+    # Decode base64 image (binary clients send the JPEG as-is). Nothing is drawn
+    # in transform mode, so the JPEG can be decoded at reduced scale.
+    frame_bytes = base64.b64decode(frame_data) if isinstance(frame_data, str) else frame_data
+    frame, original_size = decode_image(frame_bytes, target_size if response_mode == "transform" else None)
+    if frame is None:
+        return None
+    original_w, original_h = original_size
+    timer.lap("decode")
+    
+    # Decoded frame (full resolution unless reduced above): the product is drawn on it
+    source_frame = frame
+    
+    decoded_h, decoded_w = frame.shape[:2]
+    if decoded_w > target_size or decoded_h > target_size:
+        scale = min(target_size/decoded_w, target_size/decoded_h)
+        new_w, new_h = int(decoded_w * scale), int(decoded_h * scale)
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    timer.lap("resize")
+    
+    # FAST: MediaPipe only (skip YOLO for speed)
+    facial_measurements = None
+    try:
+        # Full FaceMesh on keyframes, optical flow for the measurement landmarks in between
+        landmarks_2d, landmarks_3d, keyframe = landmark_tracker.process(frame)
+        timer.lap("mediapipe" if keyframe else "optical_flow")
+        LANDMARK_FRAMES.inc(source="keyframe" if keyframe else "tracked")
         
-        try:
-            print(f"SINGLE IMAGE: Starting comprehensive face detection with MediaPipe + YOLO")
-            
-            # Get facial landmarks with 3D data (MediaPipe)
-            landmarks_2d, landmarks_3d = detect_face_landmarks_from_array(frame)
-            
-            # Get YOLO face detection
-            yolo_face_detections = detect_face_yolo(frame)
-            yolo_objects = detect_objects_yolo(frame)
-            
-            # Enhance detection with combined approach
-            enhanced_detection = enhance_face_detection_with_yolo(frame, landmarks_2d)
+        if landmarks_2d is not None and landmarks_3d is not None:
+            facial_measurements = _source_measurements(
+                landmarks_3d, _measurement_shape(source_frame, original_w, original_h, response_mode)
+            )
             
-            if landmarks_2d and landmarks_3d:
-                print(f"SINGLE IMAGE: Found {len(landmarks_2d)} MediaPipe landmarks")
-                # Calculate comprehensive facial measurements
-                facial_measurements = get_facial_measurements(landmarks_2d, landmarks_3d, frame.shape)
-                
-                if facial_measurements:
-                    print(f"SINGLE IMAGE: Facial measurements calculated successfully")
-                    
-                    # Add YOLO validation to measurements
-                    if enhanced_detection['yolo_face_detected']:
-                        facial_measurements['yolo_validation'] = True
-                        facial_measurements['yolo_face_bbox'] = enhanced_detection['yolo_face_bbox']
-                        print(f"SINGLE IMAGE: YOLO validation successful")
-                    else:
-                        facial_measurements['yolo_validation'] = False
-                        print(f"SINGLE IMAGE: YOLO validation failed - using MediaPipe only")
-                    
-                    # Get product dimensions from database
-                    print(f"SINGLE IMAGE: Looking up product - type: {product_type}, id: {product_id}")
-                    if product_type in PRODUCT_DATABASE and product_id in PRODUCT_DATABASE[product_type]:
-                        product_dimensions = PRODUCT_DATABASE[product_type][product_id]
-                        print(f"SINGLE IMAGE: Found product dimensions: {product_dimensions}")
-                    else:
-                        print(f"SINGLE IMAGE: Product not found in database, calculating generic dimensions")
-                        product_dimensions = calculate_product_dimensions(product_type, facial_measurements)
-                        
-        except Exception as e:
-            print(f"SINGLE IMAGE: Enhanced detection error: {e}")
-            facial_measurements = None
-
-        # HIGH QUALITY: Accurate Product Placement
-        product_applied = False
+    except Exception as e:
+        print(f"REALTIME: MediaPipe error: {e}")
+    timer.lap("measurements")
+    
+    if response_mode == "transform":
+        response = _transform_response(
+            facial_measurements, product_type, product_id,
+            PRODUCT_DATABASE.get(product_type, {}).get(product_id, {}),
+            _measurement_shape(source_frame, original_w, original_h, response_mode), original_w, original_h
+        )
+        response.update({"type": "transform", "status": "realtime_complete", "mode": "realtime_stream"})
+        timer.lap("placement")
+        return response, timer.stages
+    
+    # FAST: Quick product placement
+    product_applied = False
+    placement_info = None
+    if facial_measurements:
         try:
             if product_type == 'glasses':
-                glasses_accessory = get_glasses_accessory(product_id)
+                print(f"REALTIME: Looking up product - type: {product_type}, id: {product_id}")
+                if product_type in PRODUCT_DATABASE and product_id in PRODUCT_DATABASE[product_type]:
+                    product_dimensions = PRODUCT_DATABASE[product_type][product_id]
+                    print(f"REALTIME: Found product dimensions: {product_dimensions}")
+                else:
+                    print(f"REALTIME: Product not found in database - type: {product_type}, id: {product_id}")
+                    product_dimensions = {}
                 
-                if glasses_accessory is not None and facial_measurements:
-                    frame, placement_info = place_product_with_measurements(
-                        frame, glasses_accessory, facial_measurements, 
-                        product_type, product_dimensions
+                glasses_accessory = get_glasses_accessory(product_id)
+                if glasses_accessory is not None:
+                    source_frame, placement_info = place_product_with_measurements(
+                        source_frame, glasses_accessory, facial_measurements, 
+                        product_type, product_dimensions, sprite_key=product_id
                     )
                     product_applied = True
                     
             elif product_type == 'hat':
-                # For hats, load hat accessories
+                print(f"REALTIME: Processing hat - type: {product_type}, id: {product_id}")
+                if product_type in PRODUCT_DATABASE and product_id in PRODUCT_DATABASE[product_type]:
+                    product_dimensions = PRODUCT_DATABASE[product_type][product_id]
+                    print(f"REALTIME: Found hat dimensions: {product_dimensions}")
+                else:
+                    product_dimensions = {}
+                
                 hat_accessory = get_hat_accessory(product_id)
-                if hat_accessory is not None and facial_measurements:
-                    print(f"SINGLE IMAGE: Hat accessory loaded for {product_id}")
-                    # Actually place the hat using the same placement function as glasses
-                    frame, placement_info = place_product_with_measurements(
-                        frame, hat_accessory, facial_measurements, 
-                        product_type, product_dimensions
+                if hat_accessory is not None:
+                    print(f"REALTIME: Hat accessory loaded for {product_id}")
+                    # Actually place the hat
+                    source_frame, placement_info = place_product_with_measurements(
+                        source_frame, hat_accessory, facial_measurements, 
+                        product_type, product_dimensions, sprite_key=product_id
                     )
                     product_applied = True
-                    print(f"SINGLE IMAGE: Hat placed successfully")
+                    print(f"REALTIME: Hat placed successfully")
                     
         except Exception as e:
-            print(f"SINGLE IMAGE: Product placement error: {e}")
+            print(f"REALTIME: Product placement error: {e}")
+        timer.lap("placement")
+    
+    if response_mode == "patch":
+        # Only the accessory region is encoded; the client pastes it onto the frame it sent
+        buf, region = _encode_patch(source_frame, placement_info, jpeg_quality, patch_format)
+        timer.lap("encode")
+        if binary:
+            return {"image_jpeg": buf, "patch": region, "product_applied": region is not None}, timer.stages
+        response = _patch_response(buf, region, patch_format, product_type, product_id, original_w, original_h)
+        timer.lap("base64")
+        response.update({"type": "patch", "status": "realtime_complete", "mode": "realtime_stream"})
+        return response, timer.stages
+    
+    if output_scale < 1.0:
+        source_frame = _scale_output(source_frame, output_scale)
+        timer.lap("output_resize")
+    
+    # FAST: Lower quality for speed (adapted per session)
+    _, buf = cv2.imencode(".jpg", source_frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    timer.lap("encode")
+    if binary:
+        return {"image_jpeg": buf, "product_applied": product_applied}, timer.stages
+    b64 = base64.b64encode(buf).decode("utf-8")
+    timer.lap("base64")
+    
+    # Send processed frame back
+    response = {
+        "type": "processed_frame",
+        "image_base64": b64,
+        "status": "realtime_complete",
+        "mode": "realtime_stream",
+        "quality": "adaptive_fast"
+    }
+    return response, timer.stages
+
+# 2. REAL-TIME STREAM - WebSocket-based, fast, adaptive quality
+class _RealtimeSession:
+    """Per-connection state shared by the receive loop and the frame processor"""
 
-        # HIGH QUALITY: Always show measurements for single image
-        if facial_measurements:
-            frame = draw_measurement_overlay(frame, facial_measurements, product_dimensions)
+    def __init__(self, websocket, session_face_mesh, session_id=None):
+        self.websocket = websocket
+        # Keyframe FaceMesh + optical flow between keyframes, on the session's tracking graph.
+        # With inference workers the tracker lives in the worker this session is routed to.
+        self.session_id = session_id
+        self.landmark_tracker = LandmarkTracker(session_face_mesh) if session_id is None else None
+        # Set once the client negotiates the binary frame protocol with a hello message
+        self.binary_mode = False
+        # Only the newest unprocessed frame is kept
+        self.slot = LatestFrameSlot()
+        # JPEG quality / output size, adapted to this connection's latency
+        self.quality = StreamQualityController(REALTIME_TARGET_LATENCY_MS, initial_quality=70)
+        # Receive loop and processor both send; Starlette sends must not interleave
+        self.send_lock = asyncio.Lock()
+        self.dropped_since_response = 0
+        self.dropped_total = 0
 
-        # Scale back to original size
-        if original_w != frame.shape[1] or original_h != frame.shape[0]:
-            frame = cv2.resize(frame, (original_w, original_h), interpolation=cv2.INTER_CUBIC)
+    def count_drop(self, reason):
+        self.dropped_since_response += 1
+        self.dropped_total += 1
+        FRAMES_DROPPED.inc(tier="realtime_stream", reason=reason)
 
-        # HIGH QUALITY: Maximum JPEG quality for screenshots
-        _, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
-        b64 = base64.b64encode(buf).decode("utf-8")
-        
-        # Comprehensive response with all data
-        response_data = {
-            "image_base64": b64, 
-            "status": "single_image_complete",
-            "mode": "single_image",
-            "quality": "maximum",
-            "product_applied": product_applied,
-            "product_type": product_type,
-            "product_id": product_id
-        }
+    def take_drop_counts(self):
+        """Drops to report in the next response: (since previous response, total)"""
+        dropped = self.dropped_since_response
+        self.dropped_since_response = 0
+        return dropped, self.dropped_total
+
+    def executor_options(self):
+        """How this session's frames reach its tracker on the inference executor"""
+        if self.session_id is not None:
+            return {"session_id": self.session_id}
+        # The session FaceMesh cannot leave this process, so run on the thread pool
+        return {"landmark_tracker": self.landmark_tracker, "stateful": True}
+
+    async def send_json(self, message):
+        async with self.send_lock:
+            await self.websocket.send_text(json.dumps(message))
+
+    async def send_bytes(self, message):
+        async with self.send_lock:
+            await self.websocket.send_bytes(message)
+
+async def _process_realtime_frames(session):
+    """
+    Processing side of a /websocket-tryon session: takes the newest frame from
+    the session's slot, drops it if it waited past the deadline, and sends the
+    result. Runs until the slot is closed.
+    """
+    deadline = WS_FRAME_DEADLINE_MS / 1000.0
+    while True:
+        frame = await session.slot.get()
+        if frame is None:
+            return
         
-        if facial_measurements:
-            response_data["facial_measurements"] = {
-                "ipd_mm": round(facial_measurements.get('estimated_ipd_mm', 0), 1),
-                "face_width_mm": round(facial_measurements.get('face_width_mm', 0), 1),
-                "head_yaw_degrees": round(facial_measurements.get('head_yaw_degrees', 0), 1),
-                "head_roll_degrees": round(facial_measurements.get('head_roll_degrees', 0), 1),
-                "pixels_per_mm": round(facial_measurements.get('pixels_per_mm', 0), 3)
-            }
+        started = frame["received_at"]
+        if deadline and time.perf_counter() - started > deadline:
+            session.count_drop("deadline_exceeded")
+            _observe_request("realtime_stream", started, "dropped")
+            # Tell the client, otherwise a pipeline that is always too slow looks like silence
+            dropped, dropped_total = session.take_drop_counts()
+            try:
+                await session.send_json({
+                    "type": "frame_dropped",
+                    "reason": "deadline_exceeded",
+                    "seq": frame["seq"],
+                    "client_ts": frame["client_ts"],
+                    "dropped_frames": dropped,
+                    "dropped_frames_total": dropped_total
+                })
+            except Exception:
+                return
+            continue
         
-        if product_dimensions:
-            response_data["product_dimensions"] = product_dimensions
+        try:
+            jpeg_quality, output_scale = session.quality.settings()
+            frame_data = await inference_executor.prepare_frame(
+                frame["frame_data"], REALTIME_TARGET_SIZE if frame["response_mode"] == "transform" else None
+            )
+            result = await inference_executor.run(
+                _process_realtime_frame, frame_data, frame["product_type"], frame["product_id"],
+                binary=frame["binary"], response_mode=frame["response_mode"], jpeg_quality=jpeg_quality,
+                output_scale=output_scale, patch_format=frame["patch_format"], **session.executor_options()
+            )
+            if result is None:
+                _observe_request("realtime_stream", started, "invalid_image")
+                await session.send_json({
+                    "type": "error",
+                    "error": "Invalid image",
+                    "status": "realtime_error",
+                    "seq": frame["seq"]
+                })
+                continue
             
-        if placement_info:
-            response_data["placement_info"] = placement_info
-        
-        return response_data
-        
-    except Exception as e:
-        print(f"SINGLE IMAGE: Error: {e}")
-        return JSONResponse(status_code=500, content={"error": str(e)})
+            response, stages = result
+            _add_decode_time(stages, frame_data)
+            record_stage_timings("realtime_stream", stages)
+            dropped, dropped_total = session.take_drop_counts()
+            
+            if frame["binary"] and frame["response_mode"] in ENCODED_RESPONSE_MODES:
+                response_flags = frame["flags"] & ws_protocol.FLAG_HAT
+                if response["product_applied"]:
+                    response_flags |= ws_protocol.FLAG_FACE_DETECTED
+                if frame["response_mode"] == "patch":
+                    message = ws_protocol.pack_patch_frame(
+                        frame["seq"], frame["product_id"], response["image_jpeg"], response["patch"],
+                        response_flags, client_ts=frame["client_ts"], dropped=dropped
+                    )
+                else:
+                    message = ws_protocol.pack_frame(
+                        frame["seq"], frame["product_id"], response["image_jpeg"], response_flags,
+                        client_ts=frame["client_ts"], dropped=dropped
+                    )
+                await session.send_bytes(message)
+            else:
+                # Text responses (and binary-mode transforms, which carry no image) are JSON
+                response.update({
+                    "seq": frame["seq"],
+                    "client_ts": frame["client_ts"],
+                    "dropped_frames": dropped,
+                    "dropped_frames_total": dropped_total
+                })
+                if frame["response_mode"] in ENCODED_RESPONSE_MODES:
+                    response["encoding"] = session.quality.report()
+                await session.send_json(response)
+            _observe_request("realtime_stream", started, "ok")
+            
+            if frame["response_mode"] in ENCODED_RESPONSE_MODES:
+                # Latency up to the end of the send includes time blocked on a slow client
+                changed = session.quality.observe(time.perf_counter() - started, stages.get("encode"))
+                if changed and frame["binary"]:
+                    # Binary responses have no room for the settings; announce changes separately
+                    await session.send_json(dict(session.quality.report(), type="encoding", seq=frame["seq"]))
+            
+        except WebSocketDisconnect:
+            return
+        except Exception as e:
+            print(f"REALTIME: Frame processing error: {e}")
+            if isinstance(e, InferenceQueueFull):
+                session.count_drop("queue_full")
+                _observe_request("realtime_stream", started, "queue_full")
+            else:
+                _observe_request("realtime_stream", started, "error")
+            try:
+                await session.send_json({
+                    "type": "error",
+                    "error": str(e),
+                    "status": "realtime_error",
+                    "seq": frame["seq"]
+                })
+            except Exception:
+                # Socket already gone; the receive loop handles the disconnect
+                return
+
+def _parse_binary_frame(session, message):
+    """Frame dict for the slot from a binary message (fixed header + raw JPEG)"""
+    if not session.binary_mode:
+        raise ws_protocol.ProtocolError("Binary frames require a hello message with binary: true")
+    seq, client_ts, product_id, flags, payload = ws_protocol.unpack_frame(message)
+    if flags & ws_protocol.FLAG_TRANSFORM:
+        response_mode = "transform"
+    elif flags & ws_protocol.FLAG_PATCH:
+        response_mode = "patch"
+    else:
+        response_mode = "image"
+    return {
+        "binary": True,
+        "frame_data": payload,
+        "seq": seq,
+        "client_ts": client_ts,
+        "flags": flags,
+        "product_type": "hat" if flags & ws_protocol.FLAG_HAT else "glasses",
+        "product_id": product_id,
+        "response_mode": response_mode,
+        # Binary patches are always JPEG
+        "patch_format": "jpeg"
+    }
+
+def _parse_text_frame(message):
+    """Frame dict for the slot from a JSON frame message (base64 JPEG)"""
+    frame_data = message.get("image_base64", "")
+    product_type = message.get("product_type", "glasses")
+    product_id = message.get("product_id", "product_1")  # Fixed: Use correct product ID
+    response_mode = message.get("response_mode", "image")
+    patch_format = message.get("patch_format", "jpeg")
+    
+    # ENHANCED LOGGING: Log all received parameters
+    print(f"REALTIME: Received frame - Request ID: {len(manager.active_connections)}")
+    print(f"REALTIME: Received parameters:")
+    print(f"  - product_type: '{product_type}' (type: {type(product_type)})")
+    print(f"  - product_id: '{product_id}' (type: {type(product_id)})")
+    print(f"  - frame_data_length: {len(frame_data)}")
+    
+    # Log available products in database
+    print(f"REALTIME: Available products in database:")
+    for pt in PRODUCT_DATABASE:
+        print(f"  {pt}: {list(PRODUCT_DATABASE[pt].keys())}")
+    
+    if response_mode not in RESPONSE_MODES:
+        raise ValueError(f"Unknown response_mode '{response_mode}', expected one of {RESPONSE_MODES}")
+    if patch_format not in PATCH_FORMATS:
+        raise ValueError(f"Unknown patch_format '{patch_format}', expected one of {PATCH_FORMATS}")
+    return {
+        "binary": False,
+        "frame_data": frame_data,
+        # Optional client sequence number and timestamp, echoed back in the response
+        "seq": message.get("seq"),
+        "client_ts": message.get("client_ts"),
+        "flags": 0,
+        "product_type": product_type,
+        "product_id": product_id,
+        "response_mode": response_mode,
+        "patch_format": patch_format
+    }
 
-# 2. REAL-TIME STREAM - WebSocket-based, fast, adaptive quality
 @router.websocket("/websocket-tryon")
 async def realtime_tryon_websocket(websocket: WebSocket):
     """Real-Time Stream: WebSocket-based, fast, adaptive quality for live interaction"""
     await manager.connect(websocket)
+    WEBSOCKET_SESSIONS.inc()
+    WEBSOCKET_SESSIONS_TOTAL.inc()
     print(f"REALTIME: WebSocket connected. Total connections: {len(manager.active_connections)}")
     
+    # Each session gets its own tracking-mode FaceMesh so state never leaks between users
+    # (opened by its inference worker when the executor runs workers)
+    session_face_mesh = None
+    session_id = None
+    try:
+        if inference_executor.kind == "workers":
+            import uuid
+            session_id = uuid.uuid4().hex
+        else:
+            session_face_mesh = face_mesh_manager.open_session()
+    except Exception as e:
+        print(f"REALTIME: Could not open FaceMesh session: {e}")
+        await websocket.send_text(json.dumps({
+            "type": "error",
+            "error": str(e),
+            "status": "realtime_error"
+        }))
+        manager.disconnect(websocket)
+        WEBSOCKET_SESSIONS.dec()
+        await websocket.close()
+        return
+    
+    # Receiving is decoupled from processing: this loop only parses messages and
+    # drops each frame into the session's latest-frame slot, replacing any frame
+    # the processor has not started yet
+    session = _RealtimeSession(websocket, session_face_mesh, session_id)
+    processor = asyncio.create_task(_process_realtime_frames(session))
     try:
         while True:
-            # Receive base64 image data
-            data = await websocket.receive_text()
-            message = json.loads(data)
+            raw_message = await websocket.receive()
+            if raw_message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(raw_message.get("code", 1000))
+            received_at = time.perf_counter()
             
-            if message.get("type") == "frame":
-                # Process frame for real-time try-on
-                frame_data = message.get("image_base64", "")
-                product_type = message.get("product_type", "glasses")
-                product_id = message.get("product_id", "product_1")  # Fixed: Use correct product ID
-                
-                # ENHANCED LOGGING: Log all received parameters
-                print(f"REALTIME: Received frame - Request ID: {len(manager.active_connections)}")
-                print(f"REALTIME: Received parameters:")
-                print(f"  - product_type: '{product_type}' (type: {type(product_type)})")
-                print(f"  - product_id: '{product_id}' (type: {type(product_id)})")
-                print(f"  - frame_data_length: {len(frame_data)}")
-                
-                # Log available products in database
-                print(f"REALTIME: Available products in database:")
-                for pt in PRODUCT_DATABASE:
-                    print(f"  {pt}: {list(PRODUCT_DATABASE[pt].keys())}")
-                
-                try:
-                    # Decode base64 image
-                    frame_bytes = base64.b64decode(frame_data)
-                    np_img = np.frombuffer(frame_bytes, np.uint8)
-                    frame = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
+            try:
+                if raw_message.get("bytes") is not None:
+                    # Binary frame: fixed header + raw JPEG, no base64/JSON on either side
+                    frame = _parse_binary_frame(session, raw_message["bytes"])
+                else:
+                    # Text message: JSON control message or base64 frame (original protocol)
+                    message = json.loads(raw_message["text"])
                     
-                    if frame is not None:
-                        # FAST PROCESSING: Smaller image size for speed
-                        target_size = 256  # Smaller for speed
-                        original_h, original_w = frame.shape[:2]
-                        if original_w > target_size or original_h > target_size:
-                            scale = min(target_size/original_w, target_size/original_h)
-                            new_w, new_h = int(original_w * scale), int(original_h * scale)
-                            frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
-                        
-                        # FAST: MediaPipe only (skip YOLO for speed)
-                        facial_measurements = None
+                    if message.get("type") == "hello":
                         try:
-                            landmarks_2d, landmarks_3d = detect_face_landmarks_from_array(frame)
-                            
-                            if landmarks_2d and landmarks_3d:
-                                facial_measurements = get_facial_measurements(landmarks_2d, landmarks_3d, frame.shape)
-                                
-                        except Exception as e:
-                            print(f"REALTIME: MediaPipe error: {e}")
-                        
-                        # FAST: Quick product placement
-                        if facial_measurements:
-                            try:
-                                if product_type == 'glasses':
-                                    print(f"REALTIME: Looking up product - type: {product_type}, id: {product_id}")
-                                    if product_type in PRODUCT_DATABASE and product_id in PRODUCT_DATABASE[product_type]:
-                                        product_dimensions = PRODUCT_DATABASE[product_type][product_id]
-                                        print(f"REALTIME: Found product dimensions: {product_dimensions}")
-                                    else:
-                                        print(f"REALTIME: Product not found in database - type: {product_type}, id: {product_id}")
-                                        product_dimensions = {}
-                                    
-                                    glasses_accessory = get_glasses_accessory(product_id)
-                                    if glasses_accessory is not None:
-                                        frame, _ = place_product_with_measurements(
-                                            frame, glasses_accessory, facial_measurements, 
-                                            product_type, product_dimensions
-                                        )
-                                        
-                                elif product_type == 'hat':
-                                    print(f"REALTIME: Processing hat - type: {product_type}, id: {product_id}")
-                                    if product_type in PRODUCT_DATABASE and product_id in PRODUCT_DATABASE[product_type]:
-                                        product_dimensions = PRODUCT_DATABASE[product_type][product_id]
-                                        print(f"REALTIME: Found hat dimensions: {product_dimensions}")
-                                    else:
-                                        product_dimensions = {}
-                                    
-                                    hat_accessory = get_hat_accessory(product_id)
-                                    if hat_accessory is not None:
-                                        print(f"REALTIME: Hat accessory loaded for {product_id}")
-                                        # Actually place the hat
-                                        frame, _ = place_product_with_measurements(
-                                            frame, hat_accessory, facial_measurements, 
-                                            product_type, product_dimensions
-                                        )
-                                        print(f"REALTIME: Hat placed successfully")
-                                        
-                            except Exception as e:
-                                print(f"REALTIME: Product placement error: {e}")
-                        
-                        # Scale back to original size
-                        if original_w != frame.shape[1] or original_h != frame.shape[0]:
-                            frame = cv2.resize(frame, (original_w, original_h), interpolation=cv2.INTER_LINEAR)
-                        
-                        # FAST: Lower quality for speed
-                        _, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-                        b64 = base64.b64encode(buf).decode("utf-8")
-                        
-                        # Send processed frame back
-                        response = {
-                            "type": "processed_frame",
-                            "image_base64": b64,
-                            "status": "realtime_complete",
-                            "mode": "realtime_stream",
-                            "quality": "adaptive_fast"
-                        }
-                        
-                        await websocket.send_text(json.dumps(response))
-                        
-                except Exception as e:
-                    print(f"REALTIME: Frame processing error: {e}")
-                    error_response = {
-                        "type": "error",
-                        "error": str(e),
-                        "status": "realtime_error"
-                    }
-                    await websocket.send_text(json.dumps(error_response))
+                            session.binary_mode = ws_protocol.negotiate_binary(message)
+                        except ValueError as e:
+                            # A client on another binary version stays on the text protocol
+                            session.binary_mode = False
+                            print(f"REALTIME: Rejected hello: {e}")
+                            await session.send_json({
+                                "type": "error",
+                                "error": str(e),
+                                "status": "realtime_error"
+                            })
+                            continue
+                        print(f"REALTIME: Client hello - binary frames: {session.binary_mode}")
+                        await session.send_json(ws_protocol.hello_ack(session.binary_mode))
+                        continue
+                    elif message.get("type") == "ping":
+                        # Keep connection alive
+                        await session.send_json({"type": "pong"})
+                        continue
                     
-            elif message.get("type") == "ping":
-                # Keep connection alive
-                await websocket.send_text(json.dumps({"type": "pong"}))
+                    # Round trip measured by the client from an echoed client_ts, on a
+                    # frame message or (for binary clients) a {"type": "stats"} message
+                    if message.get("rtt_ms") is not None:
+                        session.quality.observe_rtt(message["rtt_ms"])
+                    if message.get("type") != "frame":
+                        continue
+                    frame = _parse_text_frame(message)
+            except (ValueError, KeyError) as e:
+                # Malformed frame or control message (json.JSONDecodeError is a ValueError)
+                print(f"REALTIME: Rejected message: {e}")
+                await session.send_json({
+                    "type": "error",
+                    "error": str(e),
+                    "status": "realtime_error"
+                })
+                continue
+            
+            frame["received_at"] = received_at
+            if session.slot.put(frame) is not None:
+                session.count_drop("superseded")
                 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
@@ -497,220 +980,358 @@ async def realtime_tryon_websocket(websocket: WebSocket):
     except Exception as e:
         print(f"REALTIME: WebSocket error: {e}")
         manager.disconnect(websocket)
+    finally:
+        # Let an in-flight frame finish before the FaceMesh it uses is closed
+        session.slot.close()
+        await asyncio.gather(processor, return_exceptions=True)
+        WEBSOCKET_SESSIONS.dec()
+        face_mesh_manager.close_session(session_face_mesh)
+        if session_id is not None:
+            inference_executor.close_session(session_id)
 
-# 3. HIGH-ACCURACY STREAM - Current system, balanced approach
-@router.post("/tryon")
-async def tryon_endpoint(
-    file: UploadFile = File(...), 
-    product_type: str = Form("glasses"), 
-    product_id: str = Form("product_1"), 
-    show_measurements: bool = Form(False)
-):
-    """High-Accuracy Stream: Balanced approach for continuous try-on experience"""
-    import uuid
-    request_id = str(uuid.uuid4())
+def _process_high_accuracy_frame(data, product_type, product_id, show_measurements, request_id,
+                                 response_mode="image", roi=None, jpeg_quality=60, output_scale=1.0,
+                                 patch_format="jpeg"):
+    """
+    CPU-bound part of /tryon, run on the inference executor.
+    With response_mode="transform" nothing is drawn or encoded; with "patch"
+    only the drawn region is encoded (no measurement overlay). `roi` is the
+    session's face region from its previous frame (see api/services/face_roi.py);
+    `jpeg_quality` and `output_scale` come from the session's StreamQualityController.
+    Returns (response_data, stage timings, ROI for the session's next frame),
+    or None for an undecodable image.
+    """
+    timer = StageTimer()
+    # BALANCED: Medium image size for balanced accuracy/speed
+    target_size = HIGH_ACCURACY_TARGET_SIZE  # Balanced size
     
-    async with _request_lock:
-        # If there are already active requests, return the original frame
-        if len(_active_requests) > 0:
-            print(f"HIGH-ACCURACY: Request {request_id}: Skipping - {len(_active_requests)} active requests")
-            data = await file.read()
-            np_img = np.frombuffer(data, np.uint8)
-            frame = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
-            if frame is not None:
-                _, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 60])
-                b64 = base64.b64encode(buf).decode("utf-8")
-                return {"image_base64": b64, "status": "skipped_multiple_requests"}
-            return JSONResponse(status_code=400, content={"error": "Invalid image"})
-        
-        # Add this request to active requests
-        _active_requests.add(request_id)
-        print(f"HIGH-ACCURACY: Request {request_id}: Processing - Active requests: {len(_active_requests)}")
+    # Nothing is drawn in transform mode, so the JPEG can be decoded at reduced scale
+    frame, original_size = decode_image(data, target_size if response_mode == "transform" else None)
+    if frame is None:
+        return None
+    original_w, original_h = original_size
+    timer.lap("decode")
+
+    # Log received parameters
+    print(f"HIGH-ACCURACY: Request {request_id}: Received parameters:")
+    print(f"  - product_type: '{product_type}' (type: {type(product_type)})")
+    print(f"  - product_id: '{product_id}' (type: {type(product_id)})")
+    print(f"  - show_measurements: {show_measurements}")
     
-    try:
-        data = await file.read()
-        np_img = np.frombuffer(data, np.uint8)
-        frame = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
-        if frame is None:
-            return JSONResponse(status_code=400, content={"error": "Invalid image"})
+    # Log available products in database
+    print(f"HIGH-ACCURACY: Available products in database:")
+    for pt in PRODUCT_DATABASE:
+        print(f"  {pt}: {list(PRODUCT_DATABASE[pt].keys())}")
 
-        # Log received parameters
-        print(f"HIGH-ACCURACY: Request {request_id}: Processing - Active requests: {len(_active_requests)}")
-        print(f"HIGH-ACCURACY: Received parameters:")
-        print(f"  - product_type: '{product_type}' (type: {type(product_type)})")
-        print(f"  - product_id: '{product_id}' (type: {type(product_id)})")
-        print(f"  - show_measurements: {show_measurements}")
-        
-        # Log available products in database
-        print(f"HIGH-ACCURACY: Available products in database:")
-        for pt in PRODUCT_DATABASE:
-            print(f"  {pt}: {list(PRODUCT_DATABASE[pt].keys())}")
+    # Decoded frame (full resolution unless reduced above): ROI crops come from it and the product is drawn on it
+    source_frame = frame
+    decoded_h, decoded_w = frame.shape[:2]
+    timer.reset()
+    
+    if decoded_w > target_size or decoded_h > target_size:
+        scale = min(target_size/decoded_w, target_size/decoded_h)
+        new_w, new_h = int(decoded_w * scale), int(decoded_h * scale)
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    frame_scale = decoded_w / frame.shape[1]
+    timer.lap("resize")
 
-        # Store original dimensions for scaling back
-        original_h, original_w = frame.shape[:2]
-        
-        # BALANCED: Medium image size for balanced accuracy/speed
-        target_size = 320  # Balanced size
-        if original_w > target_size or original_h > target_size:
-            scale = min(target_size/original_w, target_size/original_h)
-            new_w, new_h = int(original_w * scale), int(original_h * scale)
-            frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
-
-        # BALANCED: Comprehensive facial measurements
-        facial_measurements = None
-        product_dimensions = None
-        placement_info = None
+    # BALANCED: Comprehensive facial measurements
+    facial_measurements = None
+    product_dimensions = None
+    placement_info = None
+    next_roi = None
+    
+    try:
+        # BALANCED: MediaPipe landmarks confirmed by the face-validation detector
+        print(f"HIGH-ACCURACY: Starting balanced face detection with MediaPipe + face validation")
         
-        try:
-            # BALANCED: Use both MediaPipe and YOLO for good accuracy
-            print(f"HIGH-ACCURACY: Starting balanced face detection with MediaPipe + YOLO")
-            
-            # Get facial landmarks with 3D data (MediaPipe)
+        # Get facial landmarks with 3D data (MediaPipe), searching the session's
+        # face region first and the whole frame if the face has left it
+        landmarks_2d = landmarks_3d = None
+        if roi is not None:
+            landmarks_2d, landmarks_3d = detect_face_landmarks_in_roi(source_frame, roi, frame.shape, target_size)
+        if landmarks_2d is None:
             landmarks_2d, landmarks_3d = detect_face_landmarks_from_array(frame)
+        next_roi = roi_from_landmarks(landmarks_3d, frame.shape)
+        timer.lap("mediapipe")
+        
+        # Face validation (face detector or YOLO, see TRYON_FACE_VALIDATION)
+        validation = validate_face(frame)
+        
+        # Enhance detection with combined approach
+        enhanced_detection = enhance_face_detection(landmarks_2d, validation)
+        timer.lap("face_validation")
+        
+        print(f"HIGH-ACCURACY: MediaPipe landmarks: {landmarks_2d is not None}, landmarks_3d: {landmarks_3d is not None}")
+        print(f"HIGH-ACCURACY: {validation.backend} face detections: {len(validation.faces)}")
+        print(f"HIGH-ACCURACY: Enhanced detection confidence: {enhanced_detection['confidence']}")
+        
+        if landmarks_2d is not None and landmarks_3d is not None:
+            print(f"HIGH-ACCURACY: Found {len(landmarks_2d)} MediaPipe landmarks")
+            # Calculate comprehensive facial measurements (original frame coordinates)
+            facial_measurements = _source_measurements(
+                landmarks_3d, _measurement_shape(source_frame, original_w, original_h, response_mode)
+            )
             
-            # Get YOLO face detection
-            yolo_face_detections = detect_face_yolo(frame)
-            yolo_objects = detect_objects_yolo(frame)
-            
-            # Enhance detection with combined approach
-            enhanced_detection = enhance_face_detection_with_yolo(frame, landmarks_2d)
-            
-            print(f"HIGH-ACCURACY: MediaPipe landmarks: {landmarks_2d is not None}, landmarks_3d: {landmarks_3d is not None}")
-            print(f"HIGH-ACCURACY: YOLO face detections: {len(yolo_face_detections)}")
-            print(f"HIGH-ACCURACY: YOLO objects detected: {len(yolo_objects)}")
-            print(f"HIGH-ACCURACY: Enhanced detection confidence: {enhanced_detection['confidence']}")
-            
-            if landmarks_2d and landmarks_3d:
-                print(f"HIGH-ACCURACY: Found {len(landmarks_2d)} MediaPipe landmarks")
-                # Calculate comprehensive facial measurements
-                facial_measurements = get_facial_measurements(landmarks_2d, landmarks_3d, frame.shape)
+            if facial_measurements:
+                print(f"HIGH-ACCURACY: Facial measurements calculated successfully")
                 
-                if facial_measurements:
-                    print(f"HIGH-ACCURACY: Facial measurements calculated successfully")
-                    
-                    # Add YOLO validation to measurements
-                    if enhanced_detection['yolo_face_detected']:
-                        facial_measurements['yolo_validation'] = True
-                        facial_measurements['yolo_face_bbox'] = enhanced_detection['yolo_face_bbox']
-                        print(f"HIGH-ACCURACY: YOLO validation successful - face bbox: {enhanced_detection['yolo_face_bbox']}")
-                    else:
-                        facial_measurements['yolo_validation'] = False
-                        print(f"HIGH-ACCURACY: YOLO validation failed - using MediaPipe only")
-                    
-                    # Get product dimensions from database
-                    if product_type in PRODUCT_DATABASE and product_id in PRODUCT_DATABASE[product_type]:
-                        product_dimensions = PRODUCT_DATABASE[product_type][product_id]
-                        print(f"HIGH-ACCURACY: Using product dimensions from database: {product_dimensions}")
-                    else:
-                        print(f"HIGH-ACCURACY: Product not found in database - type: {product_type}, id: {product_id}")
-                        print(f"HIGH-ACCURACY: Available types: {list(PRODUCT_DATABASE.keys())}")
-                        if product_type in PRODUCT_DATABASE:
-                            print(f"HIGH-ACCURACY: Available IDs for {product_type}: {list(PRODUCT_DATABASE[product_type].keys())}")
-                        # Calculate generic dimensions based on facial measurements
-                        product_dimensions = calculate_product_dimensions(product_type, facial_measurements)
-                        print(f"HIGH-ACCURACY: Calculated generic dimensions: {product_dimensions}")
-                else:
-                    print(f"HIGH-ACCURACY: Failed to calculate facial measurements")
-            else:
-                print(f"HIGH-ACCURACY: No MediaPipe landmarks detected")
-                # Try YOLO-only approach as fallback
-                if yolo_face_detections:
-                    print(f"HIGH-ACCURACY: Using YOLO-only detection as fallback")
-                    facial_measurements = {
-                        'yolo_only': True,
-                        'yolo_face_bbox': yolo_face_detections[0]['bbox'],
-                        'confidence': yolo_face_detections[0]['confidence']
-                    }
+                # Add face validation to measurements
+                _add_face_validation(facial_measurements, enhanced_detection, frame_scale)
+                if enhanced_detection['validation_face_detected']:
+                    print(f"HIGH-ACCURACY: Face validation successful - face bbox: {enhanced_detection['validation_face_bbox']}")
                 else:
-                    print(f"HIGH-ACCURACY: No face detected by either MediaPipe or YOLO")
-                    facial_measurements = None
-                        
-        except Exception as e:
-            print(f"HIGH-ACCURACY: Enhanced detection error: {e}")
-            import traceback
-            traceback.print_exc()
-            facial_measurements = None
-
-        # BALANCED: Accurate Product Placement
-        product_applied = False
-        try:
-            if product_type == 'glasses':
-            # Get cached glasses accessory
-                glasses_accessory = get_glasses_accessory(product_id)
+                    print(f"HIGH-ACCURACY: Face validation failed - using MediaPipe only")
                 
-                if glasses_accessory is not None and facial_measurements:
-                    # Use enhanced placement with measurements
-                    frame, placement_info = place_product_with_measurements(
-                        frame, glasses_accessory, facial_measurements, 
-                        product_type, product_dimensions
-                    )
-                    product_applied = True
-                    
-            elif product_type == 'hat':
-                # For hats, load hat accessories
-                hat_accessory = get_hat_accessory(product_id)
-                if hat_accessory is not None and facial_measurements:
-                    print(f"HIGH-ACCURACY: Hat accessory loaded for {product_id}")
-                    # Actually place the hat using the same placement function as glasses
-                    frame, placement_info = place_product_with_measurements(
-                        frame, hat_accessory, facial_measurements, 
-                        product_type, product_dimensions
-                    )
-                    product_applied = True
-                    print(f"HIGH-ACCURACY: Hat placed successfully")
+                # Get product dimensions from database
+                if product_type in PRODUCT_DATABASE and product_id in PRODUCT_DATABASE[product_type]:
+                    product_dimensions = PRODUCT_DATABASE[product_type][product_id]
+                    print(f"HIGH-ACCURACY: Using product dimensions from database: {product_dimensions}")
+                else:
+                    print(f"HIGH-ACCURACY: Product not found in database - type: {product_type}, id: {product_id}")
+                    print(f"HIGH-ACCURACY: Available types: {list(PRODUCT_DATABASE.keys())}")
+                    if product_type in PRODUCT_DATABASE:
+                        print(f"HIGH-ACCURACY: Available IDs for {product_type}: {list(PRODUCT_DATABASE[product_type].keys())}")
+                    # Calculate generic dimensions based on facial measurements
+                    product_dimensions = calculate_product_dimensions(product_type, facial_measurements)
+                    print(f"HIGH-ACCURACY: Calculated generic dimensions: {product_dimensions}")
+            else:
+                print(f"HIGH-ACCURACY: Failed to calculate facial measurements")
+        else:
+            print(f"HIGH-ACCURACY: No MediaPipe landmarks detected")
+            # Fall back to the validation detector's face box
+            if validation.faces:
+                print(f"HIGH-ACCURACY: Using {validation.backend}-only detection as fallback")
+                facial_measurements = {
+                    'detector_only': True,
+                    'face_validation_backend': validation.backend,
+                    'face_validation_bbox': _scale_bbox(validation.face_region(), frame_scale),
+                    'confidence': validation.face_score()
+                }
+            else:
+                print(f"HIGH-ACCURACY: No face detected by either MediaPipe or {validation.backend}")
+                facial_measurements = None
                     
-        except Exception as e:
-            print(f"HIGH-ACCURACY: Product placement error: {e}")
-
-        # BALANCED: Draw measurement overlays if requested
-        if show_measurements and facial_measurements:
-            frame = draw_measurement_overlay(frame, facial_measurements, product_dimensions)
-
-        # Scale back to original size if needed
-        if original_w != frame.shape[1] or original_h != frame.shape[0]:
-            frame = cv2.resize(frame, (original_w, original_h), interpolation=cv2.INTER_LINEAR)
-
-        # BALANCED: Medium JPEG quality for balanced speed/quality
-        _, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 60])  # Balanced quality
-        b64 = base64.b64encode(buf).decode("utf-8")
-        
-        # Enhanced response with measurement data
-        response_data = {
-            "image_base64": b64, 
+    except Exception as e:
+        print(f"HIGH-ACCURACY: Enhanced detection error: {e}")
+        import traceback
+        traceback.print_exc()
+        facial_measurements = None
+    timer.lap("measurements")
+    
+    if response_mode == "transform":
+        response_data = _transform_response(
+            facial_measurements, product_type, product_id, product_dimensions,
+            _measurement_shape(source_frame, original_w, original_h, response_mode), original_w, original_h
+        )
+        response_data.update({
             "status": "high_accuracy_complete",
             "mode": "high_accuracy_stream",
-            "quality": "balanced",
-            "detections": [],  # Simplified version
-            "total_objects": 0,
-            "product_applied": product_applied,
-            "yolo_success": False,  # Simplified version
-            "product_type": product_type,
-            "product_id": product_id
-        }
-        
-        # Add measurement data if available
-        if facial_measurements:
-            response_data["facial_measurements"] = {
-                "ipd_mm": round(facial_measurements.get('estimated_ipd_mm', 0), 1),
-                "face_width_mm": round(facial_measurements.get('face_width_mm', 0), 1),
-                "head_yaw_degrees": round(facial_measurements.get('head_yaw_degrees', 0), 1),
-                "head_roll_degrees": round(facial_measurements.get('head_roll_degrees', 0), 1)
-            }
-        
+            "quality": "balanced"
+        })
         if product_dimensions:
             response_data["product_dimensions"] = product_dimensions
+        timer.lap("placement")
+        return response_data, timer.stages, next_roi
+
+    # BALANCED: Accurate Product Placement
+    product_applied = False
+    try:
+        if product_type == 'glasses':
+        # Get cached glasses accessory
+            glasses_accessory = get_glasses_accessory(product_id)
             
-        if placement_info:
-            response_data["placement_info"] = {
-                "placement_coordinates": placement_info.get('placement_coordinates'),
-                "accuracy_metrics": placement_info.get('accuracy_metrics', {}),
-                "head_pose": placement_info.get('head_pose', {})
-            }
+            if glasses_accessory is not None and facial_measurements:
+                # Use enhanced placement with measurements
+                source_frame, placement_info = place_product_with_measurements(
+                    source_frame, glasses_accessory, facial_measurements, 
+                    product_type, product_dimensions, sprite_key=product_id
+                )
+                product_applied = True
+                
+        elif product_type == 'hat':
+            # For hats, load hat accessories
+            hat_accessory = get_hat_accessory(product_id)
+            if hat_accessory is not None and facial_measurements:
+                print(f"HIGH-ACCURACY: Hat accessory loaded for {product_id}")
+                # Actually place the hat using the same placement function as glasses
+                source_frame, placement_info = place_product_with_measurements(
+                    source_frame, hat_accessory, facial_measurements, 
+                    product_type, product_dimensions, sprite_key=product_id
+                )
+                product_applied = True
+                print(f"HIGH-ACCURACY: Hat placed successfully")
+                
+    except Exception as e:
+        print(f"HIGH-ACCURACY: Product placement error: {e}")
+    timer.lap("placement")
+
+    if response_mode == "patch":
+        # Only the accessory region is encoded; the client pastes it onto the frame it sent
+        buf, region = _encode_patch(source_frame, placement_info, jpeg_quality, patch_format)
+        timer.lap("encode")
+        response_data = _patch_response(buf, region, patch_format, product_type, product_id, original_w, original_h)
+        timer.lap("base64")
+        response_data.update({
+            "status": "high_accuracy_complete",
+            "mode": "high_accuracy_stream",
+            "quality": "balanced"
+        })
+        return response_data, timer.stages, next_roi
+
+    # BALANCED: Draw measurement overlays if requested
+    if show_measurements and facial_measurements:
+        source_frame = draw_measurement_overlay(source_frame, facial_measurements, product_dimensions)
+        timer.lap("overlay")
+
+    if output_scale < 1.0:
+        source_frame = _scale_output(source_frame, output_scale)
+        timer.lap("output_resize")
+
+    # BALANCED: Medium JPEG quality for balanced speed/quality (adapted per session)
+    _, buf = cv2.imencode(".jpg", source_frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    timer.lap("encode")
+    b64 = base64.b64encode(buf).decode("utf-8")
+    timer.lap("base64")
+    
+    # Enhanced response with measurement data
+    response_data = {
+        "image_base64": b64, 
+        "status": "high_accuracy_complete",
+        "mode": "high_accuracy_stream",
+        "quality": "balanced",
+        "detections": [],  # Simplified version
+        "total_objects": 0,
+        "product_applied": product_applied,
+        "yolo_success": False,  # Simplified version
+        "product_type": product_type,
+        "product_id": product_id
+    }
+    
+    # Add measurement data if available
+    if facial_measurements:
+        response_data["facial_measurements"] = {
+            "ipd_mm": round(facial_measurements.get('estimated_ipd_mm', 0), 1),
+            "face_width_mm": round(facial_measurements.get('face_width_mm', 0), 1),
+            "head_yaw_degrees": round(facial_measurements.get('head_yaw_degrees', 0), 1),
+            "head_roll_degrees": round(facial_measurements.get('head_roll_degrees', 0), 1)
+        }
+    
+    if product_dimensions:
+        response_data["product_dimensions"] = product_dimensions
         
+    if placement_info:
+        response_data["placement_info"] = serialize_placement_info(placement_info)
+    
+    return response_data, timer.stages, next_roi
+
+def _encode_skipped_frame(data):
+    """Re-encode the untouched frame for requests skipped by the active-request gate"""
+    np_img = np.frombuffer(data, np.uint8)
+    frame = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
+    if frame is None:
+        return None
+    _, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 60])
+    return base64.b64encode(buf).decode("utf-8")
+
+@router.post("/tryon")
+async def tryon_endpoint(
+    file: UploadFile = File(...), 
+    product_type: str = Form("glasses"), 
+    product_id: str = Form("product_1"), 
+    show_measurements: bool = Form(False),
+    response_mode: str = Form("image"),
+    session_id: str = Form(None),
+    rtt_ms: float = Form(None),
+    patch_format: str = Form("jpeg")
+):
+    """High-Accuracy Stream: Balanced approach for continuous try-on experience"""
+    import uuid
+    request_id = str(uuid.uuid4())
+    
+    if response_mode not in RESPONSE_MODES:
+        return JSONResponse(status_code=400, content={
+            "error": f"Unknown response_mode '{response_mode}', expected one of {list(RESPONSE_MODES)}"
+        })
+    if patch_format not in PATCH_FORMATS:
+        return JSONResponse(status_code=400, content={
+            "error": f"Unknown patch_format '{patch_format}', expected one of {list(PATCH_FORMATS)}"
+        })
+    
+    async with _request_lock:
+        # If there are already active requests, return the original frame
+        skip_request = len(_active_requests) > 0
+        if skip_request:
+            print(f"HIGH-ACCURACY: Request {request_id}: Skipping - {len(_active_requests)} active requests")
+        else:
+            # Add this request to active requests
+            _active_requests.add(request_id)
+            print(f"HIGH-ACCURACY: Request {request_id}: Processing - Active requests: {len(_active_requests)}")
+    
+    started = time.perf_counter()
+    if skip_request:
+        FRAMES_DROPPED.inc(tier="high_accuracy_stream", reason="skipped_multiple_requests")
+        if response_mode == "transform":
+            # The client keeps drawing its last transform; nothing to re-encode
+            _observe_request("high_accuracy_stream", started, "skipped")
+            return {"status": "skipped_multiple_requests", "response_mode": "transform", "transform": None}
+        if response_mode == "patch":
+            # The client keeps showing its own frame (with its last patch)
+            _observe_request("high_accuracy_stream", started, "skipped")
+            return {"status": "skipped_multiple_requests", "response_mode": "patch", "patch": None}
+        data = await file.read()
+        try:
+            b64 = await inference_executor.run(_encode_skipped_frame, data)
+        except InferenceQueueFull as e:
+            _observe_request("high_accuracy_stream", started, "queue_full")
+            return JSONResponse(status_code=503, content={"error": str(e)})
+        if b64 is not None:
+            _observe_request("high_accuracy_stream", started, "skipped")
+            return {"image_base64": b64, "status": "skipped_multiple_requests"}
+        _observe_request("high_accuracy_stream", started, "invalid_image")
+        return JSONResponse(status_code=400, content={"error": "Invalid image"})
+    
+    # Clients streaming over HTTP send a stable session_id to get ROI cropping and adaptive encoding
+    quality = None
+    if session_id and response_mode in ENCODED_RESPONSE_MODES:
+        quality = quality_registry.get(session_id) or StreamQualityController(
+            HIGH_ACCURACY_TARGET_LATENCY_MS, initial_quality=60
+        )
+        if rtt_ms is not None:
+            quality.observe_rtt(rtt_ms)
+    jpeg_quality, output_scale = quality.settings() if quality else (60, 1.0)
+    
+    try:
+        data = await inference_executor.prepare_frame(
+            await file.read(), HIGH_ACCURACY_TARGET_SIZE if response_mode == "transform" else None
+        )
+        result = await inference_executor.run(
+            _process_high_accuracy_frame, data, product_type, product_id, show_measurements, request_id,
+            response_mode, roi_registry.get(session_id) if session_id else None, jpeg_quality, output_scale,
+            patch_format
+        )
+        if result is None:
+            _observe_request("high_accuracy_stream", started, "invalid_image")
+            return JSONResponse(status_code=400, content={"error": "Invalid image"})
+        response_data, stages, next_roi = result
+        _add_decode_time(stages, data)
+        if session_id:
+            roi_registry.put(session_id, next_roi)
+        if quality is not None:
+            response_data["encoding"] = quality.report()
+            quality.observe(time.perf_counter() - started, stages.get("encode"))
+            quality_registry.put(session_id, quality)
+        record_stage_timings("high_accuracy_stream", stages)
+        _observe_request("high_accuracy_stream", started, "ok")
         return response_data
         
+    except InferenceQueueFull as e:
+        FRAMES_DROPPED.inc(tier="high_accuracy_stream", reason="queue_full")
+        _observe_request("high_accuracy_stream", started, "queue_full")
+        return JSONResponse(status_code=503, content={"error": str(e)})
     except Exception as e:
         print(f"HIGH-ACCURACY: Error in tryon: {e}")
+        _observe_request("high_accuracy_stream", started, "error")
         return JSONResponse(status_code=500, content={"error": str(e)})
     finally:
         # Always remove this request from active requests
@@ -718,55 +1339,120 @@ async def tryon_endpoint(
             _active_requests.discard(request_id)
             print(f"HIGH-ACCURACY: Request {request_id}: Completed - Active requests: {len(_active_requests)}")
 
+def _process_measurements(data):
+    """CPU-bound part of /measurements, run on the inference executor. Returns None for an undecodable image."""
+    frame, _ = decode_image(data)
+    if frame is None:
+        return None
+
+    # Get facial landmarks with 3D data
+    landmarks_2d, landmarks_3d = detect_face_landmarks_from_array(frame)
+    
+    if landmarks_2d is None or landmarks_3d is None:
+        return {
+            "error": "No face detected",
+            "measurements": None
+        }
+
+    # Calculate comprehensive facial measurements
+    facial_measurements = get_facial_measurements(landmarks_2d, landmarks_3d, frame.shape)
+    
+    if not facial_measurements:
+        return {
+            "error": "Could not calculate measurements",
+            "measurements": None
+        }
+
+    # Calculate product dimensions for different types
+    glasses_dimensions = calculate_product_dimensions('glasses', facial_measurements)
+    hat_dimensions = calculate_product_dimensions('hat', facial_measurements)
+
+    return {
+        "facial_measurements": {
+            "ipd_mm": round(facial_measurements.get('estimated_ipd_mm', 0), 1),
+            "face_width_mm": round(facial_measurements.get('face_width_mm', 0), 1),
+            "head_yaw_degrees": round(facial_measurements.get('head_yaw_degrees', 0), 1),
+            "head_roll_degrees": round(facial_measurements.get('head_roll_degrees', 0), 1),
+            "pixels_per_mm": round(facial_measurements.get('pixels_per_mm', 0), 3)
+        },
+        "recommended_products": {
+            "glasses": glasses_dimensions,
+            "hat": hat_dimensions
+        },
+        "measurement_accuracy": "high" if facial_measurements.get('pixels_per_mm', 0) > 0 else "low"
+    }
+
 @router.post("/measurements")
 async def get_measurements_only(file: UploadFile = File(...)):
     """Get facial measurements without product placement"""
     try:
-        data = await file.read()
-        np_img = np.frombuffer(data, np.uint8)
-        frame = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
-        if frame is None:
+        data = await inference_executor.prepare_frame(await file.read())
+        response_data = await inference_executor.run(_process_measurements, data)
+        if response_data is None:
             return JSONResponse(status_code=400, content={"error": "Invalid image"})
-
-        # Get facial landmarks with 3D data
-        landmarks_2d, landmarks_3d = detect_face_landmarks_from_array(frame)
-        
-        if not landmarks_2d or not landmarks_3d:
-            return JSONResponse(content={
-                "error": "No face detected",
-                "measurements": None
-            })
-
-        # Calculate comprehensive facial measurements
-        facial_measurements = get_facial_measurements(landmarks_2d, landmarks_3d, frame.shape)
+        return response_data
         
-        if not facial_measurements:
-            return JSONResponse(content={
-                "error": "Could not calculate measurements",
-                "measurements": None
-            })
+    except InferenceQueueFull as e:
+        return JSONResponse(status_code=503, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
 
-        # Calculate product dimensions for different types
-        glasses_dimensions = calculate_product_dimensions('glasses', facial_measurements)
-        hat_dimensions = calculate_product_dimensions('hat', facial_measurements)
+def _process_glasses_calibration(data, frame_width_mm, frame_height_mm, lens_width_mm, lens_height_mm, bridge_width_mm):
+    """CPU-bound part of /calibrate-glasses, run on the inference executor. Returns None for an undecodable image."""
+    frame, _ = decode_image(data)
+    if frame is None:
+        return None
 
+    # Get facial landmarks and measurements
+    landmarks_2d, landmarks_3d = detect_face_landmarks_from_array(frame)
+    
+    if landmarks_2d is None or landmarks_3d is None:
         return {
-            "facial_measurements": {
-                "ipd_mm": round(facial_measurements.get('estimated_ipd_mm', 0), 1),
-                "face_width_mm": round(facial_measurements.get('face_width_mm', 0), 1),
-                "head_yaw_degrees": round(facial_measurements.get('head_yaw_degrees', 0), 1),
-                "head_roll_degrees": round(facial_measurements.get('head_roll_degrees', 0), 1),
-                "pixels_per_mm": round(facial_measurements.get('pixels_per_mm', 0), 3)
-            },
-            "recommended_products": {
-                "glasses": glasses_dimensions,
-                "hat": hat_dimensions
-            },
-            "measurement_accuracy": "high" if facial_measurements.get('pixels_per_mm', 0) > 0 else "low"
+            "error": "No face detected",
+            "calibration": None
+        }
+
+    facial_measurements = get_facial_measurements(landmarks_2d, landmarks_3d, frame.shape)
+    
+    if not facial_measurements:
+        return {
+            "error": "Could not calculate measurements",
+            "calibration": None
         }
-        
-    except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+
+    # Create custom product dimensions
+    custom_dimensions = {
+        'name': 'Calibrated Glasses',
+        'frame_width_mm': frame_width_mm,
+        'frame_height_mm': frame_height_mm,
+        'lens_width_mm': lens_width_mm,
+        'lens_height_mm': lens_height_mm,
+        'bridge_width_mm': bridge_width_mm,
+        'temple_length_mm': 140,  # Standard temple length
+        'fit_type': 'custom'
+    }
+
+    # Place glasses with custom dimensions
+    result_image, placement_info = place_product_with_measurements(
+        frame, get_glasses_accessory(), facial_measurements, 'glasses', custom_dimensions
+    )
+
+    # Encode result
+    _, buf = cv2.imencode(".jpg", result_image, [cv2.IMWRITE_JPEG_QUALITY, 80])
+    b64 = base64.b64encode(buf).decode("utf-8")
+
+    return {
+        "calibrated_image": b64,
+        "custom_dimensions": custom_dimensions,
+        "facial_measurements": {
+            "ipd_mm": round(facial_measurements.get('estimated_ipd_mm', 0), 1),
+            "face_width_mm": round(facial_measurements.get('face_width_mm', 0), 1),
+            "pixels_per_mm": round(facial_measurements.get('pixels_per_mm', 0), 3)
+        },
+        "placement_info": serialize_placement_info(placement_info),
+        "scaling_factor": round(facial_measurements.get('pixels_per_mm', 0) * custom_dimensions['frame_width_mm'], 1),
+        "status": "calibration_complete"
+    }
 
 @router.post("/calibrate-glasses")
 async def calibrate_glasses_dimensions(
@@ -779,153 +1465,116 @@ async def calibrate_glasses_dimensions(
 ):
     """Calibrate glasses dimensions for your specific glasses image"""
     try:
-        data = await file.read()
-        np_img = np.frombuffer(data, np.uint8)
-        frame = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
-        if frame is None:
+        data = await inference_executor.prepare_frame(await file.read())
+        response_data = await inference_executor.run(
+            _process_glasses_calibration, data, 
+            frame_width_mm, frame_height_mm, lens_width_mm, lens_height_mm, bridge_width_mm
+        )
+        if response_data is None:
             return JSONResponse(status_code=400, content={"error": "Invalid image"})
-
-        # Get facial landmarks and measurements
-        landmarks_2d, landmarks_3d = detect_face_landmarks_from_array(frame)
-        
-        if not landmarks_2d or not landmarks_3d:
-            return JSONResponse(content={
-                "error": "No face detected",
-                "calibration": None
-            })
-
-        facial_measurements = get_facial_measurements(landmarks_2d, landmarks_3d, frame.shape)
+        return response_data
         
-        if not facial_measurements:
-            return JSONResponse(content={
-                "error": "Could not calculate measurements",
-                "calibration": None
-            })
-
-        # Create custom product dimensions
-        custom_dimensions = {
-            'name': 'Calibrated Glasses',
-            'frame_width_mm': frame_width_mm,
-            'frame_height_mm': frame_height_mm,
-            'lens_width_mm': lens_width_mm,
-            'lens_height_mm': lens_height_mm,
-            'bridge_width_mm': bridge_width_mm,
-            'temple_length_mm': 140,  # Standard temple length
-            'fit_type': 'custom'
-        }
+    except InferenceQueueFull as e:
+        return JSONResponse(status_code=503, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
 
-        # Place glasses with custom dimensions
-        result_image, placement_info = place_product_with_measurements(
-            frame, 'glasses', facial_measurements, custom_dimensions
-        )
+def _process_debug_measurements(data):
+    """CPU-bound part of /debug-measurements, run on the inference executor. Returns None for an undecodable image."""
+    frame, _ = decode_image(data)
+    if frame is None:
+        return None
 
-        # Encode result
-        _, buf = cv2.imencode(".jpg", result_image, [cv2.IMWRITE_JPEG_QUALITY, 80])
-        b64 = base64.b64encode(buf).decode("utf-8")
+    # Get facial landmarks and measurements
+    landmarks_2d, landmarks_3d = detect_face_landmarks_from_array(frame)
+    
+    if landmarks_2d is None or landmarks_3d is None:
+        return {
+            "error": "No face detected",
+            "debug_info": None
+        }
 
+    # ENHANCED: MediaPipe landmarks confirmed by the face-validation detector
+    validation = validate_face(frame)
+    enhanced_detection = enhance_face_detection(landmarks_2d, validation)
+    
+    facial_measurements = get_facial_measurements(landmarks_2d, landmarks_3d, frame.shape)
+    
+    if not facial_measurements:
         return {
-            "calibrated_image": b64,
-            "custom_dimensions": custom_dimensions,
+            "error": "Could not calculate measurements",
+            "debug_info": None
+        }
+
+    # Calculate what the glasses size would be
+    pixels_per_mm = facial_measurements.get('pixels_per_mm', 0)
+    ipd_pixels = facial_measurements.get('ipd_pixels', 0)
+    ipd_mm = facial_measurements.get('estimated_ipd_mm', 63)
+    
+    # Test different frame sizes
+    test_frame_width_mm = 135  # Standard glasses width
+    test_frame_width_pixels = int(test_frame_width_mm * pixels_per_mm)
+    
+    # Calculate what the old method would give
+    eye_distance = ipd_pixels
+    old_method_width = int(eye_distance * 2.0)  # Old scaling method
+    
+    return {
+        "debug_info": {
+            "image_dimensions": {
+                "width": frame.shape[1],
+                "height": frame.shape[0]
+            },
+            "detection_methods": {
+                "mediapipe_success": landmarks_2d is not None and len(landmarks_2d) > 0,
+                "face_validation_backend": validation.backend,
+                "validation_face_detections": len(validation.faces),
+                "validation_objects_detected": len(validation.objects),
+                "enhanced_confidence": enhanced_detection['confidence'],
+                "validation_face_bbox": enhanced_detection['validation_face_bbox'],
+                "validation_face_score": enhanced_detection['validation_face_score']
+            },
             "facial_measurements": {
-                "ipd_mm": round(facial_measurements.get('estimated_ipd_mm', 0), 1),
-                "face_width_mm": round(facial_measurements.get('face_width_mm', 0), 1),
-                "pixels_per_mm": round(facial_measurements.get('pixels_per_mm', 0), 3)
+                "ipd_pixels": round(ipd_pixels, 2),
+                "ipd_mm": round(ipd_mm, 2),
+                "pixels_per_mm": round(pixels_per_mm, 4),
+                "face_width_pixels": round(facial_measurements.get('face_width_pixels', 0), 2),
+                "face_width_mm": round(facial_measurements.get('face_width_mm', 0), 2)
+            },
+            "scaling_comparison": {
+                "new_method_135mm_pixels": test_frame_width_pixels,
+                "old_method_pixels": old_method_width,
+                "scaling_ratio": round(test_frame_width_pixels / old_method_width, 2) if old_method_width > 0 else 0
             },
-            "placement_info": placement_info,
-            "scaling_factor": round(facial_measurements.get('pixels_per_mm', 0) * custom_dimensions['frame_width_mm'], 1),
-            "status": "calibration_complete"
+            "landmark_accuracy": {
+                "landmarks_detected": len(landmarks_2d) if landmarks_2d is not None else 0,
+                "key_points": {
+                    "left_eye_inner": landmarks_2d[FACIAL_LANDMARKS['left_eye_inner']].tolist() if landmarks_2d is not None else None,
+                    "right_eye_inner": landmarks_2d[FACIAL_LANDMARKS['right_eye_inner']].tolist() if landmarks_2d is not None else None,
+                    "eye_center": facial_measurements.get('eye_center'),
+                    "nose_bridge": facial_measurements.get('nose_bridge')
+                }
+            }
+        },
+        "recommendations": {
+            "if_glasses_too_small": "Increase pixels_per_mm calculation or use larger frame_width_mm",
+            "if_glasses_too_large": "Decrease pixels_per_mm calculation or use smaller frame_width_mm",
+            "optimal_frame_width_mm": round(ipd_mm * 1.1, 1),
+            "optimal_frame_height_mm": round(ipd_mm * 0.4, 1)
         }
-        
-    except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+    }
 
 @router.post("/debug-measurements")
 async def debug_facial_measurements(file: UploadFile = File(...)):
     """Debug endpoint to show detailed facial measurements and scaling"""
     try:
-        data = await file.read()
-        np_img = np.frombuffer(data, np.uint8)
-        frame = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
-        if frame is None:
+        data = await inference_executor.prepare_frame(await file.read())
+        response_data = await inference_executor.run(_process_debug_measurements, data)
+        if response_data is None:
             return JSONResponse(status_code=400, content={"error": "Invalid image"})
-
-        # Get facial landmarks and measurements
-        landmarks_2d, landmarks_3d = detect_face_landmarks_from_array(frame)
-        
-        if not landmarks_2d or not landmarks_3d:
-            return JSONResponse(content={
-                "error": "No face detected",
-                "debug_info": None
-            })
-
-        # ENHANCED: Use both MediaPipe and YOLO
-        yolo_face_detections = detect_face_yolo(frame)
-        yolo_objects = detect_objects_yolo(frame)
-        enhanced_detection = enhance_face_detection_with_yolo(frame, landmarks_2d)
-        
-        facial_measurements = get_facial_measurements(landmarks_2d, landmarks_3d, frame.shape)
-        
-        if not facial_measurements:
-            return JSONResponse(content={
-                "error": "Could not calculate measurements",
-                "debug_info": None
-            })
-
-        # Calculate what the glasses size would be
-        pixels_per_mm = facial_measurements.get('pixels_per_mm', 0)
-        ipd_pixels = facial_measurements.get('ipd_pixels', 0)
-        ipd_mm = facial_measurements.get('estimated_ipd_mm', 63)
-        
-        # Test different frame sizes
-        test_frame_width_mm = 135  # Standard glasses width
-        test_frame_width_pixels = int(test_frame_width_mm * pixels_per_mm)
-        
-        # Calculate what the old method would give
-        eye_distance = ipd_pixels
-        old_method_width = int(eye_distance * 2.0)  # Old scaling method
-        
-        return {
-            "debug_info": {
-                "image_dimensions": {
-                    "width": frame.shape[1],
-                    "height": frame.shape[0]
-                },
-                "detection_methods": {
-                    "mediapipe_success": landmarks_2d is not None and len(landmarks_2d) > 0,
-                    "yolo_face_detections": len(yolo_face_detections),
-                    "yolo_objects_detected": len(yolo_objects),
-                    "enhanced_confidence": enhanced_detection['confidence'],
-                    "yolo_face_bbox": enhanced_detection.get('yolo_face_bbox')
-                },
-                "facial_measurements": {
-                    "ipd_pixels": round(ipd_pixels, 2),
-                    "ipd_mm": round(ipd_mm, 2),
-                    "pixels_per_mm": round(pixels_per_mm, 4),
-                    "face_width_pixels": round(facial_measurements.get('face_width_pixels', 0), 2),
-                    "face_width_mm": round(facial_measurements.get('face_width_mm', 0), 2)
-                },
-                "scaling_comparison": {
-                    "new_method_135mm_pixels": test_frame_width_pixels,
-                    "old_method_pixels": old_method_width,
-                    "scaling_ratio": round(test_frame_width_pixels / old_method_width, 2) if old_method_width > 0 else 0
-                },
-                "landmark_accuracy": {
-                    "landmarks_detected": len(landmarks_2d) if landmarks_2d else 0,
-                    "key_points": {
-                        "left_eye_inner": landmarks_2d[FACIAL_LANDMARKS['left_eye_inner']] if landmarks_2d else None,
-                        "right_eye_inner": landmarks_2d[FACIAL_LANDMARKS['right_eye_inner']] if landmarks_2d else None,
-                        "eye_center": facial_measurements.get('eye_center'),
-                        "nose_bridge": facial_measurements.get('nose_bridge')
-                    }
-                }
-            },
-            "recommendations": {
-                "if_glasses_too_small": "Increase pixels_per_mm calculation or use larger frame_width_mm",
-                "if_glasses_too_large": "Decrease pixels_per_mm calculation or use smaller frame_width_mm",
-                "optimal_frame_width_mm": round(ipd_mm * 1.1, 1),
-                "optimal_frame_height_mm": round(ipd_mm * 0.4, 1)
-            }
-        }
+        return response_data
         
+    except InferenceQueueFull as e:
+        return JSONResponse(status_code=503, content={"error": str(e)})
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -0,0 +1,141 @@
+# api/services/accessory_store.py
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+
+from api.config import (
+    ACCESSORY_CACHE_MAX_BYTES,
+    ACCESSORY_MAX_DIMENSION,
+    ACCESSORY_STAT_INTERVAL_SECONDS
+)
+
+
+class _AccessoryEntry:
+    __slots__ = ("path", "image", "mtime_ns", "nbytes", "checked_at")
+
+    def __init__(self, path, image, mtime_ns, checked_at):
+        self.path = path
+        self.image = image
+        self.mtime_ns = mtime_ns
+        self.nbytes = image.nbytes if image is not None else 0
+        self.checked_at = checked_at
+
+
+class AccessoryStore:
+    """
+    Decoded accessory PNGs keyed by product id.
+
+    - Each PNG is decoded (cv2.IMREAD_UNCHANGED) and its alpha channel checked
+      once; later frames get the cached RGBA array. Images whose longest side
+      exceeds `max_dimension` are downscaled once at load time.
+    - Entries live in an LRU capped at `max_bytes` of decoded pixels.
+    - The file's mtime is re-checked at most every `stat_interval` seconds, so
+      edited product images are picked up without a stat on every frame.
+    - Missing files are cached as None for the same interval.
+
+    Returned arrays are shared between requests and marked read-only.
+    """
+
+    def __init__(self, max_bytes=ACCESSORY_CACHE_MAX_BYTES, max_dimension=ACCESSORY_MAX_DIMENSION,
+                 stat_interval=ACCESSORY_STAT_INTERVAL_SECONDS):
+        self.max_bytes = max_bytes
+        self.max_dimension = max_dimension
+        self.stat_interval = stat_interval
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, product_id, image_path):
+        """Return the decoded RGBA array for a product, or None if the file is missing/unreadable"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is not None and entry.path == image_path and now - entry.checked_at < self.stat_interval:
+                self._entries.move_to_end(product_id)
+                self._hits += 1
+                return entry.image
+
+        try:
+            mtime_ns = os.stat(image_path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is not None and entry.path == image_path and entry.mtime_ns == mtime_ns:
+                entry.checked_at = now
+                self._entries.move_to_end(product_id)
+                self._hits += 1
+                return entry.image
+            self._misses += 1
+
+        image = self._load(image_path) if mtime_ns is not None else None
+        if mtime_ns is None:
+            print(f"Warning: Accessory image file not found: {image_path}")
+
+        with self._lock:
+            self._remove(product_id)
+            entry = _AccessoryEntry(image_path, image, mtime_ns, now)
+            self._entries[product_id] = entry
+            self._total_bytes += entry.nbytes
+            self._evict()
+        return image
+
+    def _load(self, image_path):
+        image = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+        if image is None:
+            print(f"DEBUG: ERROR - Failed to load accessory image from {image_path}")
+            return None
+
+        # Validate the alpha channel once at load time instead of per frame
+        if len(image.shape) == 3 and image.shape[2] == 4:
+            print(f"DEBUG: Accessory loaded - {image_path}, Shape: {image.shape}, RGBA format")
+        else:
+            print(f"DEBUG: WARNING - Accessory {image_path} has no alpha channel - Shape: {image.shape}")
+
+        h, w = image.shape[:2]
+        if self.max_dimension and max(h, w) > self.max_dimension:
+            scale = self.max_dimension / max(h, w)
+            image = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+            print(f"DEBUG: Accessory {image_path} downscaled from {w}x{h} to {image.shape[1]}x{image.shape[0]}")
+
+        image.setflags(write=False)
+        return image
+
+    def _remove(self, product_id):
+        entry = self._entries.pop(product_id, None)
+        if entry is not None:
+            self._total_bytes -= entry.nbytes
+
+    def _evict(self):
+        # Always keep the most recently inserted entry, even if it alone exceeds the cap
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.nbytes
+            self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        """Cache usage for the debug endpoint"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions
+            }
+
+
+accessory_store = AccessoryStore()
@@ -0,0 +1,73 @@
+# api/services/face_roi.py
+import cv2
+import numpy as np
+
+from api.config import (
+    ROI_CROP_ENABLED,
+    ROI_EXPAND,
+    ROI_MAX_COVERAGE
+)
+from api.services.mediapipe_service import detect_face_landmarks_from_array, landmarks_to_pixels
+from api.utils.session_registry import SessionRegistry
+
+# Regions of interest are normalized (x0, y0, x1, y1) boxes in [0, 1], so the
+# same ROI applies to the decoded frame and to any resized copy of it.
+
+
+def roi_from_landmarks(landmarks_3d, image_shape, expand=ROI_EXPAND, max_coverage=ROI_MAX_COVERAGE):
+    """
+    Square (in pixels) box around the detected face, grown by `expand`, as a
+    normalized ROI for the next frame. Returns None when cropping is disabled,
+    there is no face, or the box would cover most of the frame anyway.
+    """
+    if not ROI_CROP_ENABLED or landmarks_3d is None or not len(landmarks_3d):
+        return None
+    h, w = image_shape[:2]
+    min_x, min_y = landmarks_3d[:, :2].min(axis=0).tolist()
+    max_x, max_y = landmarks_3d[:, :2].max(axis=0).tolist()
+    center_x = (min_x + max_x) / 2 * w
+    center_y = (min_y + max_y) / 2 * h
+    side = max((max_x - min_x) * w, (max_y - min_y) * h) * expand
+    if side <= 0:
+        return None
+
+    x0 = max(0.0, (center_x - side / 2) / w)
+    y0 = max(0.0, (center_y - side / 2) / h)
+    x1 = min(1.0, (center_x + side / 2) / w)
+    y1 = min(1.0, (center_y + side / 2) / h)
+    if x1 <= x0 or y1 <= y0 or (x1 - x0) * (y1 - y0) > max_coverage:
+        return None
+    return (x0, y0, x1, y1)
+
+
+def detect_face_landmarks_in_roi(image_bgr, roi, output_shape, max_size=None, face_mesh=None):
+    """
+    Run FaceMesh on the ROI crop of `image_bgr` (normally the full-resolution
+    decoded frame, so the face gets more detector pixels than in the
+    downscaled frame) and map the landmarks back to whole-frame coordinates:
+    landmarks_2d in pixels of `output_shape`, landmarks_3d normalized to the
+    whole frame (z rescaled with x, so yaw is unchanged).
+    Returns (None, None) if no face is found in the crop.
+    """
+    h, w = image_bgr.shape[:2]
+    x0, y0 = int(roi[0] * w), int(roi[1] * h)
+    x1, y1 = max(x0 + 1, int(roi[2] * w)), max(y0 + 1, int(roi[3] * h))
+    crop = image_bgr[y0:y1, x0:x1]
+    crop_w, crop_h = x1 - x0, y1 - y0
+    if max_size and max(crop_w, crop_h) > max_size:
+        scale = max_size / max(crop_w, crop_h)
+        crop = cv2.resize(crop, (max(1, int(crop_w * scale)), max(1, int(crop_h * scale))),
+                          interpolation=cv2.INTER_AREA)
+
+    _, crop_landmarks_3d = detect_face_landmarks_from_array(crop, face_mesh)
+    if crop_landmarks_3d is None:
+        return None, None
+
+    x_scale, y_scale = crop_w / w, crop_h / h
+    landmarks_3d = crop_landmarks_3d * np.array((x_scale, y_scale, x_scale), dtype=np.float32)
+    landmarks_3d[:, :2] += np.array((x0 / w, y0 / h), dtype=np.float32)
+    return landmarks_to_pixels(landmarks_3d, output_shape), landmarks_3d
+
+
+# Last face ROI per /tryon session id, for clients that stream over HTTP
+roi_registry = SessionRegistry()
@@ -0,0 +1,151 @@
+# api/services/face_validation.py
+import cv2
+
+from api.config import (
+    FACE_VALIDATION_BACKEND,
+    FACE_DETECTOR_INPUT_SIZE,
+    FACE_DETECTOR_MIN_CONFIDENCE,
+    FACE_DETECTOR_POOL_SIZE
+)
+from api.services.graph_pool import GraphPool
+from api.services.model_registry import model_registry
+from api.services.yolo_service import get_yolo_model, run_yolo_detection, warm_up_yolo
+
+FACE_VALIDATION_BACKENDS = ("mediapipe", "yolo")
+
+
+def create_face_detector():
+    """MediaPipe short-range face detector (faces within ~2 m of the camera, i.e. webcam shots)"""
+    # Imported on first use, like the FaceMesh graphs
+    import mediapipe as mp
+    return mp.solutions.face_detection.FaceDetection(
+        model_selection=0,
+        min_detection_confidence=FACE_DETECTOR_MIN_CONFIDENCE
+    )
+
+
+# MediaPipe face detectors shared by the one-shot endpoints
+face_detector_pool = GraphPool(create_face_detector, FACE_DETECTOR_POOL_SIZE, "face detector")
+
+
+def warm_up_face_detectors(image_bgr):
+    """Run one frame through every idle face detector"""
+    face_detector_pool.for_each_idle(lambda detector: detect_faces(detector, image_bgr))
+
+
+class FaceValidationResult:
+    """
+    Output of the face-validation stage for one frame, whichever backend ran.
+    `faces` are dicts with 'bbox' ([x1, y1, x2, y2] in frame pixels),
+    'confidence' and 'class_name' ('face' for the face detector, 'person' for
+    YOLO), best first; `objects` are all detections (YOLO) or the faces.
+    """
+
+    __slots__ = ("backend", "faces", "objects")
+
+    def __init__(self, backend, faces, objects=None):
+        self.backend = backend
+        self.faces = faces
+        self.objects = faces if objects is None else objects
+
+    def face_region(self):
+        """Bounding box of the highest confidence face, or None"""
+        return self.faces[0]['bbox'] if self.faces else None
+
+    def face_score(self):
+        return self.faces[0]['confidence'] if self.faces else None
+
+
+def detect_faces(detector, image_bgr):
+    """Run `detector` on a downscaled copy of the frame; faces in full-frame pixels, best first"""
+    height, width = image_bgr.shape[:2]
+    scale = FACE_DETECTOR_INPUT_SIZE / max(height, width)
+    small = image_bgr
+    if scale < 1:
+        small = cv2.resize(image_bgr, (max(1, int(width * scale)), max(1, int(height * scale))),
+                           interpolation=cv2.INTER_LINEAR)
+    results = detector.process(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+
+    faces = []
+    for detection in results.detections or []:
+        # Relative box, so it maps straight back to the full frame
+        box = detection.location_data.relative_bounding_box
+        x1 = min(max(int(box.xmin * width), 0), width)
+        y1 = min(max(int(box.ymin * height), 0), height)
+        x2 = min(max(int((box.xmin + box.width) * width), 0), width)
+        y2 = min(max(int((box.ymin + box.height) * height), 0), height)
+        faces.append({'bbox': [x1, y1, x2, y2], 'confidence': float(detection.score[0]), 'class_name': 'face'})
+    faces.sort(key=lambda face: face['confidence'], reverse=True)
+    return faces
+
+
+def _unknown_backend_message(backend):
+    return f"Unknown face validation backend: {backend} (expected one of {list(FACE_VALIDATION_BACKENDS)})"
+
+
+def _reject_unknown_backend():
+    raise ValueError(_unknown_backend_message(FACE_VALIDATION_BACKEND))
+
+
+def validate_face(image, backend=FACE_VALIDATION_BACKEND):
+    """
+    Run the configured face-validation detector on a BGR frame.
+    Returns: FaceValidationResult (no faces if detection fails)
+    """
+    if backend == "yolo":
+        yolo_result = run_yolo_detection(image)
+        faces = sorted(yolo_result.faces, key=lambda face: face['confidence'], reverse=True)
+        return FaceValidationResult("yolo", faces, yolo_result.objects)
+    if backend != "mediapipe":
+        raise ValueError(_unknown_backend_message(backend))
+    try:
+        with face_detector_pool.borrow() as detector:
+            return FaceValidationResult("mediapipe", detect_faces(detector, image))
+    except Exception as e:
+        print(f"Face detection error: {e}")
+        return FaceValidationResult("mediapipe", [])
+
+
+def enhance_face_detection(mediapipe_landmarks, validation):
+    """
+    Combine the FaceMesh landmarks with the face-validation result
+    Returns: enhanced face detection info
+    """
+    mediapipe_success = mediapipe_landmarks is not None and len(mediapipe_landmarks) > 0
+    face_bbox = validation.face_region()
+
+    enhanced_info = {
+        'mediapipe_success': mediapipe_success,
+        'validation_backend': validation.backend,
+        'validation_face_detected': face_bbox is not None,
+        'validation_face_bbox': face_bbox,
+        'validation_face_score': validation.face_score(),
+        'combined_detection': mediapipe_success and face_bbox is not None
+    }
+
+    # If both detections agree, we have high confidence
+    if enhanced_info['combined_detection']:
+        enhanced_info['confidence'] = 'high'
+    elif mediapipe_success or face_bbox is not None:
+        enhanced_info['confidence'] = 'medium'
+    else:
+        enhanced_info['confidence'] = 'low'
+    return enhanced_info
+
+
+def face_validation_stats():
+    """Backend and detector pool usage for the debug endpoint"""
+    stats = {"backend": FACE_VALIDATION_BACKEND}
+    if FACE_VALIDATION_BACKEND == "mediapipe":
+        stats["face_detector_pool"] = face_detector_pool.stats()
+    return stats
+
+
+# Only the selected backend's model is loaded and warmed up at startup
+if FACE_VALIDATION_BACKEND == "yolo":
+    model_registry.register("yolo", get_yolo_model, warm_up_yolo)
+elif FACE_VALIDATION_BACKEND == "mediapipe":
+    model_registry.register("face_detector", face_detector_pool.preload, warm_up_face_detectors)
+else:
+    # A typo in the setting is reported by /ready (and keeps it at 503) rather than stopping the app
+    model_registry.register("face_validation", _reject_unknown_backend)
@@ -0,0 +1,99 @@
+# api/services/graph_pool.py
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class GraphPool:
+    """
+    Bounded pool of model graphs (MediaPipe graphs must not run two frames at
+    once). Graphs are built lazily by `factory` up to `size`, reused across
+    requests, and borrowed with `borrow()`; callers block while all are busy.
+    """
+
+    def __init__(self, factory, size, name="graph"):
+        self.factory = factory
+        self.size = max(1, size)
+        self.name = name
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._in_use = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def borrow(self, timeout=None):
+        """Borrow a graph; blocks while all of them are busy"""
+        graph = self._acquire(timeout)
+        try:
+            yield graph
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._idle.put(graph)
+
+    def _acquire(self, timeout):
+        with self._lock:
+            try:
+                graph = self._idle.get_nowait()
+                self._in_use += 1
+                return graph
+            except queue.Empty:
+                pass
+            create_new = self._created < self.size
+            if create_new:
+                # Reserve the slot before building the graph outside the lock
+                self._created += 1
+                self._in_use += 1
+
+        if create_new:
+            try:
+                return self.factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                    self._in_use -= 1
+                raise
+
+        try:
+            graph = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No {self.name} available in the pool")
+        with self._lock:
+            self._in_use += 1
+        return graph
+
+    def preload(self, count=None):
+        """Create graphs up to `count` (default: the pool size) ahead of the first request"""
+        count = self.size if count is None else min(count, self.size)
+        while True:
+            with self._lock:
+                if self._created >= count:
+                    return
+                self._created += 1
+            try:
+                graph = self.factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            self._idle.put(graph)
+
+    def for_each_idle(self, fn):
+        """Call fn(graph) on every idle graph (e.g. to warm them up); busy ones are skipped"""
+        graphs = []
+        while True:
+            try:
+                graphs.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            for graph in graphs:
+                fn(graph)
+        finally:
+            for graph in graphs:
+                self._idle.put(graph)
+
+    def stats(self):
+        """Pool usage for the debug endpoint"""
+        with self._lock:
+            return {"pool_size": self.size, "created": self._created, "in_use": self._in_use}
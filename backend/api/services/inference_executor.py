@@ -0,0 +1,154 @@
+# api/services/inference_executor.py
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from api.config import EXECUTOR_KIND, EXECUTOR_WORKERS, EXECUTOR_MAX_QUEUE
+from api.services.metrics import call_with_usage, record_child_usage
+from api.utils.image_decode import decode_frame
+
+
+class InferenceQueueFull(RuntimeError):
+    """Raised when the executor already holds its maximum number of pending jobs"""
+
+
+class InferenceExecutor:
+    """
+    Runs CPU-bound CV work (decode, MediaPipe, YOLO, blending, encode) off the
+    asyncio event loop.
+
+    - kind="thread": everything runs on a thread pool. OpenCV, MediaPipe and
+      PyTorch release the GIL inside their native code, so frames from
+      different clients overlap across cores.
+    - kind="process": stateless jobs run on a process pool. Jobs that hold
+      per-session objects (e.g. a tracking FaceMesh) cannot be pickled and are
+      submitted with stateful=True, which always uses the thread pool. Its
+      processes are spawned, not forked: the pool starts after the models,
+      batcher and monitor threads are up, and forking a process holding
+      threads and OpenMP state can deadlock the child.
+    - kind="workers": jobs run on inference worker processes that hold their
+      own models (api/services/worker_pool.py). Frames decoded here by
+      prepare_frame() reach the worker through shared memory, and a realtime
+      session's jobs (`session_id`) stick to the worker keeping its tracker.
+      stateful=True jobs still run on the local thread pool.
+
+    At most `max_workers + max_queue` jobs may be in flight; beyond that `run`
+    raises InferenceQueueFull instead of letting latency grow without bound.
+    """
+
+    def __init__(self, kind=EXECUTOR_KIND, max_workers=EXECUTOR_WORKERS, max_queue=EXECUTOR_MAX_QUEUE):
+        if kind not in ("thread", "process", "workers"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.max_queue = max(0, max_queue)
+        self._thread_pool = None
+        self._process_pool = None
+        self._worker_pool = None
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    @property
+    def capacity(self):
+        return self.max_workers + self.max_queue
+
+    def _get_thread_pool(self):
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="inference"
+            )
+        return self._thread_pool
+
+    def _get_process_pool(self):
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._process_pool
+
+    def _get_worker_pool(self):
+        if self._worker_pool is None:
+            from api.services.worker_pool import WorkerPool
+            self._worker_pool = WorkerPool(self.max_workers)
+        return self._worker_pool
+
+    def start_workers(self):
+        """Start the inference worker processes and wait for their models (kind="workers"); blocking"""
+        self._get_worker_pool().start()
+
+    async def run(self, fn, *args, stateful=False, session_id=None, **kwargs):
+        """
+        Run fn(*args, **kwargs) on the pool and await its result.
+        `session_id` (kind="workers" only) routes the job to the worker holding
+        that session's tracker, which it receives as `landmark_tracker`.
+        """
+        if self._pending >= self.capacity:
+            self._rejected += 1
+            raise InferenceQueueFull(
+                f"Inference queue full ({self._pending} jobs pending, capacity {self.capacity})"
+            )
+
+        self._pending += 1
+        try:
+            if self.kind == "workers" and not stateful:
+                return await self._get_worker_pool().run(fn, args, kwargs, session_id)
+            loop = asyncio.get_running_loop()
+            if self.kind == "process" and not stateful:
+                # The child's CPU time and metrics (e.g. YOLO batch sizes) come back with the result
+                result, usage = await loop.run_in_executor(
+                    self._get_process_pool(), functools.partial(call_with_usage, fn, args, kwargs)
+                )
+                record_child_usage(usage)
+                return result
+            return await loop.run_in_executor(self._get_thread_pool(), functools.partial(fn, *args, **kwargs))
+        finally:
+            self._pending -= 1
+            self._completed += 1
+
+    async def prepare_frame(self, data, min_side=None):
+        """
+        With kind="workers", decode an uploaded frame (bytes or base64 text) on
+        the local thread pool, so the pixels go to a worker in shared memory
+        rather than the worker decoding them; other kinds return `data` for the
+        pipeline to decode itself. `min_side` is decode_image()'s reduced-decode size.
+        """
+        if self.kind != "workers":
+            return data
+        return await self.run(decode_frame, data, min_side, stateful=True)
+
+    def close_session(self, session_id):
+        """Release a realtime session's worker-side tracker (kind="workers")"""
+        if self._worker_pool is not None:
+            self._worker_pool.close_session(session_id)
+
+    def shutdown(self):
+        """Stop the worker pools; called from the application lifespan"""
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        if self._worker_pool is not None:
+            self._worker_pool.shutdown()
+            self._worker_pool = None
+
+    def stats(self):
+        """Queue usage for the debug endpoint"""
+        stats = {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "completed": self._completed,
+            "rejected": self._rejected
+        }
+        if self._worker_pool is not None:
+            stats["worker_pool"] = self._worker_pool.stats()
+        return stats
+
+
+inference_executor = InferenceExecutor()
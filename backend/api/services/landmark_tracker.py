@@ -0,0 +1,153 @@
+# api/services/landmark_tracker.py
+import cv2
+import numpy as np
+
+from api.config import (
+    LANDMARK_TRACKING_ENABLED,
+    TRACKING_MAX_KEYFRAME_INTERVAL,
+    TRACKING_MOTION_THRESHOLD,
+    TRACKING_MAX_FB_ERROR
+)
+from api.services.mediapipe_service import detect_face_landmarks_from_array, FACIAL_LANDMARKS
+
+# Only the landmarks get_facial_measurements reads are propagated between keyframes
+TRACKED_INDICES = np.array(sorted(set(FACIAL_LANDMARKS.values())))
+# Face width reference (cheek to cheek) used to normalize motion
+_LEFT_CHEEK = int(np.flatnonzero(TRACKED_INDICES == FACIAL_LANDMARKS['left_cheek'])[0])
+_RIGHT_CHEEK = int(np.flatnonzero(TRACKED_INDICES == FACIAL_LANDMARKS['right_cheek'])[0])
+
+# Share of tracked points that must survive the forward-backward check
+MIN_TRACKED_FRACTION = 0.8
+
+LK_PARAMS = dict(
+    winSize=(15, 15),
+    maxLevel=3,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+)
+
+
+class LandmarkTracker:
+    """
+    Landmark source for one realtime session.
+
+    Full MediaPipe FaceMesh runs on keyframes only. In between, the
+    FACIAL_LANDMARKS points are propagated with pyramidal Lucas-Kanade flow
+    from the previous frame; their normalized 3D x/y follow the 2D points and
+    depth stays at the keyframe value. Other landmarks keep their keyframe
+    positions, which is enough for get_facial_measurements.
+
+    A keyframe is forced when tracking is disabled, no face was found last
+    time, the frame size changes, or too many points fail the
+    forward-backward check. Otherwise the keyframe interval adapts to motion:
+    fast head movement shortens it (down to every frame), a still head
+    lengthens it up to `max_interval`.
+
+    Keyframes always give the session's tracking-mode FaceMesh the whole
+    frame: the graph already restricts its search to the face it tracked last
+    time, in its own image coordinates, so feeding it shifting crops (or a
+    second full-frame pass on a miss) would throw that prior away. ROI crops
+    are for the one-shot static graphs (see face_roi).
+
+    Not thread-safe; a session processes one frame at a time.
+    """
+
+    def __init__(self, face_mesh, enabled=LANDMARK_TRACKING_ENABLED, max_interval=TRACKING_MAX_KEYFRAME_INTERVAL,
+                 motion_threshold=TRACKING_MOTION_THRESHOLD, max_fb_error=TRACKING_MAX_FB_ERROR):
+        self.face_mesh = face_mesh
+        self.enabled = enabled and max_interval > 1
+        self.max_interval = max(1, max_interval)
+        self.motion_threshold = motion_threshold
+        self.max_fb_error = max_fb_error
+        self.interval = min(2, self.max_interval)
+        self.keyframes = 0
+        self.tracked_frames = 0
+        self._reset()
+
+    def _reset(self):
+        self._prev_gray = None
+        self._points = None
+        self._landmarks_2d = None
+        self._landmarks_3d = None
+        self._since_keyframe = 0
+
+    def process(self, image_bgr):
+        """
+        Landmarks for the next frame of the stream, in `image_bgr` coordinates.
+        Returns: landmarks_2d, landmarks_3d (None, None without a face), and
+        whether this frame was a full-detection keyframe
+        """
+        gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY) if self.enabled else None
+
+        if self._needs_keyframe(gray):
+            return self._keyframe(image_bgr, gray)
+
+        landmarks = self._track(gray, image_bgr.shape)
+        if landmarks is None:
+            # Lost the points: fall back to full detection on this same frame
+            self.interval = 1
+            return self._keyframe(image_bgr, gray)
+        self.tracked_frames += 1
+        return landmarks[0], landmarks[1], False
+
+    def _needs_keyframe(self, gray):
+        return (
+            not self.enabled
+            or self._prev_gray is None
+            or self._prev_gray.shape != gray.shape
+            or self._since_keyframe >= self.interval
+        )
+
+    def _keyframe(self, image_bgr, gray):
+        self.keyframes += 1
+        landmarks_2d, landmarks_3d = detect_face_landmarks_from_array(image_bgr, self.face_mesh)
+        if not self.enabled or landmarks_2d is None or landmarks_3d is None:
+            self._reset()
+            return landmarks_2d, landmarks_3d, True
+
+        self._prev_gray = gray
+        self._points = landmarks_2d[TRACKED_INDICES].astype(np.float32).reshape(-1, 1, 2)
+        self._landmarks_2d = landmarks_2d.copy()
+        self._landmarks_3d = landmarks_3d.copy()
+        self._since_keyframe = 0
+        return landmarks_2d, landmarks_3d, True
+
+    def _track(self, gray, image_shape):
+        points, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, self._points, None, **LK_PARAMS)
+        if points is None:
+            return None
+        # Forward-backward check: flow back to the previous frame should land on the start point
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._prev_gray, points, None, **LK_PARAMS)
+        if back is None:
+            return None
+        fb_error = np.linalg.norm((back - self._points).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error <= self.max_fb_error)
+        if good.mean() < MIN_TRACKED_FRACTION:
+            return None
+
+        # Points that failed keep their previous position shifted by the median motion of the good ones
+        displacement = (points - self._points).reshape(-1, 2)
+        median_motion = np.median(displacement[good], axis=0)
+        new_points = np.where(good[:, None], points.reshape(-1, 2), self._points.reshape(-1, 2) + median_motion)
+
+        self._adapt_interval(displacement[good], new_points)
+
+        h, w = image_shape[:2]
+        self._landmarks_2d[TRACKED_INDICES] = new_points.astype(np.int32)
+        self._landmarks_3d[TRACKED_INDICES, :2] = new_points / (w, h)
+
+        self._prev_gray = gray
+        self._points = new_points.astype(np.float32).reshape(-1, 1, 2)
+        self._since_keyframe += 1
+        # Callers may keep the returned arrays; hand out copies
+        return self._landmarks_2d.copy(), self._landmarks_3d.copy()
+
+    def _adapt_interval(self, good_displacement, points):
+        face_width = float(np.linalg.norm(points[_RIGHT_CHEEK] - points[_LEFT_CHEEK]))
+        if face_width < 1.0:
+            return
+        motion = float(np.median(np.linalg.norm(good_displacement, axis=1))) / face_width
+        if motion > self.motion_threshold:
+            # Fast movement: flow drifts more, so re-detect sooner
+            self.interval = max(1, self.interval // 2)
+        elif motion < self.motion_threshold / 2:
+            self.interval = min(self.max_interval, self.interval + 1)
@@ -1,18 +1,102 @@
 # api/services/mediapipe_service.py
 import cv2
-import mediapipe as mp
 import numpy as np
 import math
+import threading
 
-mp_face_mesh = mp.solutions.face_mesh
-# Enhanced settings for accurate measurements
-face_mesh = mp_face_mesh.FaceMesh(
-    static_image_mode=False,
-    max_num_faces=1, 
-    refine_landmarks=True,  # Enable iris detection for better accuracy
-    min_detection_confidence=0.5,  # Higher threshold for accuracy
-    min_tracking_confidence=0.5
-)
+from api.config import FACE_MESH_STATIC_POOL_SIZE, FACE_MESH_MAX_SESSIONS
+from api.services.graph_pool import GraphPool
+from api.services.model_registry import model_registry
+
+def create_face_mesh(static_image_mode):
+    """Create a FaceMesh graph with the enhanced settings used for accurate measurements"""
+    # Imported on first use, so the measurement helpers load (and benchmark) without the MediaPipe runtime
+    import mediapipe as mp
+    return mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=static_image_mode,
+        max_num_faces=1, 
+        refine_landmarks=True,  # Enable iris detection for better accuracy
+        min_detection_confidence=0.5,  # Higher threshold for accuracy
+        min_tracking_confidence=0.5
+    )
+
+class FaceMeshManager:
+    """
+    Hands out FaceMesh graphs so that no two callers share tracking state.
+
+    - One-shot endpoints borrow a static_image_mode=True graph from a bounded
+      pool (created lazily, reused across requests).
+    - Each WebSocket session owns a tracking-mode graph for its lifetime,
+      released when the session disconnects.
+    """
+
+    def __init__(self, static_pool_size=FACE_MESH_STATIC_POOL_SIZE, max_sessions=FACE_MESH_MAX_SESSIONS):
+        self._static_pool = GraphPool(
+            lambda: create_face_mesh(static_image_mode=True), static_pool_size, "FaceMesh instance"
+        )
+        self.static_pool_size = self._static_pool.size
+        self.max_sessions = max(1, max_sessions)
+        self._sessions = set()
+        # Sessions whose graph is being created (counted against max_sessions)
+        self._sessions_reserved = 0
+        self._lock = threading.Lock()
+
+    def static_face_mesh(self, timeout=None):
+        """Borrow a static-image FaceMesh (context manager); blocks while all pool members are busy"""
+        return self._static_pool.borrow(timeout)
+
+    def open_session(self):
+        """Create a tracking-mode FaceMesh owned by a single streaming session"""
+        with self._lock:
+            if len(self._sessions) + self._sessions_reserved >= self.max_sessions:
+                raise RuntimeError(f"FaceMesh session limit reached ({self.max_sessions})")
+            # Reserve the session before building the graph outside the lock
+            self._sessions_reserved += 1
+        try:
+            face_mesh = create_face_mesh(static_image_mode=False)
+        except Exception:
+            with self._lock:
+                self._sessions_reserved -= 1
+            raise
+        with self._lock:
+            self._sessions_reserved -= 1
+            self._sessions.add(face_mesh)
+        return face_mesh
+
+    def close_session(self, face_mesh):
+        """Release the tracking graph of a finished session"""
+        if face_mesh is None:
+            return
+        with self._lock:
+            self._sessions.discard(face_mesh)
+        try:
+            face_mesh.close()
+        except Exception as e:
+            print(f"FaceMesh close error: {e}")
+
+    def preload(self, count=None):
+        """Create static-image graphs up to `count` (default: the pool size) ahead of the first request"""
+        self._static_pool.preload(count)
+
+    def warm_up(self, image_bgr):
+        """Run one frame through every idle static-image graph (the first inferences initialize a graph)"""
+        rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
+        self._static_pool.for_each_idle(lambda face_mesh: face_mesh.process(rgb))
+
+    def stats(self):
+        """Pool usage for the debug endpoint"""
+        static = self._static_pool.stats()
+        with self._lock:
+            return {
+                "static_pool_size": static["pool_size"],
+                "static_created": static["created"],
+                "static_in_use": static["in_use"],
+                "active_sessions": len(self._sessions) + self._sessions_reserved,
+                "max_sessions": self.max_sessions
+            }
+
+face_mesh_manager = FaceMeshManager()
+model_registry.register("face_mesh", face_mesh_manager.preload, face_mesh_manager.warm_up)
 
 # Comprehensive landmark indices for accurate measurements
 FACIAL_LANDMARKS = {
@@ -54,57 +138,130 @@ FACIAL_LANDMARKS = {
     'right_eye_bottom': 374
 }
 
-def detect_face_landmarks_from_array(image_bgr):
-    """Enhanced face landmark detection with comprehensive measurements"""
+# Pixel distances get_facial_measurements needs, computed together in one vectorized step
+_DISTANCE_PAIRS = np.array([
+    (FACIAL_LANDMARKS['left_eye_inner'], FACIAL_LANDMARKS['right_eye_inner']),  # IPD
+    (FACIAL_LANDMARKS['left_cheek'], FACIAL_LANDMARKS['right_cheek']),  # face width
+    (FACIAL_LANDMARKS['head_top_left'], FACIAL_LANDMARKS['head_top_right']),  # head top width
+    (FACIAL_LANDMARKS['head_top_center'], FACIAL_LANDMARKS['chin'])  # head height
+])
+# Anchor points copied into the measurements (as Python int tuples, for cv2 drawing and JSON)
+_ANCHOR_INDICES = [
+    FACIAL_LANDMARKS['left_eye_inner'],
+    FACIAL_LANDMARKS['right_eye_inner'],
+    FACIAL_LANDMARKS['left_eye_outer'],
+    FACIAL_LANDMARKS['right_eye_outer'],
+    FACIAL_LANDMARKS['nose_bridge'],
+    FACIAL_LANDMARKS['center_forehead'],
+    FACIAL_LANDMARKS['head_top_center']
+]
+_EAR_INDICES = [FACIAL_LANDMARKS['left_ear'], FACIAL_LANDMARKS['right_ear']]
+
+
+class FacialMeasurements:
+    """
+    Measurements of one detected face.
+
+    A slotted record instead of a per-frame dict. It keeps the mapping
+    interface the placement code uses (m['key'], m.get(), 'key' in m,
+    m['key'] = value, keys()); to_dict() returns a plain copy for JSON.
+    Fields that were never set behave like missing dict keys.
+    """
+
+    __slots__ = (
+        'ipd_pixels', 'pixels_per_mm', 'pixels_per_mm_scaled', 'estimated_ipd_mm',
+        'face_width_pixels', 'face_width_mm',
+        'head_yaw_radians', 'head_yaw_degrees', 'head_roll_radians', 'head_roll_degrees',
+        'eye_center', 'nose_bridge', 'forehead_center', 'head_top_center',
+        'head_top_width_pixels', 'head_height_pixels', 'head_width_mm', 'head_height_mm',
+        # Set by the routes after face validation
+        'face_validation', 'face_validation_backend', 'face_validation_bbox', 'face_validation_score'
+    )
+
+    def __init__(self, **values):
+        for key, value in values.items():
+            self[key] = value
+
+    def __getitem__(self, key):
+        if key not in _MEASUREMENT_FIELDS:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in _MEASUREMENT_FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in _MEASUREMENT_FIELDS and hasattr(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return [key for key in self.__slots__ if hasattr(self, key)]
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.keys()}
+
+
+_MEASUREMENT_FIELDS = frozenset(FacialMeasurements.__slots__)
+
+
+def landmarks_to_pixels(landmarks_3d, image_shape):
+    """int32 (N, 2) pixel coordinates of normalized landmarks in an image of `image_shape`"""
+    h, w = image_shape[:2]
+    return (landmarks_3d[:, :2] * np.array((w, h), dtype=np.float32)).astype(np.int32)
+
+
+def detect_face_landmarks_from_array(image_bgr, face_mesh=None):
+    """
+    Enhanced face landmark detection with comprehensive measurements.
+
+    Pass a session's tracking-mode `face_mesh` for streaming; without one a
+    static-image graph is borrowed from the shared pool for this call.
+    Returns: landmarks_2d as an int32 (478, 2) pixel array and landmarks_3d as
+    a float32 (478, 3) array of normalized (x, y, z), or (None, None) without a face
+    """
     if image_bgr is None:
         raise ValueError("Empty image passed to detect_face_landmarks_from_array")
 
     rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
-    results = face_mesh.process(rgb)
+    if face_mesh is not None:
+        results = face_mesh.process(rgb)
+    else:
+        with face_mesh_manager.static_face_mesh() as pooled_face_mesh:
+            results = pooled_face_mesh.process(rgb)
     
     if not results.multi_face_landmarks:
         return None, None
 
-    h, w = image_bgr.shape[:2]
-    landmarks_2d = []
-    landmarks_3d = []
-    
-    # Extract both 2D and 3D landmarks
-    for lm in results.multi_face_landmarks[0].landmark:
-        x_2d = int(lm.x * w)
-        y_2d = int(lm.y * h)
-        landmarks_2d.append((x_2d, y_2d))
-        
-        # 3D coordinates (x, y, z) where z is depth
-        landmarks_3d.append((lm.x, lm.y, lm.z))
-    
-    return landmarks_2d, landmarks_3d
+    # 3D coordinates (x, y, z) where z is depth; 2D pixels are derived from them
+    landmarks_3d = np.array(
+        [(lm.x, lm.y, lm.z) for lm in results.multi_face_landmarks[0].landmark], dtype=np.float32
+    )
+    return landmarks_to_pixels(landmarks_3d, image_bgr.shape), landmarks_3d
 
 def get_facial_measurements(landmarks_2d, landmarks_3d, image_shape):
     """Calculate comprehensive facial measurements for accurate product placement"""
-    if not landmarks_2d or not landmarks_3d:
+    if landmarks_2d is None or landmarks_3d is None or not len(landmarks_2d) or not len(landmarks_3d):
         return None
     
-    h, w = image_shape[:2]
-    
-    # Extract key landmark points
-    measurements = {}
-    
-    # Eye measurements
-    left_eye_outer = landmarks_2d[FACIAL_LANDMARKS['left_eye_outer']]
-    left_eye_inner = landmarks_2d[FACIAL_LANDMARKS['left_eye_inner']]
-    right_eye_outer = landmarks_2d[FACIAL_LANDMARKS['right_eye_outer']]
-    right_eye_inner = landmarks_2d[FACIAL_LANDMARKS['right_eye_inner']]
-    
-    # Calculate interpupillary distance (IPD) - actual eye distance
-    ipd_pixels = math.sqrt((right_eye_inner[0] - left_eye_inner[0])**2 + 
-                          (right_eye_inner[1] - left_eye_inner[1])**2)
-    
-    # Face width measurement (cheek to cheek)
-    left_cheek = landmarks_2d[FACIAL_LANDMARKS['left_cheek']]
-    right_cheek = landmarks_2d[FACIAL_LANDMARKS['right_cheek']]
-    face_width_pixels = math.sqrt((right_cheek[0] - left_cheek[0])**2 + 
-                                 (right_cheek[1] - left_cheek[1])**2)
+    # Eye, nose, forehead and head top points
+    (left_eye_inner, right_eye_inner, left_eye_outer, right_eye_outer,
+     nose_bridge, center_forehead, head_top_center) = map(tuple, landmarks_2d[_ANCHOR_INDICES].tolist())
+
+    # IPD (actual eye distance), face width (cheek to cheek), head width at the top, head height (top to chin)
+    deltas = (landmarks_2d[_DISTANCE_PAIRS[:, 1]] - landmarks_2d[_DISTANCE_PAIRS[:, 0]]).astype(np.float64)
+    ipd_pixels, face_width_pixels, head_top_width_pixels, head_height_pixels = np.hypot(
+        deltas[:, 0], deltas[:, 1]
+    ).tolist()
     
     # FIXED: Better scaling calculation based on face proportions
     # Instead of using fixed IPD assumptions, use face width as reference
@@ -121,82 +278,47 @@ def get_facial_measurements(landmarks_2d, landmarks_3d, image_shape):
     # Standard glasses are about 135-150mm wide, which should look natural
     # Apply a reasonable scaling factor to make glasses visible
     glasses_scaling_factor = 1.2  # Make glasses slightly larger than calculated
-    
-    # Store both raw and scaled measurements
-    measurements['ipd_pixels'] = ipd_pixels
-    measurements['pixels_per_mm'] = pixels_per_mm
-    measurements['pixels_per_mm_scaled'] = pixels_per_mm * glasses_scaling_factor
-    measurements['estimated_ipd_mm'] = ipd_pixels / pixels_per_mm
-    
-    # Face width measurements
-    measurements['face_width_pixels'] = face_width_pixels
-    measurements['face_width_mm'] = face_width_pixels / pixels_per_mm
-    
-    # Debug logging with better information
-    print(f"DEBUG: IPD pixels: {ipd_pixels:.2f}")
-    print(f"DEBUG: Face width pixels: {face_width_pixels:.2f}")
-    print(f"DEBUG: Pixels per mm (raw): {pixels_per_mm:.4f}")
-    print(f"DEBUG: Pixels per mm (scaled): {measurements['pixels_per_mm_scaled']:.4f}")
-    print(f"DEBUG: 135mm glasses would be {135 * measurements['pixels_per_mm_scaled']:.1f} pixels wide")
+    pixels_per_mm_scaled = pixels_per_mm * glasses_scaling_factor
     
     # Head pose estimation using 3D landmarks
-    nose_tip_3d = landmarks_3d[FACIAL_LANDMARKS['nose_tip']]
-    left_ear_3d = landmarks_3d[FACIAL_LANDMARKS['left_ear']]
-    right_ear_3d = landmarks_3d[FACIAL_LANDMARKS['right_ear']]
-    
     # Calculate head rotation (yaw) from ear positions
+    left_ear_3d, right_ear_3d = landmarks_3d[_EAR_INDICES].tolist()
     head_yaw = math.atan2(right_ear_3d[0] - left_ear_3d[0], 
                           right_ear_3d[2] - left_ear_3d[2])
-    measurements['head_yaw_radians'] = head_yaw
-    measurements['head_yaw_degrees'] = math.degrees(head_yaw)
     
     # Calculate head tilt (roll) from eye positions
-    left_eye_center = landmarks_2d[FACIAL_LANDMARKS['left_eye_outer']]
-    right_eye_center = landmarks_2d[FACIAL_LANDMARKS['right_eye_outer']]
-    head_roll = math.atan2(right_eye_center[1] - left_eye_center[1],
-                           right_eye_center[0] - left_eye_center[0])
-    measurements['head_roll_radians'] = head_roll
-    measurements['head_roll_degrees'] = math.degrees(head_roll)
+    head_roll = math.atan2(right_eye_outer[1] - left_eye_outer[1],
+                           right_eye_outer[0] - left_eye_outer[0])
     
     # Glasses positioning points
     eye_center = (
         (left_eye_inner[0] + right_eye_inner[0]) // 2,
         (left_eye_inner[1] + right_eye_inner[1]) // 2
     )
-    measurements['eye_center'] = eye_center
-    
-    # Nose bridge position for glasses placement
-    nose_bridge = landmarks_2d[FACIAL_LANDMARKS['nose_bridge']]
-    measurements['nose_bridge'] = nose_bridge
-    
-    # ENHANCED: Head region detection for better hat placement
-    center_forehead = landmarks_2d[FACIAL_LANDMARKS['center_forehead']]
-    measurements['forehead_center'] = center_forehead
     
-    # Calculate head top region using multiple landmarks
-    head_top_center = landmarks_2d[FACIAL_LANDMARKS['head_top_center']]
-    head_top_left = landmarks_2d[FACIAL_LANDMARKS['head_top_left']]
-    head_top_right = landmarks_2d[FACIAL_LANDMARKS['head_top_right']]
-    
-    # Calculate head width at the top
-    head_top_width_pixels = math.sqrt((head_top_right[0] - head_top_left[0])**2 + 
-                                     (head_top_right[1] - head_top_left[1])**2)
-    
-    # Calculate head height (from head top to chin)
-    chin = landmarks_2d[FACIAL_LANDMARKS['chin']]
-    head_height_pixels = math.sqrt((chin[0] - head_top_center[0])**2 + 
-                                  (chin[1] - head_top_center[1])**2)
-    
-    # Store enhanced head measurements
-    measurements['head_top_center'] = head_top_center
-    measurements['head_top_width_pixels'] = head_top_width_pixels
-    measurements['head_height_pixels'] = head_height_pixels
-    measurements['head_width_mm'] = head_top_width_pixels / pixels_per_mm
-    measurements['head_height_mm'] = head_height_pixels / pixels_per_mm
-    
-    print(f"DEBUG: Head region - Top center: {head_top_center}, Width: {head_top_width_pixels:.1f}px, Height: {head_height_pixels:.1f}px")
-    
-    return measurements
+    return FacialMeasurements(
+        # Both raw and scaled measurements
+        ipd_pixels=ipd_pixels,
+        pixels_per_mm=pixels_per_mm,
+        pixels_per_mm_scaled=pixels_per_mm_scaled,
+        estimated_ipd_mm=ipd_pixels / pixels_per_mm,
+        face_width_pixels=face_width_pixels,
+        face_width_mm=face_width_pixels / pixels_per_mm,
+        head_yaw_radians=head_yaw,
+        head_yaw_degrees=math.degrees(head_yaw),
+        head_roll_radians=head_roll,
+        head_roll_degrees=math.degrees(head_roll),
+        eye_center=eye_center,
+        # Nose bridge position for glasses placement
+        nose_bridge=nose_bridge,
+        # ENHANCED: Head region for better hat placement
+        forehead_center=center_forehead,
+        head_top_center=head_top_center,
+        head_top_width_pixels=head_top_width_pixels,
+        head_height_pixels=head_height_pixels,
+        head_width_mm=head_top_width_pixels / pixels_per_mm,
+        head_height_mm=head_height_pixels / pixels_per_mm
+    )
 
 def calculate_product_dimensions(product_type, facial_measurements):
     """Calculate appropriate product dimensions based on facial measurements"""
@@ -0,0 +1,327 @@
+# api/services/metrics.py
+import asyncio
+import bisect
+import os
+import threading
+import time
+
+# Default latency buckets (seconds), from 0.5 ms to 5 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count, or read at scrape time from a callback
+    returning {label values tuple: value}
+    """
+    metric_type = "counter"
+
+    def __init__(self, name, documentation, label_names=(), callback=None):
+        super().__init__(name, documentation, label_names)
+        self._values = {}
+        self._callback = callback
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def drain(self):
+        """Take the counts recorded so far and start again from zero"""
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values):
+        """Add counts drained from the same counter in another process"""
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+    def _samples(self):
+        if self._callback is not None:
+            items = sorted(self._callback().items())
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be read from a callback at scrape time"""
+    metric_type = "gauge"
+
+    def __init__(self, name, documentation, label_names=(), callback=None):
+        super().__init__(name, documentation, label_names)
+        self._values = {}
+        self._callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self):
+        if self._callback is not None:
+            return [f"{self.name} {_format_value(self._callback())}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed buckets, exported as _bucket/_sum/_count"""
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def drain(self):
+        """Take the observations recorded so far and start again from empty"""
+        with self._lock:
+            series, self._series = self._series, {}
+        return series
+
+    def merge(self, series):
+        """Add observations drained from the same histogram in another process"""
+        with self._lock:
+            for key, (counts, total, count) in series.items():
+                mine = self._series.get(key)
+                if mine is None:
+                    mine = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                mine[0] = [a + b for a, b in zip(mine[0], counts)]
+                mine[1] += total
+                mine[2] += count
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+    def drain(self):
+        """Counter and histogram updates recorded in this process since the last drain, by metric name"""
+        updates = {}
+        for metric in self._metrics:
+            if isinstance(metric, (Counter, Histogram)) and getattr(metric, "_callback", None) is None:
+                drained = metric.drain()
+                if drained:
+                    updates[metric.name] = drained
+        return updates
+
+    def merge(self, updates):
+        """Add updates drained in another process (see drain)"""
+        for metric in self._metrics:
+            if metric.name in updates:
+                metric.merge(updates[metric.name])
+
+
+registry = MetricsRegistry()
+
+STAGE_LATENCY = registry.register(Histogram(
+    "tryon_stage_duration_seconds",
+    "Time spent in each try-on pipeline stage",
+    ("tier", "stage")
+))
+REQUEST_LATENCY = registry.register(Histogram(
+    "tryon_request_duration_seconds",
+    "End-to-end handling time per request or WebSocket frame, including executor queueing",
+    ("tier",)
+))
+REQUESTS_TOTAL = registry.register(Counter(
+    "tryon_requests_total",
+    "Requests or WebSocket frames handled, by outcome",
+    ("tier", "status")
+))
+FRAMES_DROPPED = registry.register(Counter(
+    "tryon_frames_dropped_total",
+    "Frames returned unprocessed or dropped, by reason",
+    ("tier", "reason")
+))
+WEBSOCKET_SESSIONS = registry.register(Gauge(
+    "tryon_websocket_sessions",
+    "Currently open /websocket-tryon sessions"
+))
+WEBSOCKET_SESSIONS_TOTAL = registry.register(Counter(
+    "tryon_websocket_sessions_total",
+    "WebSocket sessions opened since start"
+))
+EVENT_LOOP_LAG = registry.register(Histogram(
+    "tryon_event_loop_lag_seconds",
+    "Delay between a scheduled event-loop wake-up and when it actually ran",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+))
+LANDMARK_FRAMES = registry.register(Counter(
+    "tryon_landmark_frames_total",
+    "Realtime frames whose landmarks came from full FaceMesh (keyframe) or optical flow (tracked)",
+    ("source",)
+))
+YOLO_BATCH_SIZE = registry.register(Histogram(
+    "tryon_yolo_batch_size",
+    "Frames per batched YOLO call",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 32)
+))
+# Latest CPU time reported by each executor child process (pid -> seconds)
+_child_cpu_seconds = {}
+_child_cpu_lock = threading.Lock()
+
+
+def _process_cpu_seconds():
+    with _child_cpu_lock:
+        samples = {(f"inference-{pid}",): seconds for pid, seconds in _child_cpu_seconds.items()}
+    samples[("api",)] = time.process_time()
+    return samples
+
+
+PROCESS_CPU_SECONDS = registry.register(Counter(
+    "process_cpu_seconds_total",
+    "User and system CPU time consumed, by process (the API process and each inference child process)",
+    ("process",),
+    callback=_process_cpu_seconds
+))
+
+
+class StageTimer:
+    """
+    Lap timer for one request/frame. `lap(stage)` charges the time since the
+    previous lap to `stage` (repeated stages accumulate). The collected
+    `stages` dict is plain data, so pipeline functions running in a process
+    pool can return it to the web process for recording.
+    """
+
+    __slots__ = ("_last", "stages")
+
+    def __init__(self):
+        self._last = time.perf_counter()
+        self.stages = {}
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last)
+        self._last = now
+
+    def reset(self):
+        """Start the next lap now, without charging the elapsed time to any stage"""
+        self._last = time.perf_counter()
+
+
+def child_usage():
+    """
+    CPU time and metric updates of this process, for an executor child
+    (process pool or inference worker) to send back with its results.
+    """
+    return os.getpid(), time.process_time(), registry.drain()
+
+
+def record_child_usage(usage):
+    """Account a child's child_usage() in the API process's metrics"""
+    pid, cpu_seconds, updates = usage
+    with _child_cpu_lock:
+        _child_cpu_seconds[pid] = cpu_seconds
+    registry.merge(updates)
+
+
+def call_with_usage(fn, args, kwargs):
+    """Process-pool job wrapper: fn's result and the child's usage after running it"""
+    return fn(*args, **kwargs), child_usage()
+
+
+def record_stage_timings(tier, stages):
+    """Export a StageTimer's stages into the per-stage latency histogram"""
+    for stage, seconds in stages.items():
+        STAGE_LATENCY.observe(seconds, tier=tier, stage=stage)
+
+
+async def monitor_event_loop_lag(interval=0.25):
+    """Background task: measure how late the event loop wakes up from a sleep"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
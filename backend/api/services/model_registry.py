@@ -0,0 +1,107 @@
+# api/services/model_registry.py
+import threading
+import time
+
+import numpy as np
+
+from api.config import (
+    MODEL_WARMUP_ENABLED,
+    MODEL_WARMUP_RUNS,
+    SINGLE_IMAGE_TARGET_SIZE,
+    REALTIME_TARGET_SIZE,
+    HIGH_ACCURACY_TARGET_SIZE
+)
+
+# Warm-up frames: each tier's processing size at 4:3
+WARMUP_SIZES = (REALTIME_TARGET_SIZE, HIGH_ACCURACY_TARGET_SIZE, SINGLE_IMAGE_TARGET_SIZE)
+
+
+def warmup_frame(size):
+    """Mid-grey BGR frame whose longer side is `size`"""
+    return np.full((size * 3 // 4, size, 3), 128, dtype=np.uint8)
+
+
+class ModelRegistry:
+    """
+    The models the API serves with, loaded and warmed up at startup instead
+    of on the first request.
+
+    Services register each model with a `load()` function and an optional
+    `warmup(frame)` function; `load_all()` runs them from the application
+    lifespan, the warm-up once per tier processing size. Per-model status
+    (pending, loading, warming_up, ready, failed), timings and errors are
+    kept for /ready and /debug.
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, load, warmup=None):
+        with self._lock:
+            self._models[name] = {
+                "load": load,
+                "warmup": warmup,
+                "status": "pending",
+                "load_ms": None,
+                "warmup_ms": None,
+                "error": None
+            }
+
+    def clear(self):
+        """Forget every registered model (the API process with inference workers tracks only the workers)"""
+        with self._lock:
+            self._models.clear()
+
+    def _set(self, name, **values):
+        with self._lock:
+            self._models[name].update(values)
+
+    def load_all(self, warmup=MODEL_WARMUP_ENABLED, runs=MODEL_WARMUP_RUNS):
+        """Load (and warm up) every registered model that is not ready yet; blocking. Returns ready()"""
+        with self._lock:
+            names = [name for name, entry in self._models.items() if entry["status"] != "ready"]
+        for name in names:
+            entry = self._models[name]
+            try:
+                self._set(name, status="loading", error=None)
+                started = time.perf_counter()
+                entry["load"]()
+                self._set(name, load_ms=round((time.perf_counter() - started) * 1000, 1))
+
+                if warmup and entry["warmup"] is not None:
+                    self._set(name, status="warming_up")
+                    started = time.perf_counter()
+                    for size in WARMUP_SIZES:
+                        frame = warmup_frame(size)
+                        for _ in range(max(1, runs)):
+                            entry["warmup"](frame)
+                    self._set(name, warmup_ms=round((time.perf_counter() - started) * 1000, 1))
+
+                self._set(name, status="ready")
+                print(f"MODELS: {name} ready (load {entry['load_ms']} ms, warm-up {entry['warmup_ms']} ms)")
+            except Exception as e:
+                self._set(name, status="failed", error=str(e))
+                print(f"MODELS: {name} failed to load: {e}")
+        return self.ready()
+
+    def ready(self):
+        """True once every registered model is loaded and warm"""
+        with self._lock:
+            return all(entry["status"] == "ready" for entry in self._models.values())
+
+    def stats(self):
+        """Per-model status and timings for /ready and the debug endpoint"""
+        with self._lock:
+            models = {
+                name: {key: entry[key] for key in ("status", "load_ms", "warmup_ms", "error")}
+                for name, entry in self._models.items()
+            }
+        return {
+            "ready": all(model["status"] == "ready" for model in models.values()),
+            "warmup_sizes": list(WARMUP_SIZES),
+            "models": models
+        }
+
+
+model_registry = ModelRegistry()
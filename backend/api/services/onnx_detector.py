@@ -0,0 +1,189 @@
+# api/services/onnx_detector.py
+import ast
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from api.config import ONNX_INTRA_OP_THREADS
+
+# Letterbox padding value (ultralytics uses the same grey)
+LETTERBOX_COLOR = (114, 114, 114)
+# Boxes of different classes are shifted this far apart so one NMS pass never merges them
+CLASS_OFFSET = 7680
+# Candidates kept (by confidence) before NMS
+MAX_NMS_CANDIDATES = 30000
+
+
+def letterbox(image, size):
+    """
+    Resize `image` to fit `size` (height, width) keeping its aspect ratio and
+    pad the rest with LETTERBOX_COLOR.
+    Returns: padded image, scale ratio, (left pad, top pad)
+    """
+    height, width = image.shape[:2]
+    target_h, target_w = size
+    ratio = min(target_h / height, target_w / width)
+    new_w, new_h = int(round(width * ratio)), int(round(height * ratio))
+    pad_w, pad_h = (target_w - new_w) / 2, (target_h - new_h) / 2
+    if (new_w, new_h) != (width, height):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_h - 0.1)), int(round(pad_h + 0.1))
+    left, right = int(round(pad_w - 0.1)), int(round(pad_w + 0.1))
+    padded = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    return padded, ratio, (left, top)
+
+
+def non_max_suppression(predictions, conf, iou, classes=None, max_det=300):
+    """
+    Post-process one image's raw YOLOv8 output, shape (4 + classes, anchors):
+    best class per anchor, confidence and class filter, per-class NMS.
+    Returns: boxes xyxy (float32, network input coordinates), confidences, class ids
+    """
+    predictions = predictions.T
+    scores = predictions[:, 4:]
+    class_ids = scores.argmax(axis=1)
+    confidences = scores[np.arange(len(scores)), class_ids]
+    keep = confidences > conf
+    if classes is not None:
+        keep &= np.isin(class_ids, classes)
+    boxes_cxcywh, confidences, class_ids = predictions[keep, :4], confidences[keep], class_ids[keep]
+    if len(confidences) > MAX_NMS_CANDIDATES:
+        top = np.argsort(-confidences)[:MAX_NMS_CANDIDATES]
+        boxes_cxcywh, confidences, class_ids = boxes_cxcywh[top], confidences[top], class_ids[top]
+    if not len(confidences):
+        return np.empty((0, 4), np.float32), np.empty(0, np.float32), np.empty(0, np.int32)
+
+    boxes = np.empty_like(boxes_cxcywh)
+    boxes[:, :2] = boxes_cxcywh[:, :2] - boxes_cxcywh[:, 2:] / 2
+    boxes[:, 2:] = boxes_cxcywh[:, :2] + boxes_cxcywh[:, 2:] / 2
+    # NMSBoxes takes (x, y, w, h); the class offset keeps classes apart
+    offset_xywh = np.concatenate([boxes[:, :2] + class_ids[:, None] * CLASS_OFFSET, boxes_cxcywh[:, 2:]], axis=1)
+    kept = cv2.dnn.NMSBoxes(offset_xywh.tolist(), confidences.tolist(), conf, iou, top_k=max_det)
+    kept = np.asarray(kept, dtype=np.int64).reshape(-1)[:max_det]
+    return boxes[kept].astype(np.float32), confidences[kept].astype(np.float32), class_ids[kept].astype(np.int32)
+
+
+def quantized_model_path(model_path):
+    """Where the int8 copy of `model_path` is kept (next to it)"""
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.int8{ext or '.onnx'}"
+
+
+def quantize_model(model_path):
+    """
+    Dynamically quantize the model's weights to int8 (activations are
+    quantized at run time, so no calibration data is needed). The result is
+    written next to the model once and reused while it is newer than the source.
+    """
+    output_path = quantized_model_path(model_path)
+    if os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(model_path):
+        return output_path
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    print(f"ONNX: Quantizing {model_path} to int8 -> {output_path}")
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QUInt8)
+    return output_path
+
+
+class OnnxYoloDetector:
+    """
+    YOLOv8 detector on ONNX Runtime (CPU), a drop-in for the ultralytics model
+    in yolo_service: predict() takes the same profile keywords and returns one
+    YoloDetectionResult per image, so callers get identical detection dicts.
+
+    Pre/post-processing is done here: letterbox to the model's input size,
+    BGR -> RGB CHW float, then best-class selection, confidence/class filter,
+    per-class NMS and mapping boxes back to the original image.
+
+    Export the model with ultralytics, e.g.
+        yolo export model=yolov8n.pt format=onnx imgsz=320
+    With `quantize=True` an int8 copy is made with dynamic quantization.
+    """
+
+    # predict() already returns YoloDetectionResult objects (see yolo_service.predict)
+    returns_detection_results = True
+
+    def __init__(self, model_path, quantize=False, intra_op_threads=ONNX_INTRA_OP_THREADS):
+        self.model_path = model_path
+        self.quantize = quantize
+        self.intra_op_threads = intra_op_threads
+        self.session = None
+        self.names = {}
+        self._input_name = None
+        self._input_size = None
+        self._fixed_batch = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Create the inference session (quantizing first when configured)"""
+        with self._lock:
+            if self.session is not None:
+                return self
+            import onnxruntime as ort
+            if not os.path.exists(self.model_path):
+                raise FileNotFoundError(f"ONNX model not found: {self.model_path}")
+            path = quantize_model(self.model_path) if self.quantize else self.model_path
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if self.intra_op_threads > 0:
+                options.intra_op_num_threads = self.intra_op_threads
+            session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+            model_input = session.get_inputs()[0]
+            batch, _, height, width = model_input.shape
+            self._input_name = model_input.name
+            self._input_size = (height, width) if isinstance(height, int) and isinstance(width, int) else None
+            self._fixed_batch = batch if isinstance(batch, int) else None
+            self.names = self._read_names(session)
+            self.session = session
+            print(f"ONNX: Loaded {path} (input {model_input.shape}, {len(self.names)} classes)")
+            return self
+
+    @staticmethod
+    def _read_names(session):
+        """Class names from the ultralytics export metadata ("{0: 'person', ...}")"""
+        metadata = session.get_modelmeta().custom_metadata_map
+        try:
+            names = ast.literal_eval(metadata.get("names", "{}"))
+            if isinstance(names, dict) and names:
+                return {int(class_id): name for class_id, name in names.items()}
+        except (ValueError, SyntaxError):
+            pass
+        # Without metadata assume COCO order; only 'person' matters for face validation
+        return {0: 'person'}
+
+    def predict(self, images, classes=None, imgsz=640, conf=0.25, iou=0.45, max_det=300, **kwargs):
+        """Detect on a list of BGR images; one YoloDetectionResult per image (boxes in image pixels)"""
+        from api.services.yolo_service import YoloDetectionResult
+        self.load()
+        size = self._input_size or (imgsz, imgsz)
+
+        blobs, transforms = [], []
+        for image in images:
+            padded, ratio, pad = letterbox(image, size)
+            blobs.append(padded)
+            transforms.append((ratio, pad, image.shape[:2]))
+        # BGR HWC uint8 -> RGB NCHW float in [0, 1], one conversion for the batch
+        batch = np.ascontiguousarray(np.stack(blobs)[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+
+        if self._fixed_batch is None or self._fixed_batch == len(images):
+            outputs = self.session.run(None, {self._input_name: batch})[0]
+        else:
+            # Exported with a fixed batch size: run image by image
+            outputs = np.concatenate([
+                self.session.run(None, {self._input_name: batch[i:i + 1]})[0] for i in range(len(images))
+            ])
+
+        results = []
+        for predictions, (ratio, (left, top), (height, width)) in zip(outputs, transforms):
+            boxes, confidences, class_ids = non_max_suppression(predictions, conf, iou, classes, max_det)
+            if not len(class_ids):
+                results.append(YoloDetectionResult.empty(self.names))
+                continue
+            boxes -= (left, top, left, top)
+            boxes /= ratio
+            boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+            boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+            results.append(YoloDetectionResult(boxes.astype(np.int32), confidences, class_ids, self.names))
+        return results
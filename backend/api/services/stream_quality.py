@@ -0,0 +1,129 @@
+# api/services/stream_quality.py
+from api.config import (
+    ADAPTIVE_QUALITY_ENABLED,
+    JPEG_QUALITY_MIN,
+    JPEG_QUALITY_MAX,
+    OUTPUT_SCALE_MIN
+)
+from api.utils.session_registry import SessionRegistry
+
+# Smoothing factor for the latency / round-trip / encode-time averages
+EWMA_ALPHA = 0.3
+# Frames to wait after a change before judging its effect
+COOLDOWN_FRAMES = 3
+QUALITY_STEP = 5
+SCALE_STEP = 0.1
+# Above target * DEGRADE_MARGIN the stream gets cheaper, below target * UPGRADE_MARGIN it gets better
+DEGRADE_MARGIN = 1.1
+UPGRADE_MARGIN = 0.7
+# Encode time above this share of the target latency is reduced through resolution, not quality
+ENCODE_BUDGET_FRACTION = 0.25
+
+
+def _ewma(average, sample):
+    return sample if average is None else average + EWMA_ALPHA * (sample - average)
+
+
+class StreamQualityController:
+    """
+    JPEG quality and output size for one stream.
+
+    After each frame the stream reports its latency (frame received to
+    response sent, which includes queueing, processing, encoding and time
+    blocked sending to a slow client), the encode time, and the client's
+    round-trip time when the client measures it. Averages of these are kept
+    near `target_latency`: over target, quality drops by QUALITY_STEP (or,
+    when encoding itself is the cost, output size by SCALE_STEP); well under
+    target, size and then quality recover up to their configured bounds.
+    Changes are followed by a short cooldown so each one can take effect.
+    """
+
+    def __init__(self, target_latency_ms, initial_quality, min_quality=JPEG_QUALITY_MIN,
+                 max_quality=JPEG_QUALITY_MAX, min_scale=OUTPUT_SCALE_MIN, enabled=ADAPTIVE_QUALITY_ENABLED):
+        self.target_latency = target_latency_ms / 1000.0
+        self.min_quality = min(min_quality, max_quality)
+        self.max_quality = max(min_quality, max_quality)
+        self.min_scale = min(1.0, max(0.1, min_scale))
+        self.enabled = enabled
+        self.quality = min(self.max_quality, max(self.min_quality, initial_quality)) if enabled else initial_quality
+        self.scale = 1.0
+        self.latency = None
+        self.rtt = None
+        self.encode_time = None
+        self._cooldown = 0
+
+    def settings(self):
+        """(jpeg_quality, output_scale) for the next frame"""
+        return self.quality, self.scale
+
+    def observe_rtt(self, rtt_ms):
+        """Round-trip time measured by the client (e.g. from the echoed client_ts)"""
+        try:
+            rtt = float(rtt_ms) / 1000.0
+        except (TypeError, ValueError):
+            return
+        if rtt >= 0:
+            self.rtt = _ewma(self.rtt, rtt)
+
+    def observe(self, latency, encode_time=None):
+        """
+        Feed one encoded frame's latency and encode time (seconds).
+        Returns True if the settings for the next frame changed.
+        """
+        self.latency = _ewma(self.latency, latency)
+        if encode_time is not None:
+            self.encode_time = _ewma(self.encode_time, encode_time)
+        if not self.enabled:
+            return False
+        if self._cooldown > 0:
+            self._cooldown -= 1
+            return False
+
+        effective = max(self.latency, self.rtt or 0.0)
+        encode_bound = self.encode_time is not None and self.encode_time > self.target_latency * ENCODE_BUDGET_FRACTION
+        if effective > self.target_latency * DEGRADE_MARGIN:
+            changed = self._degrade(encode_bound)
+        elif effective < self.target_latency * UPGRADE_MARGIN:
+            changed = self._upgrade(encode_bound)
+        else:
+            changed = False
+        if changed:
+            self._cooldown = COOLDOWN_FRAMES
+        return changed
+
+    def _degrade(self, encode_bound):
+        if encode_bound and self.scale > self.min_scale:
+            self.scale = round(max(self.min_scale, self.scale - SCALE_STEP), 2)
+        elif self.quality > self.min_quality:
+            self.quality = max(self.min_quality, self.quality - QUALITY_STEP)
+        elif self.scale > self.min_scale:
+            self.scale = round(max(self.min_scale, self.scale - SCALE_STEP), 2)
+        else:
+            return False
+        return True
+
+    def _upgrade(self, encode_bound):
+        # Resolution first: a blurry upscaled frame is more visible than JPEG artifacts
+        if self.scale < 1.0 and not encode_bound:
+            self.scale = round(min(1.0, self.scale + SCALE_STEP), 2)
+        elif self.quality < self.max_quality:
+            self.quality = min(self.max_quality, self.quality + QUALITY_STEP)
+        else:
+            return False
+        return True
+
+    def report(self):
+        """Current settings and measurements, for responses"""
+        return {
+            "adaptive": self.enabled,
+            "jpeg_quality": self.quality,
+            "output_scale": self.scale,
+            "target_latency_ms": round(self.target_latency * 1000),
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "rtt_ms": round(self.rtt * 1000, 1) if self.rtt is not None else None,
+            "encode_ms": round(self.encode_time * 1000, 1) if self.encode_time is not None else None
+        }
+
+
+# Controllers of /tryon sessions (the realtime tier keeps one per WebSocket session)
+quality_registry = SessionRegistry()
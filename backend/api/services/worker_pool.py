@@ -0,0 +1,450 @@
+# api/services/worker_pool.py
+import asyncio
+import itertools
+import multiprocessing
+import pickle
+import threading
+import time
+from multiprocessing.connection import wait
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from api.config import WORKER_FRAME_SLOTS, WORKER_FRAME_SLOT_BYTES, WORKER_START_TIMEOUT_SECONDS
+from api.services.metrics import child_usage, record_child_usage
+from api.utils.image_decode import DecodedFrame
+
+# How often the result reader checks that every worker process is still alive
+WORKER_CHECK_INTERVAL_SECONDS = 1.0
+
+
+def _pickled_result(ok, value):
+    """Pickle here, so an unpicklable result is sent back as an error instead of ending the worker"""
+    try:
+        return ok, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        error = value if not ok else e
+        return False, pickle.dumps(RuntimeError(f"{type(error).__name__}: {error}"))
+
+
+def _worker_main(index, jobs, results, slot_names, initializer=None):
+    """
+    Inference worker process: loads and warms up its own models, then runs
+    jobs from `jobs` until it receives None, sending results on its own
+    `results` pipe.
+    """
+    if initializer is not None:
+        initializer()
+    import cv2
+    # The pool runs one worker per core; OpenCV's own threads would only oversubscribe them
+    cv2.setNumThreads(1)
+    # Importing the routes registers every model their pipeline functions use
+    import api.routes.tryon  # noqa: F401
+    from api.services.landmark_tracker import LandmarkTracker
+    from api.services.mediapipe_service import face_mesh_manager
+    from api.services.model_registry import model_registry
+
+    slots = [SharedMemory(name=name) for name in slot_names]
+    model_registry.load_all()
+    results.send(("ready", index, model_registry.stats(), child_usage()))
+
+    # Landmark trackers (tracking-mode FaceMesh) of the realtime sessions routed here,
+    # created on a session's first frame
+    sessions = {}
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        if job[0] == "close_session":
+            tracker = sessions.pop(job[1], None)
+            if tracker is not None:
+                face_mesh_manager.close_session(tracker.face_mesh)
+            continue
+
+        _, job_id, fn, args, kwargs, frame_ref, session_id = job
+        try:
+            if frame_ref is not None:
+                # The frame's pixels are in one of this worker's buffers; wrap them without copying
+                position, slot, shape, dtype, original_size = frame_ref
+                image = np.ndarray(shape, dtype=dtype, buffer=slots[slot].buf)
+                args = args[:position] + (DecodedFrame(image, original_size),) + args[position + 1:]
+            if session_id is not None:
+                tracker = sessions.get(session_id)
+                if tracker is None:
+                    tracker = sessions[session_id] = LandmarkTracker(face_mesh_manager.open_session())
+                kwargs["landmark_tracker"] = tracker
+            ok, payload = _pickled_result(True, fn(*args, **kwargs))
+        except Exception as e:
+            ok, payload = _pickled_result(False, e)
+        finally:
+            args = image = None
+        # CPU time and metric updates (e.g. YOLO batch sizes) travel with every result
+        results.send(("result", index, job_id, ok, payload, child_usage()))
+
+
+def _resolve(future, ok, value):
+    if future.done():
+        # The caller gave up (e.g. its client disconnected)
+        return
+    if ok:
+        future.set_result(value)
+    else:
+        future.set_exception(value)
+
+
+class WorkerPool:
+    """
+    Inference worker processes for the "workers" executor kind.
+
+    Each worker is a separate process with its own MediaPipe / face detector /
+    YOLO models, so pipelines run in parallel on every core without sharing
+    the API process's GIL. Jobs are module-level pipeline functions and their
+    arguments; a DecodedFrame argument (decoded in the API process) is copied
+    into one of the worker's shared-memory buffers instead of being pickled,
+    and the worker wraps that buffer as its frame. Only the small response
+    (encoded image, dicts) is pickled back. When all of a worker's buffers are
+    busy, or a frame does not fit one, the frame is pickled (see stats()).
+
+    Routing: stateless jobs go to the worker with the fewest jobs in flight.
+    Jobs with a `session_id` always go to the same worker, which keeps that
+    session's LandmarkTracker (tracking-mode FaceMesh) and passes it to the
+    job as `landmark_tracker`; close_session() releases it.
+
+    A result thread in the API process resolves the callers' futures and
+    restarts workers that die; their in-flight jobs fail and their sessions
+    start over with a fresh tracker. Each worker sends its results on its own
+    pipe, so a worker killed mid-send cannot hold a lock the others need.
+    Each restart starts a new generation of the worker: a job whose frame
+    was still being copied when its worker died is dropped once the copy
+    ends, and its buffer only then goes back to the new process.
+
+    `initializer` runs first in every worker process (e.g. to install stub models).
+    """
+
+    def __init__(self, workers, slots_per_worker=WORKER_FRAME_SLOTS, slot_bytes=WORKER_FRAME_SLOT_BYTES,
+                 initializer=None):
+        self.size = max(1, workers)
+        self.slots_per_worker = max(0, slots_per_worker)
+        self.slot_bytes = max(1, slot_bytes)
+        self.initializer = initializer
+        # Fresh interpreters: forking would copy the API process's threads and model state
+        self._context = multiprocessing.get_context("spawn")
+        self._workers = []
+        # job id -> (future, event loop, worker index, buffer index or None, worker generation)
+        self._jobs = {}
+        # session id -> worker index
+        self._sessions = {}
+        self._job_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._reader = None
+        self._started = False
+        self._start_complete = False
+        self._closing = False
+        self._shared_frames = 0
+        self._pickled_frames = 0
+        self._restarts = 0
+
+    def start(self, timeout=WORKER_START_TIMEOUT_SECONDS):
+        """Start the workers and wait until each has loaded its models; blocking"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            try:
+                for index in range(self.size):
+                    worker = {
+                        "index": index,
+                        "slots": [],
+                        # Buffers a run() is still copying a frame into (they survive a restart)
+                        "copying": set(),
+                        "generation": 0,
+                        "ready": threading.Event(),
+                        "models": None,
+                        "start_error": None
+                    }
+                    self._workers.append(worker)
+                    for _ in range(self.slots_per_worker):
+                        worker["slots"].append(SharedMemory(create=True, size=self.slot_bytes))
+                    self._spawn(worker)
+            except Exception:
+                self._abort_start()
+                raise
+        self._reader = threading.Thread(target=self._read_results, name="inference-worker-results", daemon=True)
+        self._reader.start()
+
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            error = None
+            if not worker["ready"].wait(max(0.0, deadline - time.monotonic())):
+                error = f"Inference worker {worker['index']} did not start within {timeout:.0f}s"
+            elif worker["start_error"]:
+                error = worker["start_error"]
+            if error:
+                # No workers at all rather than a pool with holes that requests would wait on forever
+                self.shutdown()
+                raise RuntimeError(error)
+        self._start_complete = True
+        failed = {name: model["error"] for worker in self._workers
+                  for name, model in worker["models"]["models"].items() if model["status"] != "ready"}
+        if failed:
+            # The workers keep serving and retry loading on first use, as the thread executor does
+            raise RuntimeError(f"Inference worker models failed to load: {failed}")
+        print(f"WORKERS: {self.size} inference workers ready")
+
+    def _abort_start(self):
+        """Undo a start() that failed while creating buffers or spawning; called with the lock held"""
+        self._closing = True
+        for worker in self._workers:
+            process = worker.get("process")
+            if process is not None and process.pid is not None:
+                process.terminate()
+                process.join()
+            if worker.get("results") is not None:
+                worker["results"].close()
+            for slot in worker["slots"]:
+                slot.close()
+                slot.unlink()
+
+    def _spawn(self, worker):
+        """
+        (Re)start the process of `worker` as a new generation, with an empty job
+        queue, a new result pipe and every buffer free except those a copy is
+        still writing into
+        """
+        if worker.get("results") is not None:
+            # Results the old process still had in flight belong to jobs the restart failed
+            worker["results"].close()
+        worker["generation"] += 1
+        worker["jobs"] = self._context.Queue()
+        worker["results"], results = self._context.Pipe(duplex=False)
+        worker["free_slots"] = [slot for slot in range(len(worker["slots"])) if slot not in worker["copying"]]
+        worker["pending"] = 0
+        worker["process"] = self._context.Process(
+            target=_worker_main,
+            args=(worker["index"], worker["jobs"], results, [slot.name for slot in worker["slots"]],
+                  self.initializer),
+            name=f"inference-worker-{worker['index']}",
+            daemon=True
+        )
+        worker["process"].start()
+        # Only the worker writes to its pipe; closing our copy lets its exit show up as EOF
+        results.close()
+
+    def _route(self, session_id):
+        """Worker index for a job; called with the lock held"""
+        if session_id is None:
+            return min(range(self.size), key=lambda index: self._workers[index]["pending"])
+        index = self._sessions.get(session_id)
+        if index is None:
+            # New session: the worker holding the fewest sessions, then the least busy one
+            counts = [0] * self.size
+            for session_index in self._sessions.values():
+                counts[session_index] += 1
+            index = min(range(self.size), key=lambda i: (counts[i], self._workers[i]["pending"]))
+            self._sessions[session_id] = index
+        return index
+
+    async def run(self, fn, args, kwargs, session_id=None):
+        """Run fn(*args, **kwargs) on a worker and await its result (exceptions are re-raised here)"""
+        if not self._started or self._closing:
+            raise RuntimeError("Inference workers are not running")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        position = next((i for i, arg in enumerate(args)
+                         if isinstance(arg, DecodedFrame) and arg.image is not None), None)
+        with self._lock:
+            index = self._route(session_id)
+            worker = self._workers[index]
+            job_id = next(self._job_ids)
+            generation = worker["generation"]
+            slot = None
+            if position is not None and worker["free_slots"] and args[position].image.nbytes <= self.slot_bytes:
+                slot = worker["free_slots"].pop()
+                worker["copying"].add(slot)
+            worker["pending"] += 1
+            self._jobs[job_id] = (future, loop, index, slot, generation)
+
+        frame_ref = None
+        if slot is not None:
+            frame = args[position]
+            image = np.ascontiguousarray(frame.image)
+            view = np.ndarray(image.shape, dtype=image.dtype, buffer=worker["slots"][slot].buf)
+            # The one copy of the pixels, off the event loop
+            copy = asyncio.ensure_future(asyncio.to_thread(np.copyto, view, image))
+            try:
+                await asyncio.shield(copy)
+            except BaseException:
+                # Cancelled (client gone) or failed before the job was queued; the copy
+                # thread may still be writing, so the buffer is given back once it is done
+                copy.add_done_callback(lambda _: self._abandon(job_id, index, slot, generation))
+                raise
+            frame_ref = (position, slot, image.shape, image.dtype.str, frame.original_size)
+            args = args[:position] + (None,) + args[position + 1:]
+            self._shared_frames += 1
+        elif position is not None:
+            self._pickled_frames += 1
+
+        with self._lock:
+            if slot is not None:
+                self._copy_done(worker, slot, generation)
+            # Queued under the lock, so a restart cannot swap the worker's queue in between
+            if worker["generation"] == generation and job_id in self._jobs:
+                try:
+                    worker["jobs"].put(("call", job_id, fn, args, kwargs, frame_ref, session_id))
+                except BaseException:
+                    self._forget(job_id)
+                    raise
+        # A job dropped above was failed by the restart (or shutdown) already
+        return await future
+
+    def _copy_done(self, worker, slot, generation):
+        """A frame copy into `slot` ended; called with the lock held"""
+        worker["copying"].discard(slot)
+        if worker["generation"] != generation:
+            # The worker was restarted during the copy: its job has failed, and the
+            # restart left this buffer out of the new process's free list until now
+            worker["free_slots"].append(slot)
+
+    def _abandon(self, job_id, index, slot, generation):
+        """Release a job whose frame copy was cancelled or failed"""
+        with self._lock:
+            self._copy_done(self._workers[index], slot, generation)
+            self._forget(job_id)
+
+    def _forget(self, job_id):
+        """Drop a job that never reached its worker, with its pending count and buffer; called with the lock held"""
+        entry = self._jobs.pop(job_id, None)
+        if entry is None:
+            # Already failed by a worker restart, which reset the worker's counters
+            return
+        _, _, index, slot, _ = entry
+        worker = self._workers[index]
+        worker["pending"] -= 1
+        if slot is not None:
+            worker["free_slots"].append(slot)
+
+    def close_session(self, session_id):
+        """Release a session's tracker in its worker"""
+        with self._lock:
+            index = self._sessions.pop(session_id, None)
+            if index is not None and not self._closing:
+                self._workers[index]["jobs"].put(("close_session", session_id))
+
+    def _read_results(self):
+        """Result thread: hands each result to its caller's event loop and watches the workers"""
+        last_check = time.monotonic()
+        while not self._closing:
+            if time.monotonic() - last_check >= WORKER_CHECK_INTERVAL_SECONDS:
+                self._restart_dead_workers()
+                last_check = time.monotonic()
+            with self._lock:
+                pipes = [worker["results"] for worker in self._workers if not worker["results"].closed]
+            for pipe in wait(pipes, timeout=WORKER_CHECK_INTERVAL_SECONDS):
+                try:
+                    message = pipe.recv()
+                except (EOFError, OSError):
+                    # The worker exited; the next check restarts it with a new pipe
+                    pipe.close()
+                    continue
+                self._handle_result(message)
+
+    def _handle_result(self, message):
+        """Record a worker's ready message or resolve the future of a finished job"""
+        if message[0] == "ready":
+            _, index, models, usage = message
+            record_child_usage(usage)
+            self._workers[index]["models"] = models
+            self._workers[index]["ready"].set()
+            return
+
+        _, index, job_id, ok, payload, usage = message
+        record_child_usage(usage)
+        with self._lock:
+            entry = self._jobs.pop(job_id, None)
+            if entry is None:
+                # Failed already because its worker was restarted
+                return
+            future, loop, index, slot, _ = entry
+            worker = self._workers[index]
+            worker["pending"] -= 1
+            if slot is not None:
+                worker["free_slots"].append(slot)
+        try:
+            value = pickle.loads(payload)
+        except Exception as e:
+            ok, value = False, e
+        loop.call_soon_threadsafe(_resolve, future, ok, value)
+
+    def _restart_dead_workers(self):
+        for worker in self._workers:
+            if self._closing or worker["process"].is_alive():
+                continue
+            index = worker["index"]
+            if not self._start_complete:
+                # Died while loading its models: fail start() instead of restarting it in a loop
+                worker["start_error"] = f"Inference worker {index} exited during start-up (code {worker['process'].exitcode})"
+                worker["ready"].set()
+                continue
+            print(f"WORKERS: Inference worker {index} exited (code {worker['process'].exitcode}); restarting")
+            with self._lock:
+                failed = [job_id for job_id, entry in self._jobs.items() if entry[2] == index]
+                failed = [self._jobs.pop(job_id) for job_id in failed]
+                # Its sessions get a fresh tracker on their next frame, wherever they land
+                for session_id in [session_id for session_id, i in self._sessions.items() if i == index]:
+                    del self._sessions[session_id]
+                self._restarts += 1
+                self._spawn(worker)
+            for future, loop, _, _, _ in failed:
+                loop.call_soon_threadsafe(_resolve, future, False, RuntimeError(f"Inference worker {index} exited"))
+
+    def shutdown(self, timeout=5.0):
+        """Stop the workers and free the shared-memory buffers"""
+        with self._lock:
+            if not self._started or self._closing:
+                return
+            self._closing = True
+            failed = list(self._jobs.values())
+            self._jobs.clear()
+        for worker in self._workers:
+            worker["jobs"].put(None)
+        for worker in self._workers:
+            worker["process"].join(timeout)
+            if worker["process"].is_alive():
+                worker["process"].terminate()
+        for future, loop, _, _, _ in failed:
+            loop.call_soon_threadsafe(_resolve, future, False, RuntimeError("Inference workers stopped"))
+        if self._reader is not None:
+            self._reader.join(timeout)
+        for worker in self._workers:
+            worker["results"].close()
+            for slot in worker["slots"]:
+                slot.close()
+                slot.unlink()
+
+    def stats(self):
+        """Worker, buffer and session usage for the debug endpoint"""
+        with self._lock:
+            session_counts = [0] * self.size
+            for index in self._sessions.values():
+                session_counts[index] += 1
+            return {
+                "workers": self.size,
+                "started": self._started,
+                "frame_slots_per_worker": self.slots_per_worker,
+                "frame_slot_bytes": self.slot_bytes,
+                "shared_frames": self._shared_frames,
+                "pickled_frames": self._pickled_frames,
+                "restarts": self._restarts,
+                "sessions": len(self._sessions),
+                "per_worker": [
+                    {
+                        "pid": worker["process"].pid,
+                        "alive": worker["process"].is_alive(),
+                        "models_ready": bool(worker["models"] and worker["models"]["ready"]),
+                        "pending": worker["pending"],
+                        "free_slots": len(worker["free_slots"]),
+                        "sessions": session_counts[worker["index"]]
+                    }
+                    for worker in self._workers
+                ]
+            }
@@ -0,0 +1,113 @@
+# api/services/yolo_batcher.py
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from api.config import YOLO_BATCH_MAX_SIZE, YOLO_BATCH_MAX_WAIT_MS
+from api.services.metrics import YOLO_BATCH_SIZE
+
+
+class YoloBatcher:
+    """
+    Cross-request micro-batcher for detector inference.
+
+    Worker threads of the inference executor call `detect(image)` and block;
+    one batcher thread takes the first waiting frame, keeps collecting frames
+    for up to `max_wait_ms` (or until `max_batch` frames are waiting), runs a
+    single batched model call and hands each caller its own result.
+
+    `infer_batch(images)` does the actual work and must return one result per
+    image. Running every model call on the batcher thread also means the
+    model is never invoked from two threads at once.
+    """
+
+    def __init__(self, infer_batch, max_batch=YOLO_BATCH_MAX_SIZE, max_wait_ms=YOLO_BATCH_MAX_WAIT_MS):
+        self.infer_batch = infer_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._batches = 0
+        self._frames = 0
+        self._largest_batch = 0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="yolo-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, image):
+        """Queue a frame; returns a concurrent.futures.Future for its result"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((image, future))
+        return future
+
+    def detect(self, image, timeout=None):
+        """Blocking: submit a frame and wait for its result"""
+        return self.submit(image).result(timeout)
+
+    def _collect(self):
+        """Block for the first frame, then gather more until the batch is full or the wait expires"""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Shutdown requested: finish this batch first
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            images = [image for image, _ in batch]
+            try:
+                results = self.infer_batch(images)
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Batched inference returned {len(results)} results for {len(batch)} frames")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            self._batches += 1
+            self._frames += len(batch)
+            self._largest_batch = max(self._largest_batch, len(batch))
+            YOLO_BATCH_SIZE.observe(len(batch))
+
+    def shutdown(self):
+        """Stop the batcher thread after the frames already queued (a later submit restarts it)"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self):
+        """Batching counters for the debug endpoint"""
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": self._batches,
+            "frames": self._frames,
+            "largest_batch": self._largest_batch,
+            "mean_batch_size": round(self._frames / self._batches, 2) if self._batches else 0.0,
+            "queued": self._queue.qsize()
+        }
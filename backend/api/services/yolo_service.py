@@ -1,112 +1,223 @@
 # api/services/yolo_service.py
 import cv2
 import numpy as np
-from ultralytics import YOLO
-import os
+import threading
+
+from api.config import (
+    YOLO_MODEL_PATH,
+    YOLO_CLASSES,
+    YOLO_IMGSZ,
+    YOLO_CONF,
+    YOLO_IOU,
+    YOLO_MAX_DET,
+    DETECTOR_BACKEND,
+    ONNX_MODEL_PATH,
+    ONNX_INT8_ENABLED
+)
+from api.services.yolo_batcher import YoloBatcher
 
 # Initialize YOLO model
 yolo_model = None
+_yolo_model_lock = threading.Lock()
+
+def load_detector(backend=DETECTOR_BACKEND):
+    """Create the face-validation detector for `backend` ("ultralytics" or "onnx")"""
+    if backend == "onnx":
+        from api.services.onnx_detector import OnnxYoloDetector
+        return OnnxYoloDetector(ONNX_MODEL_PATH, quantize=ONNX_INT8_ENABLED).load()
+    if backend != "ultralytics":
+        raise ValueError(f"Unknown detector backend: {backend}")
+    # Imported on first use, so the result parsing helpers load without ultralytics
+    from ultralytics import YOLO
+    return YOLO(YOLO_MODEL_PATH)
 
 def get_yolo_model():
-    """Get or initialize YOLO model"""
+    """Get or load the YOLO model (normally loaded at startup by the model registry)"""
     global yolo_model
     if yolo_model is None:
-        # Try to load custom model first, fallback to YOLOv8n
-        model_path = "yolov8n.pt"
-        if os.path.exists(model_path):
-            yolo_model = YOLO(model_path)
-        else:
-            # Use YOLOv8n from ultralytics
-            yolo_model = YOLO('yolov8n.pt')
+        with _yolo_model_lock:
+            if yolo_model is None:
+                yolo_model = load_detector()
     return yolo_model
 
-def detect_objects_yolo(image):
+
+# Inference profile for the face-validation use case: only the person class,
+# a small input size and a handful of boxes. Keys are ultralytics predict() kwargs.
+FACE_VALIDATION_PROFILE = {
+    'classes': YOLO_CLASSES,
+    'imgsz': YOLO_IMGSZ,
+    'conf': YOLO_CONF,
+    'iou': YOLO_IOU,
+    'max_det': YOLO_MAX_DET,
+    'verbose': False
+}
+
+class YoloDetectionResult:
     """
-    Detect objects using YOLO for better accuracy
-    Returns: list of detections with bounding boxes and confidence scores
+    Parsed output of a single YOLO inference on one frame.
+    The object list, the person/face filter and the enhanced-detection
+    summary are all derived from it, so each frame runs the model only once.
+
+    Boxes are kept as NumPy arrays (xyxy as int32, confidences as float32,
+    class ids as int32); per-detection dicts are only built when requested.
+    """
+
+    def __init__(self, boxes_xyxy, confidences, class_ids, names):
+        self.boxes_xyxy = boxes_xyxy
+        self.confidences = confidences
+        self.class_ids = class_ids
+        self.names = names
+        self._objects = None
+
+    @classmethod
+    def empty(cls, names=None):
+        return cls(
+            np.empty((0, 4), dtype=np.int32),
+            np.empty(0, dtype=np.float32),
+            np.empty(0, dtype=np.int32),
+            names or {}
+        )
+
+    def __len__(self):
+        return len(self.class_ids)
+
+    @property
+    def objects(self):
+        """All detections with bounding boxes and confidence scores"""
+        if self._objects is None:
+            names = self.names
+            self._objects = [
+                {
+                    'bbox': bbox,
+                    'confidence': confidence,
+                    'class_id': class_id,
+                    'class_name': names.get(class_id, str(class_id))
+                }
+                for bbox, confidence, class_id in zip(
+                    self.boxes_xyxy.tolist(), self.confidences.tolist(), self.class_ids.tolist()
+                )
+            ]
+        return self._objects
+
+    def _person_mask(self):
+        person_ids = [class_id for class_id, name in self.names.items() if name == 'person']
+        return np.isin(self.class_ids, person_ids)
+
+    @property
+    def faces(self):
+        """Person detections (includes faces)"""
+        mask = self._person_mask()
+        return [
+            {
+                'bbox': bbox,
+                'confidence': confidence,
+                'class_name': 'person'
+            }
+            for bbox, confidence in zip(self.boxes_xyxy[mask].tolist(), self.confidences[mask].tolist())
+        ]
+
+    def face_region(self):
+        """Bounding box of the highest confidence face detection, or None"""
+        mask = self._person_mask()
+        if not mask.any():
+            return None
+        person_confidences = np.where(mask, self.confidences, -np.inf)
+        return self.boxes_xyxy[int(np.argmax(person_confidences))].tolist()
+
+def parse_yolo_result(result, names):
+    """
+    Convert one ultralytics result to a YoloDetectionResult.
+    All boxes move to NumPy in a single transfer of the (N, 6) data tensor
+    [x1, y1, x2, y2, confidence, class] instead of three .cpu() calls per box.
+    """
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return YoloDetectionResult.empty(names)
+
+    data = boxes.data.cpu().numpy()
+    return YoloDetectionResult(
+        data[:, :4].astype(np.int32),
+        data[:, 4].astype(np.float32),
+        data[:, 5].astype(np.int32),
+        names
+    )
+
+def predict(model, images, profile):
+    """One detector call on a list of frames; one YoloDetectionResult per frame, for either backend"""
+    if getattr(model, "returns_detection_results", False):
+        # ONNX backend: does its own post-processing
+        return model.predict(images, **profile)
+    return [parse_yolo_result(result, model.names) for result in model(images, **profile)]
+
+def _infer_face_validation_batch(images):
+    """One YOLO call for a batch of frames (FACE_VALIDATION_PROFILE); one parsed result per frame"""
+    return predict(get_yolo_model(), images, FACE_VALIDATION_PROFILE)
+
+# Frames from concurrent requests share batched YOLO calls
+yolo_batcher = YoloBatcher(_infer_face_validation_batch)
+
+def warm_up_yolo(frame):
+    """One face-validation inference, taking the same path as a request (errors propagate)"""
+    if yolo_batcher.max_batch > 1:
+        yolo_batcher.detect(frame)
+    else:
+        _infer_face_validation_batch([frame])
+
+def run_yolo_detection(image, profile=None):
+    """
+    Run YOLO once on the image and parse every box.
+    With the default profile the frame goes through the cross-request batcher
+    (unless batching is disabled); a custom profile runs its own call.
+    Returns: YoloDetectionResult (empty if inference fails)
     """
     try:
+        if profile is None and yolo_batcher.max_batch > 1:
+            return yolo_batcher.detect(image)
         model = get_yolo_model()
-        results = model(image, verbose=False)
-        
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    # Get box coordinates
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    confidence = box.conf[0].cpu().numpy()
-                    class_id = int(box.cls[0].cpu().numpy())
-                    class_name = model.names[class_id]
-                    
-                    detections.append({
-                        'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                        'confidence': float(confidence),
-                        'class_id': class_id,
-                        'class_name': class_name
-                    })
-        
-        return detections
+        results = predict(model, [image], profile or FACE_VALIDATION_PROFILE)
+        if not results:
+            return YoloDetectionResult.empty(model.names)
+        return results[0]
     except Exception as e:
         print(f"YOLO detection error: {e}")
-        return []
+        return YoloDetectionResult.empty()
 
-def detect_face_yolo(image):
+def detect_objects_yolo(image, detection_result=None):
+    """
+    Detect objects using YOLO for better accuracy
+    Returns: list of detections with bounding boxes and confidence scores
+    """
+    if detection_result is None:
+        detection_result = run_yolo_detection(image)
+    return detection_result.objects
+
+def detect_face_yolo(image, detection_result=None):
     """
     Detect faces specifically using YOLO
     Returns: list of face bounding boxes
     """
-    try:
-        model = get_yolo_model()
-        results = model(image, verbose=False)
-        
-        face_detections = []
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    class_id = int(box.cls[0].cpu().numpy())
-                    class_name = model.names[class_id]
-                    
-                    # Filter for person class (includes faces)
-                    if class_name == 'person':
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        confidence = box.conf[0].cpu().numpy()
-                        
-                        face_detections.append({
-                            'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                            'confidence': float(confidence),
-                            'class_name': class_name
-                        })
-        
-        return face_detections
-    except Exception as e:
-        print(f"YOLO face detection error: {e}")
-        return []
+    if detection_result is None:
+        detection_result = run_yolo_detection(image)
+    return detection_result.faces
 
-def get_face_region_yolo(image):
+def get_face_region_yolo(image, detection_result=None):
     """
     Get the main face region from YOLO detection
     Returns: face region coordinates or None
     """
-    face_detections = detect_face_yolo(image)
-    
-    if face_detections:
-        # Get the highest confidence detection
-        best_detection = max(face_detections, key=lambda x: x['confidence'])
-        return best_detection['bbox']
-    
-    return None
-
-def enhance_face_detection_with_yolo(image, mediapipe_landmarks):
+    if detection_result is None:
+        detection_result = run_yolo_detection(image)
+    return detection_result.face_region()
+
+def enhance_face_detection_with_yolo(image, mediapipe_landmarks, detection_result=None):
     """
     Enhance MediaPipe face detection with YOLO validation
+    Pass `detection_result` from run_yolo_detection to reuse an existing inference.
     Returns: enhanced face detection info
     """
     try:
         # Get YOLO face detection
-        yolo_face = get_face_region_yolo(image)
+        yolo_face = get_face_region_yolo(image, detection_result)
         
         # Get MediaPipe landmarks
         mediapipe_success = mediapipe_landmarks is not None and len(mediapipe_landmarks) > 0
@@ -0,0 +1,128 @@
+import threading
+
+import numpy as np
+
+# Sprites whose strongest alpha is below this are treated as invisible (~0.1 opacity)
+MIN_VISIBLE_ALPHA = 26
+
+
+class PreparedSprite:
+    """
+    An RGBA sprite converted once into the form the blend kernel needs:
+
+    - cropped to the bounding box of its non-transparent pixels
+      (`offset_x`/`offset_y` locate the crop inside the original sprite),
+    - colour premultiplied by alpha, stored as uint16 (B*a, G*a, R*a),
+    - inverse alpha (255 - a) as uint16 with a trailing axis for broadcasting.
+
+    `width`, `height` and `shape` describe the original, uncropped sprite.
+    """
+
+    __slots__ = ("premultiplied", "inverse_alpha", "offset_x", "offset_y",
+                 "width", "height", "max_alpha")
+
+    def __init__(self, premultiplied, inverse_alpha, offset_x, offset_y, width, height, max_alpha):
+        self.premultiplied = premultiplied
+        self.inverse_alpha = inverse_alpha
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.width = width
+        self.height = height
+        self.max_alpha = max_alpha
+
+    @property
+    def shape(self):
+        return (self.height, self.width, 4)
+
+    @property
+    def visible(self):
+        return self.premultiplied is not None and self.max_alpha >= MIN_VISIBLE_ALPHA
+
+
+def prepare_sprite(rgba):
+    """
+    Build a PreparedSprite from a BGRA uint8 array.
+    Returns None if the array has no alpha channel.
+    """
+    if rgba is None or rgba.ndim != 3 or rgba.shape[2] != 4:
+        return None
+
+    height, width = rgba.shape[:2]
+    alpha = rgba[..., 3]
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if rows.size == 0:
+        # Fully transparent sprite: nothing to draw
+        return PreparedSprite(None, None, 0, 0, width, height, 0)
+    cols = np.flatnonzero(alpha.any(axis=0))
+    y0, y1 = int(rows[0]), int(rows[-1]) + 1
+    x0, x1 = int(cols[0]), int(cols[-1]) + 1
+
+    cropped = rgba[y0:y1, x0:x1]
+    alpha = cropped[..., 3:].astype(np.uint16)
+    premultiplied = cropped[..., :3] * alpha
+    inverse_alpha = 255 - alpha
+    return PreparedSprite(premultiplied, inverse_alpha, x0, y0, width, height, int(alpha.max()))
+
+
+# Per-thread uint16 scratch buffers, grown on demand, so blending allocates nothing per call
+_scratch = threading.local()
+
+
+def _scratch_buffers(size):
+    buffers = getattr(_scratch, "buffers", None)
+    if buffers is None or buffers[0].size < size:
+        buffers = (np.empty(size, dtype=np.uint16), np.empty(size, dtype=np.uint16))
+        _scratch.buffers = buffers
+    return buffers[0][:size], buffers[1][:size]
+
+
+def blend_prepared_sprite(background, sprite, x, y):
+    """
+    Alpha-blend a PreparedSprite onto `background` (BGR uint8) in place, with
+    the sprite's top-left corner at (x, y). Only the visible, non-transparent
+    rectangle is touched, in uint16 integer arithmetic:
+
+        out = round((bg * (255 - a) + fg * a) / 255)
+
+    Returns True if anything was drawn.
+    """
+    if not sprite.visible:
+        return False
+
+    bh, bw = background.shape[:2]
+    ph, pw = sprite.premultiplied.shape[:2]
+
+    # Position of the cropped (opaque) part of the sprite
+    left = x + sprite.offset_x
+    top = y + sprite.offset_y
+
+    start_x = max(0, left)
+    start_y = max(0, top)
+    end_x = min(bw, left + pw)
+    end_y = min(bh, top + ph)
+    if end_x <= start_x or end_y <= start_y:
+        return False
+
+    sx = start_x - left
+    sy = start_y - top
+    h = end_y - start_y
+    w = end_x - start_x
+
+    roi = background[start_y:end_y, start_x:end_x]
+    premultiplied = sprite.premultiplied[sy:sy + h, sx:sx + w]
+    inverse_alpha = sprite.inverse_alpha[sy:sy + h, sx:sx + w]
+
+    acc, tmp = _scratch_buffers(h * w * 3)
+    acc = acc.reshape(h, w, 3)
+    tmp = tmp.reshape(h, w, 3)
+
+    # bg * (255 - a) + fg * a fits in uint16 (max 255 * 255)
+    np.multiply(roi, inverse_alpha, out=acc)
+    np.add(acc, premultiplied, out=acc)
+    # Exact rounded division by 255: t = x + 128; (t + (t >> 8)) >> 8
+    np.add(acc, 128, out=acc)
+    np.right_shift(acc, 8, out=tmp)
+    np.add(acc, tmp, out=acc)
+    np.right_shift(acc, 8, out=acc)
+    np.copyto(roi, acc, casting="unsafe")
+    return True
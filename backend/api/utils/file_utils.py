@@ -5,6 +5,9 @@ from fastapi import UploadFile
 import shutil
 import math
 
+from api.utils.alpha_blend import PreparedSprite, prepare_sprite, blend_prepared_sprite
+from api.utils.sprite_cache import get_transformed_sprite, sprite_geometry
+
 def save_upload_file(upload_file: UploadFile, dest_folder: str) -> str:
     """
     Save an uploaded file to a specified destination folder.
@@ -18,65 +21,35 @@ def save_upload_file(upload_file: UploadFile, dest_folder: str) -> str:
 def overlay_image_alpha(background, overlay, x, y):
     """
     Overlay `overlay` onto `background` at position (x, y) with alpha blending.
-    Assumes overlay has 4 channels (RGBA).
+    `overlay` is either an RGBA array or a PreparedSprite (premultiplied once,
+    e.g. by the sprite cache). Blending happens in place on the visible region.
     """
     try:
-        bh, bw = background.shape[:2]
-        oh, ow = overlay.shape[:2]
-
-        # Check if overlay is completely outside the image
-        if x >= bw or y >= bh or x + ow <= 0 or y + oh <= 0:
-            return background
-
-        # Calculate the region of the overlay that will be visible
-        start_x = max(0, x)
-        end_x = min(bw, x + ow)
-        start_y = max(0, y)
-        end_y = min(bh, y + oh)
-
-        # Calculate the corresponding region in the overlay
-        overlay_start_x = start_x - x
-        overlay_start_y = start_y - y
-        overlay_end_x = overlay_start_x + (end_x - start_x)
-        overlay_end_y = overlay_start_y + (end_y - start_y)
-
-        # Check if the visible region is valid
-        if (end_x <= start_x or end_y <= start_y or 
-            overlay_end_x <= overlay_start_x or overlay_end_y <= overlay_start_y):
-            return background
-
-        # Extract the visible region from the overlay
-        overlay_visible = overlay[overlay_start_y:overlay_end_y, overlay_start_x:overlay_end_x]
-        
-        # Check if overlay has alpha channel
-        if overlay_visible.shape[2] != 4:
-            print(f"DEBUG: Overlay does not have alpha channel - shape: {overlay_visible.shape}")
-            return background
-
-        # Split overlay into RGB and alpha
-        overlay_img = overlay_visible[..., :3]
-        mask = overlay_visible[..., 3:] / 255.0
-
-        # Check if mask has any non-transparent pixels
-        max_alpha = np.max(mask)
-        print(f"DEBUG: Overlay alpha range - Min: {np.min(mask):.3f}, Max: {max_alpha:.3f}")
-        
-        if max_alpha < 0.1:  # If the hat is mostly transparent
-            print(f"DEBUG: WARNING - Hat is mostly transparent (max alpha: {max_alpha:.3f})")
+        if not isinstance(overlay, PreparedSprite):
+            bh, bw = background.shape[:2]
+            oh, ow = overlay.shape[:2]
+
+            # Check if overlay is completely outside the image
+            if x >= bw or y >= bh or x + ow <= 0 or y + oh <= 0:
+                return background
+
+            # Only prepare the part of the overlay that will be visible
+            start_x = max(0, x)
+            start_y = max(0, y)
+            overlay = overlay[start_y - y:min(bh, y + oh) - y, start_x - x:min(bw, x + ow) - x]
+            x, y = start_x, start_y
+
+            prepared = prepare_sprite(overlay)
+            if prepared is None:
+                print(f"DEBUG: Overlay does not have alpha channel - shape: {overlay.shape}")
+                return background
+            overlay = prepared
+
+        if not overlay.visible:
+            print(f"DEBUG: WARNING - Overlay is mostly transparent (max alpha: {overlay.max_alpha / 255.0:.3f})")
             return background
 
-        # Ensure mask has correct shape for broadcasting
-        if mask.shape[2] == 1:
-            mask = np.repeat(mask, 3, axis=2)
-
-        # Blend overlay
-        background_region = background[start_y:end_y, start_x:end_x]
-        background[start_y:end_y, start_x:end_x] = (
-            background_region * (1 - mask) + overlay_img * mask
-        ).astype(np.uint8)
-        
-        print(f"DEBUG: Overlay applied successfully - alpha max: {max_alpha:.3f}")
-
+        blend_prepared_sprite(background, overlay, x, y)
         return background
     except Exception as e:
         print(f"Overlay error: {e}")
@@ -169,15 +142,16 @@ def place_accessory_on_face_cached(image, accessory_array, landmark_points, left
         print(f"Error placing cached accessory: {e}")
         return image
 
-def place_product_with_measurements(image, accessory_array, facial_measurements, product_type='glasses', product_dimensions=None):
+def place_product_with_measurements(image, accessory_array, facial_measurements, product_type='glasses', product_dimensions=None, sprite_key=None):
     """
     Enhanced product placement using facial measurements for accurate sizing and positioning.
     
     :param image: Input image (OpenCV BGR)
     :param accessory_array: Product image array (RGBA)
-    :param facial_measurements: Dictionary of facial measurements
+    :param facial_measurements: FacialMeasurements (or a dict with the same keys)
     :param product_type: Type of product ('glasses', 'hat', etc.)
     :param product_dimensions: Optional specific product dimensions
+    :param sprite_key: Optional product id; enables the resized/rotated sprite cache
     :return: Image with product overlaid, placement_info
     """
     try:
@@ -192,9 +166,9 @@ def place_product_with_measurements(image, accessory_array, facial_measurements,
         }
 
         if product_type == 'glasses':
-            return place_glasses_accurately(image, accessory_array, facial_measurements, product_dimensions, placement_info)
+            return place_glasses_accurately(image, accessory_array, facial_measurements, product_dimensions, placement_info, sprite_key)
         elif product_type == 'hat':
-            return place_hat_accurately(image, accessory_array, facial_measurements, product_dimensions, placement_info)
+            return place_hat_accurately(image, accessory_array, facial_measurements, product_dimensions, placement_info, sprite_key)
         else:
             # Fallback to basic placement
             return place_accessory_on_face_cached(image, accessory_array, 
@@ -204,7 +178,72 @@ def place_product_with_measurements(image, accessory_array, facial_measurements,
         print(f"Error in accurate product placement: {e}")
         return image, None
 
-def place_glasses_accurately(image, glasses_array, facial_measurements, product_dimensions, placement_info):
+def serialize_placement_info(placement_info):
+    """JSON-ready copy of placement_info (the measurement record becomes a plain dict)"""
+    if placement_info is None:
+        return None
+    serialized = dict(placement_info)
+    facial_measurements = serialized.get('facial_measurements')
+    if hasattr(facial_measurements, 'to_dict'):
+        serialized['facial_measurements'] = facial_measurements.to_dict()
+    return serialized
+
+def placement_region(placement_info, image_shape):
+    """
+    Rectangle the placed sprite covers, clipped to the image: (x, y, width, height),
+    or None if nothing was placed or it lies outside the image
+    """
+    if not placement_info or 'placement_coordinates' not in placement_info:
+        return None
+    size = placement_info.get('glasses_dimensions_pixels') or placement_info.get('hat_dimensions_pixels')
+    if size is None:
+        return None
+    x, y = placement_info['placement_coordinates']
+    h, w = image_shape[:2]
+    x0, y0 = max(0, int(x)), max(0, int(y))
+    x1, y1 = min(w, int(x) + int(size[0])), min(h, int(y) + int(size[1]))
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1 - x0, y1 - y0
+
+def glasses_size(facial_measurements, product_dimensions):
+    """
+    Glasses sprite size from the product's frame dimensions (or the IPD when none are given).
+    Returns: frame_width_pixels, frame_height_pixels, frame_width_mm, frame_height_mm
+    """
+    # FIXED: Use the scaled pixels_per_mm for better glasses sizing
+    pixels_per_mm = facial_measurements.get('pixels_per_mm_scaled', facial_measurements['pixels_per_mm'])
+    
+    # Calculate accurate glasses dimensions
+    if product_dimensions:
+        # Use provided product dimensions
+        frame_width_mm = product_dimensions.get('frame_width_mm', 135)
+        frame_height_mm = product_dimensions.get('frame_height_mm', 50)
+    else:
+        # Calculate based on facial measurements
+        ipd_mm = facial_measurements['estimated_ipd_mm']
+        frame_width_mm = ipd_mm * 1.1  # 10% wider than IPD
+        frame_height_mm = frame_width_mm * 0.4
+    
+    # Convert to pixels using the scaled measurement
+    frame_width_pixels = int(frame_width_mm * pixels_per_mm)
+    frame_height_pixels = int(frame_height_mm * pixels_per_mm)
+    return frame_width_pixels, frame_height_pixels, frame_width_mm, frame_height_mm
+
+def glasses_position(facial_measurements, frame_width_pixels, frame_height_pixels):
+    """Top-left corner of a glasses sprite of the given size"""
+    eye_center = facial_measurements['eye_center']
+    
+    # Position glasses accurately
+    # Center horizontally on eye center (no yaw offset: it pushed the frame off the eyes)
+    x = int(eye_center[0] - frame_width_pixels // 2)
+    
+    # Position vertically at eye level, not nose bridge level
+    # Glasses should be centered on the eyes, not on the nose
+    y = eye_center[1] - frame_height_pixels // 2
+    return x, y
+
+def place_glasses_accurately(image, glasses_array, facial_measurements, product_dimensions, placement_info, sprite_key=None):
     """
     Place glasses with accurate sizing and positioning based on facial measurements.
     """
@@ -212,73 +251,31 @@ def place_glasses_accurately(image, glasses_array, facial_measurements, product_
         print(f"DEBUG: Starting glasses placement")
         print(f"DEBUG: Facial measurements keys: {list(facial_measurements.keys())}")
         
-        # Get key facial points
-        eye_center = facial_measurements['eye_center']
-        nose_bridge = facial_measurements['nose_bridge']
         ipd_pixels = facial_measurements['ipd_pixels']
-        
-        # FIXED: Use the scaled pixels_per_mm for better glasses sizing
-        pixels_per_mm = facial_measurements.get('pixels_per_mm_scaled', facial_measurements['pixels_per_mm'])
-        
-        print(f"DEBUG: Eye center: {eye_center}")
-        print(f"DEBUG: Nose bridge: {nose_bridge}")
+        print(f"DEBUG: Eye center: {facial_measurements['eye_center']}")
+        print(f"DEBUG: Nose bridge: {facial_measurements['nose_bridge']}")
         print(f"DEBUG: IPD pixels: {ipd_pixels}")
-        print(f"DEBUG: Pixels per mm (using scaled): {pixels_per_mm}")
         
         # Get head pose for rotation correction
         head_yaw = facial_measurements.get('head_yaw_radians', 0)
         head_roll = facial_measurements.get('head_roll_radians', 0)
         
-        # Calculate accurate glasses dimensions
-        if product_dimensions:
-            # Use provided product dimensions
-            frame_width_mm = product_dimensions.get('frame_width_mm', 135)
-            frame_height_mm = product_dimensions.get('frame_height_mm', 50)
-        else:
-            # Calculate based on facial measurements
-            ipd_mm = facial_measurements['estimated_ipd_mm']
-            frame_width_mm = ipd_mm * 1.1  # 10% wider than IPD
-            frame_height_mm = frame_width_mm * 0.4
-        
-        # Convert to pixels using the scaled measurement
-        frame_width_pixels = int(frame_width_mm * pixels_per_mm)
-        frame_height_pixels = int(frame_height_mm * pixels_per_mm)
+        frame_width_pixels, frame_height_pixels, frame_width_mm, frame_height_mm = glasses_size(
+            facial_measurements, product_dimensions
+        )
         
         print(f"DEBUG: Frame width: {frame_width_mm}mm = {frame_width_pixels} pixels")
         print(f"DEBUG: Frame height: {frame_height_mm}mm = {frame_height_pixels} pixels")
         print(f"DEBUG: Original glasses size: {glasses_array.shape}")
         
-        # Resize glasses to accurate dimensions
-        glasses_resized = cv2.resize(glasses_array, (frame_width_pixels, frame_height_pixels))
+        # Resize glasses to accurate dimensions and apply head roll correction
+        # (rotated when the head is tilted more than ~6 degrees; cached per product when sprite_key is set)
+        glasses_resized, frame_width_pixels, frame_height_pixels = get_transformed_sprite(
+            glasses_array, frame_width_pixels, frame_height_pixels, head_roll, sprite_key
+        )
         print(f"DEBUG: Resized glasses size: {glasses_resized.shape}")
         
-        # Apply head pose corrections
-        if abs(head_roll) > 0.1:  # If head is tilted more than ~6 degrees
-            # Create rotation matrix
-            center = (frame_width_pixels // 2, frame_height_pixels // 2)
-            rotation_matrix = cv2.getRotationMatrix2D(center, math.degrees(head_roll), 1.0)
-            glasses_resized = cv2.warpAffine(glasses_resized, rotation_matrix, 
-                                           (frame_width_pixels, frame_height_pixels), 
-                                           flags=cv2.INTER_LINEAR, 
-                                           borderMode=cv2.BORDER_TRANSPARENT)
-        
-        # Position glasses accurately
-        # Center horizontally on eye center
-        x = eye_center[0] - frame_width_pixels // 2
-        
-        # Position vertically at eye level, not nose bridge level
-        # Glasses should be centered on the eyes, not on the nose
-        y = eye_center[1] - frame_height_pixels // 2
-        
-        # Apply yaw correction (perspective adjustment)
-        if abs(head_yaw) > 0.1:  # If head is turned more than ~6 degrees
-            # Adjust horizontal position based on yaw
-            yaw_offset = int(head_yaw * frame_width_pixels * 0.3)
-            x += yaw_offset
-        
-        # Ensure glasses are perfectly centered on eyes
-        # Fine-tune horizontal position to match eye center exactly
-        x = int(eye_center[0] - frame_width_pixels // 2)
+        x, y = glasses_position(facial_measurements, frame_width_pixels, frame_height_pixels)
         
         # Overlay the glasses
         result_image = overlay_image_alpha(image, glasses_resized, x, y)
@@ -304,7 +301,52 @@ def place_glasses_accurately(image, glasses_array, facial_measurements, product_
         print(f"Error in accurate glasses placement: {e}")
         return image, placement_info
 
-def place_hat_accurately(image, hat_array, facial_measurements, product_dimensions, placement_info):
+def hat_size(facial_measurements, product_dimensions):
+    """
+    Hat sprite size from the product's dimensions (or the MediaPipe head width when none are given).
+    Returns: hat_width_pixels, hat_height_pixels, hat_width_mm, hat_height_mm
+    """
+    # FIXED: Use the scaled pixels_per_mm for better hat sizing
+    pixels_per_mm = facial_measurements.get('pixels_per_mm_scaled', facial_measurements['pixels_per_mm'])
+    
+    # Calculate accurate hat dimensions
+    if product_dimensions:
+        hat_width_mm = product_dimensions.get('hat_width_mm', 220)
+        hat_height_mm = product_dimensions.get('hat_height_mm', 120)
+    else:
+        # Use head measurements for better sizing
+        face_width_mm = facial_measurements.get('face_width_mm', 140)  # Default fallback
+        head_width_mm = facial_measurements.get('head_width_mm', face_width_mm * 1.3)
+        hat_width_mm = head_width_mm * 1.1  # Slightly wider than head
+        hat_height_mm = head_width_mm * 0.6  # Proportional height
+    
+    # Convert to pixels using the scaled measurement
+    hat_width_pixels = int(hat_width_mm * pixels_per_mm)
+    hat_height_pixels = int(hat_height_mm * pixels_per_mm)
+    return hat_width_pixels, hat_height_pixels, hat_width_mm, hat_height_mm
+
+def hat_position(facial_measurements, hat_width_pixels, hat_height_pixels, image_shape):
+    """Top-left corner of a hat sprite of the given size, kept inside the image"""
+    # FIXED: Use head_top_center as the primary reference point for hat placement
+    # This is the actual top of the head detected by MediaPipe
+    head_top_center = facial_measurements.get('head_top_center', facial_measurements['forehead_center'])
+    
+    # Position hat centered on head top center
+    x = head_top_center[0] - hat_width_pixels // 2
+    
+    # Position hat slightly above the head top center for better visual placement
+    # Place hat so there's a small gap between head top and hat bottom
+    y = head_top_center[1] - hat_height_pixels - 20  # 20px gap above head top
+    
+    # No yaw correction: it over-corrected the hat position on turned heads
+    
+    # ENHANCED: Validate placement within image bounds
+    img_height, img_width = image_shape[:2]
+    x = max(0, min(x, img_width - hat_width_pixels))
+    y = max(0, min(y, img_height - hat_height_pixels))
+    return x, y
+
+def place_hat_accurately(image, hat_array, facial_measurements, product_dimensions, placement_info, sprite_key=None):
     """
     Place hat with accurate sizing and positioning based on enhanced head detection.
     Uses MediaPipe landmarks + YOLO detection for better head region identification.
@@ -316,9 +358,6 @@ def place_hat_accurately(image, hat_array, facial_measurements, product_dimensio
         forehead_center = facial_measurements['forehead_center']
         face_width_pixels = facial_measurements['face_width_pixels']
         
-        # FIXED: Use the scaled pixels_per_mm for better hat sizing
-        pixels_per_mm = facial_measurements.get('pixels_per_mm_scaled', facial_measurements['pixels_per_mm'])
-        
         # Get head pose
         head_yaw = facial_measurements.get('head_yaw_radians', 0)
         head_roll = facial_measurements.get('head_roll_radians', 0)
@@ -337,59 +376,21 @@ def place_hat_accurately(image, hat_array, facial_measurements, product_dimensio
         
         print(f"DEBUG: Using MediaPipe head detection - Top center: {head_top_center}, Width: {head_width_mm:.1f}mm, Height: {head_height_mm:.1f}mm")
         
-        # Calculate accurate hat dimensions
-        if product_dimensions:
-            hat_width_mm = product_dimensions.get('hat_width_mm', 220)
-            hat_height_mm = product_dimensions.get('hat_height_mm', 120)
-        else:
-            # Use head measurements for better sizing
-            hat_width_mm = head_width_mm * 1.1  # Slightly wider than head
-            hat_height_mm = head_width_mm * 0.6  # Proportional height
-        
-        # Convert to pixels using the scaled measurement
-        hat_width_pixels = int(hat_width_mm * pixels_per_mm)
-        hat_height_pixels = int(hat_height_mm * pixels_per_mm)
+        hat_width_pixels, hat_height_pixels, hat_width_mm, hat_height_mm = hat_size(
+            facial_measurements, product_dimensions
+        )
         
         print(f"DEBUG: Hat dimensions - Width: {hat_width_pixels}px ({hat_width_mm}mm), Height: {hat_height_pixels}px ({hat_height_mm}mm)")
         print(f"DEBUG: Head region - Top center: {head_top_center}, Forehead: {forehead_center}")
         print(f"DEBUG: Using head top center for positioning: {head_top_center}")
         
-        # Resize hat to accurate dimensions
-        hat_resized = cv2.resize(hat_array, (hat_width_pixels, hat_height_pixels))
-        
-        # Apply head pose corrections
-        if abs(head_roll) > 0.1:
-            center = (hat_width_pixels // 2, hat_height_pixels // 2)
-            rotation_matrix = cv2.getRotationMatrix2D(center, math.degrees(head_roll), 1.0)
-            hat_resized = cv2.warpAffine(hat_resized, rotation_matrix, 
-                                       (hat_width_pixels, hat_height_pixels), 
-                                       flags=cv2.INTER_LINEAR, 
-                                       borderMode=cv2.BORDER_TRANSPARENT)
-        
-        # FIXED: Use head_top_center as the primary reference point for hat placement
-        # This is the actual top of the head detected by MediaPipe
-        head_top_center = facial_measurements.get('head_top_center', forehead_center)
-        
-        # Position hat centered on head top center
-        x = head_top_center[0] - hat_width_pixels // 2
-        
-        # Position hat slightly above the head top center for better visual placement
-        # Place hat so there's a small gap between head top and hat bottom
-        y = head_top_center[1] - hat_height_pixels - 20  # 20px gap above head top
-        
-        # TEMPORARILY DISABLE yaw correction to test positioning
-        # Apply yaw correction for head rotation (reduced to prevent over-correction)
-        if abs(head_yaw) > 0.1:
-            yaw_offset = int(head_yaw * hat_width_pixels * 0.0)  # DISABLED for testing
-            x += yaw_offset
-            print(f"DEBUG: Yaw correction DISABLED for testing (head_yaw: {head_yaw:.3f})")
-        else:
-            print(f"DEBUG: No yaw correction needed (head_yaw: {head_yaw:.3f})")
+        # Resize hat to accurate dimensions and apply head roll correction
+        # (cached per product when sprite_key is set)
+        hat_resized, hat_width_pixels, hat_height_pixels = get_transformed_sprite(
+            hat_array, hat_width_pixels, hat_height_pixels, head_roll, sprite_key
+        )
         
-        # ENHANCED: Validate placement within image bounds
-        img_height, img_width = image.shape[:2]
-        x = max(0, min(x, img_width - hat_width_pixels))
-        y = max(0, min(y, img_height - hat_height_pixels))
+        x, y = hat_position(facial_measurements, hat_width_pixels, hat_height_pixels, image.shape)
         
         print(f"DEBUG: Final hat position - X: {x}, Y: {y}")
         print(f"DEBUG: Hat covers head region from ({x}, {y}) to ({x + hat_width_pixels}, {y + hat_height_pixels})")
@@ -400,19 +401,6 @@ def place_hat_accurately(image, hat_array, facial_measurements, product_dimensio
         result_image = overlay_image_alpha(image, hat_resized, x, y)
         print(f"DEBUG: After hat overlay - Result shape: {result_image.shape}")
         
-        # Check if the hat was actually placed (more reliable check)
-        if result_image is not None:
-            # Check if any pixels changed (more reliable than array_equal)
-            diff = np.abs(image.astype(np.float32) - result_image.astype(np.float32))
-            max_diff = np.max(diff)
-            print(f"DEBUG: Image difference after overlay - Max pixel difference: {max_diff:.2f}")
-            if max_diff > 1.0:  # If any pixel changed by more than 1 unit
-                print(f"DEBUG: Hat overlay successful - image was modified (max diff: {max_diff:.2f})")
-            else:
-                print(f"DEBUG: WARNING - Hat overlay may have failed - no significant changes (max diff: {max_diff:.2f})")
-        else:
-            print(f"DEBUG: ERROR - result_image is None")
-        
         # Update placement info with enhanced data
         placement_info.update({
             'placement_coordinates': (x, y),
@@ -441,6 +429,46 @@ def place_hat_accurately(image, hat_array, facial_measurements, product_dimensio
         traceback.print_exc()
         return image, placement_info
 
+def compute_placement_transform(facial_measurements, product_type, product_dimensions, image_shape, scale=1.0,
+                                quantized=True):
+    """
+    Where the server would draw the product, without drawing it: the sprite's
+    top-left corner, size, centre and rotation (degrees, counter-clockwise, the
+    cv2.getRotationMatrix2D convention; 0 for rolls under the drawing threshold),
+    for clients that composite the sprite themselves.
+
+    `image_shape` is the shape of the frame the measurements were taken on;
+    `scale` maps those pixels to the client's frame (original / processed width).
+    `quantized` matches placements drawn with a sprite_key (the sprite cache's
+    size and roll steps), as the streaming endpoints do.
+    Returns None if the product type has no placement or measurements are incomplete.
+    """
+    head_roll = facial_measurements.get('head_roll_radians', 0)
+    try:
+        if product_type == 'glasses':
+            width, height, width_mm, height_mm = glasses_size(facial_measurements, product_dimensions)
+            width, height, rotation = sprite_geometry(width, height, head_roll, quantized)
+            x, y = glasses_position(facial_measurements, width, height)
+        elif product_type == 'hat':
+            width, height, width_mm, height_mm = hat_size(facial_measurements, product_dimensions)
+            width, height, rotation = sprite_geometry(width, height, head_roll, quantized)
+            x, y = hat_position(facial_measurements, width, height, image_shape)
+        else:
+            return None
+    except KeyError as e:
+        print(f"Error computing placement transform, missing measurement: {e}")
+        return None
+
+    return {
+        'x': round(x * scale, 1),
+        'y': round(y * scale, 1),
+        'width': round(width * scale, 1),
+        'height': round(height * scale, 1),
+        'center': (round((x + width / 2) * scale, 1), round((y + height / 2) * scale, 1)),
+        'rotation_degrees': round(rotation, 2),
+        'dimensions_mm': (width_mm, height_mm)
+    }
+
 def draw_measurement_overlay(image, facial_measurements, product_dimensions=None):
     """
     Draw measurement overlays on the image for debugging and visualization.
@@ -0,0 +1,42 @@
+import asyncio
+
+
+class LatestFrameSlot:
+    """
+    Single-slot mailbox between a WebSocket receive loop and its processing task.
+
+    `put` replaces any frame still waiting, so the processor always picks up
+    the newest frame and a slow pipeline never builds a backlog. `put` returns
+    the frame it replaced (or None) so the caller can count the drop.
+    Only used from the event loop; no locking needed.
+    """
+
+    def __init__(self):
+        self._frame = None
+        self._closed = False
+        self._ready = asyncio.Event()
+
+    def put(self, frame):
+        replaced = self._frame
+        self._frame = frame
+        self._ready.set()
+        return replaced
+
+    async def get(self):
+        """Wait for the next frame; returns None once the slot is closed and empty"""
+        while self._frame is None:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        frame = self._frame
+        self._frame = None
+        return frame
+
+    def close(self):
+        """Drop any waiting frame and wake the processor so it can exit"""
+        self._closed = True
+        dropped = self._frame
+        self._frame = None
+        self._ready.set()
+        return dropped
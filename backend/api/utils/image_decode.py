@@ -0,0 +1,116 @@
+import base64
+import time
+
+import cv2
+import numpy as np
+
+from api.config import REDUCED_DECODE_ENABLED
+
+# JPEG start-of-frame markers (all coding processes); 0xC4/0xC8/0xCC are DHT/JPG/DAC
+_SOF_MARKERS = frozenset((0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF))
+_START_OF_SCAN = 0xDA
+# libjpeg scales by 1/2, 1/4 or 1/8 during the inverse DCT, without decoding full size first
+_REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2)
+)
+
+
+def jpeg_dimensions(data):
+    """
+    (width, height) from the SOF header of a JPEG, without decoding it.
+    Returns None for other formats or a header that cannot be parsed.
+    """
+    view = memoryview(data)
+    size = len(view)
+    if size < 4 or view[0] != 0xFF or view[1] != 0xD8:
+        return None
+    pos = 2
+    while pos + 4 <= size:
+        if view[pos] != 0xFF:
+            return None
+        marker = view[pos + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            # Markers without a length field
+            pos += 2
+            continue
+        if marker in _SOF_MARKERS:
+            if pos + 9 > size:
+                return None
+            height = (view[pos + 5] << 8) | view[pos + 6]
+            width = (view[pos + 7] << 8) | view[pos + 8]
+            return (width, height) if width and height else None
+        if marker == _START_OF_SCAN:
+            return None
+        pos += 2 + ((view[pos + 2] << 8) | view[pos + 3])
+    return None
+
+
+def reduced_decode_factor(width, height, min_side):
+    """Largest libjpeg scale denominator that keeps the longer side at `min_side` pixels or more (1 = full size)"""
+    longest = max(width, height)
+    for factor, _ in _REDUCED_DECODE_FLAGS:
+        # libjpeg rounds scaled dimensions up
+        if -(-longest // factor) >= min_side:
+            return factor
+    return 1
+
+
+class DecodedFrame:
+    """
+    An image already decoded by the API process, with its original (width,
+    height) and the time the decode took. The worker pool moves the pixels to
+    a worker through shared memory; decode_image() passes it through unchanged.
+    """
+
+    __slots__ = ("image", "original_size", "decode_seconds")
+
+    def __init__(self, image, original_size, decode_seconds=0.0):
+        self.image = image
+        self.original_size = original_size
+        self.decode_seconds = decode_seconds
+
+
+def decode_frame(data, min_side=None):
+    """decode_image() of encoded bytes or base64 text, as a DecodedFrame (image None if undecodable)"""
+    started = time.perf_counter()
+    if isinstance(data, str):
+        data = base64.b64decode(data)
+    image, original_size = decode_image(data, min_side)
+    return DecodedFrame(image, original_size, time.perf_counter() - started)
+
+
+def decode_image(data, min_side=None):
+    """
+    Decode an uploaded or streamed image to BGR.
+
+    With `min_side`, a JPEG whose longer side is at least 2x that size is
+    decoded directly at 1/2, 1/4 or 1/8 scale, still leaving `min_side`
+    pixels on the longer side for the caller's resize to the tier's
+    processing size. Other formats, and callers that composite on the full
+    frame, get a full-size decode.
+    Returns: image (None if undecodable), (original width, original height)
+    """
+    if isinstance(data, DecodedFrame):
+        return data.image, data.original_size
+    flags = cv2.IMREAD_COLOR
+    dimensions = jpeg_dimensions(data) if min_side and REDUCED_DECODE_ENABLED else None
+    if dimensions is not None:
+        factor = reduced_decode_factor(dimensions[0], dimensions[1], min_side)
+        flags = dict(_REDUCED_DECODE_FLAGS).get(factor, cv2.IMREAD_COLOR)
+
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), flags)
+    if image is None:
+        return None, None
+    height, width = image.shape[:2]
+    if dimensions is None:
+        return image, (width, height)
+    if (width > height) != (dimensions[0] > dimensions[1]) and width != height:
+        # EXIF orientation was applied while decoding: the header describes the stored, unrotated image
+        dimensions = (dimensions[1], dimensions[0])
+    return image, dimensions
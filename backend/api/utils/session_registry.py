@@ -0,0 +1,47 @@
+import threading
+import time
+from collections import OrderedDict
+
+from api.config import SESSION_TTL_SECONDS, MAX_TRACKED_SESSIONS
+
+
+class SessionRegistry:
+    """
+    Per-session state for /tryon clients that stream over HTTP and send a
+    stable session_id. Entries expire after `ttl` seconds without a frame;
+    at most `max_sessions` are kept (least recently used dropped first).
+    """
+
+    def __init__(self, ttl=SESSION_TTL_SECONDS, max_sessions=MAX_TRACKED_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max(1, max_sessions)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            value, updated_at = entry
+            if now - updated_at > self.ttl:
+                del self._entries[session_id]
+                return None
+            return value
+
+    def put(self, session_id, value):
+        """Store the session's state for its next frame (None forgets the session)"""
+        with self._lock:
+            if value is None:
+                self._entries.pop(session_id, None)
+                return
+            self._entries[session_id] = (value, time.monotonic())
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """Registry size for the debug endpoint"""
+        with self._lock:
+            return {"sessions": len(self._entries), "max_sessions": self.max_sessions, "ttl_seconds": self.ttl}
@@ -0,0 +1,131 @@
+import math
+import threading
+from collections import OrderedDict
+
+import cv2
+
+from api.utils.alpha_blend import prepare_sprite
+from api.config import SPRITE_CACHE_MAX_ENTRIES, SPRITE_SIZE_STEP_PIXELS, SPRITE_ROLL_STEP_DEGREES
+
+# Head roll below this (~6 degrees) is drawn without rotation
+ROLL_THRESHOLD_RADIANS = 0.1
+
+
+class SpriteCache:
+    """
+    LRU of resized/rotated accessory sprites.
+
+    Consecutive frames of a stream produce nearly identical sprite sizes and
+    head roll, so sprites are keyed by (product, quantized width, quantized
+    height, quantized roll) and resampled only on a miss. Each entry keeps a
+    reference to the source image it was made from; a lookup with a different
+    source (the accessory store reloaded an edited PNG) is a miss and replaces it.
+    Entries are PreparedSprites (premultiplied once) shared between requests.
+    """
+
+    def __init__(self, max_entries=SPRITE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self, key, factory, source=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is source:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        sprite = factory()
+
+        with self._lock:
+            self._entries[key] = (source, sprite)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return sprite
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters for the debug endpoint"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
+
+
+sprite_cache = SpriteCache()
+
+
+def quantize_pixels(pixels, step=SPRITE_SIZE_STEP_PIXELS):
+    """Round a sprite dimension to the cache's pixel step (never below one step)"""
+    step = max(1, step)
+    return max(step, int(round(pixels / step)) * step)
+
+
+def quantize_roll_degrees(roll_radians, step=SPRITE_ROLL_STEP_DEGREES):
+    """Bucket head roll to the cache's angle step; small rolls are not rotated at all"""
+    if abs(roll_radians) <= ROLL_THRESHOLD_RADIANS:
+        return 0.0
+    degrees = math.degrees(roll_radians)
+    if step <= 0:
+        return degrees
+    return round(degrees / step) * step
+
+
+def _transform_sprite(accessory_array, width, height, roll_degrees):
+    sprite = cv2.resize(accessory_array, (width, height))
+    if roll_degrees:
+        center = (width // 2, height // 2)
+        rotation_matrix = cv2.getRotationMatrix2D(center, roll_degrees, 1.0)
+        sprite = cv2.warpAffine(sprite, rotation_matrix,
+                                (width, height),
+                                flags=cv2.INTER_LINEAR,
+                                borderMode=cv2.BORDER_CONSTANT,
+                                borderValue=(0, 0, 0, 0))
+    prepared = prepare_sprite(sprite)
+    # Accessories without alpha are passed through so the overlay can report them
+    return prepared if prepared is not None else sprite
+
+
+def sprite_geometry(width, height, roll_radians, quantized=True):
+    """
+    Size and rotation a sprite is drawn with: (width, height, roll degrees).
+    Quantized to the cache's steps when `quantized`, so anything computing
+    where a cached sprite lands uses the same numbers as the drawing code.
+    """
+    if not quantized:
+        roll_degrees = math.degrees(roll_radians) if abs(roll_radians) > ROLL_THRESHOLD_RADIANS else 0.0
+        return width, height, roll_degrees
+    return quantize_pixels(width), quantize_pixels(height), quantize_roll_degrees(roll_radians)
+
+
+def get_transformed_sprite(accessory_array, width, height, roll_radians, sprite_key=None):
+    """
+    Resize the accessory to (width, height) and rotate it by the head roll.
+
+    With a `sprite_key` (normally the product id) the size and roll are
+    quantized and the result comes from / goes into the sprite cache.
+    Returns: sprite (a PreparedSprite ready for overlay_image_alpha), width, height
+    (the dimensions actually used)
+    """
+    width, height, roll_degrees = sprite_geometry(width, height, roll_radians, quantized=sprite_key is not None)
+    if sprite_key is None:
+        return _transform_sprite(accessory_array, width, height, roll_degrees), width, height
+
+    key = (sprite_key, width, height, roll_degrees)
+    sprite = sprite_cache.get_or_create(
+        key, lambda: _transform_sprite(accessory_array, width, height, roll_degrees), accessory_array
+    )
+    return sprite, width, height
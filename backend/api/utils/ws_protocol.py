@@ -0,0 +1,98 @@
+import struct
+
+# Binary frame protocol for /websocket-tryon.
+#
+# A client opts in by sending a JSON control message
+#     {"type": "hello", "binary": true, "protocol_version": 2}
+# and the server answers {"type": "hello_ack", "binary": true, ...}, or with an
+# error message (staying on the text protocol) if it speaks another version. After that,
+# frames travel as binary WebSocket messages: a fixed header followed by the raw
+# JPEG bytes. Control messages (ping/pong, errors) stay JSON text messages.
+#
+# Header (network byte order, 28 bytes):
+#     B    protocol version
+#     B    flags
+#     H    responses: frames dropped since the previous response (saturating); requests: 0
+#     I    sequence number (echoed back in the response)
+#     I    client timestamp in ms, any epoch, wrapping (echoed back in the response)
+#     16s  product id, ASCII, NUL-padded
+#
+# Patch responses (FLAG_PATCH) put the region's position in the client's frame
+# between the header and the JPEG: x, y, width, height as H each (all 0 and no
+# JPEG when nothing was drawn).
+# Version 1 is the original JSON/base64 text protocol; binary frames start at 2
+PROTOCOL_VERSION = 2
+HEADER = struct.Struct("!BBHII16s")
+HEADER_SIZE = HEADER.size
+PRODUCT_ID_SIZE = 16
+PATCH_HEADER = struct.Struct("!HHHH")
+
+# Request and response: the product is a hat (otherwise glasses)
+FLAG_HAT = 0x01
+# Response only: a face was found and the product was drawn
+FLAG_FACE_DETECTED = 0x02
+# Request only: answer with the placement transform (JSON text message) instead of an image
+FLAG_TRANSFORM = 0x04
+# Request and response: answer with only the composited accessory region
+FLAG_PATCH = 0x08
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def pack_frame(seq, product_id, jpeg_bytes, flags=0, client_ts=0, dropped=0):
+    """Header + JPEG payload for one binary frame"""
+    encoded_id = product_id.encode("ascii", "replace")[:PRODUCT_ID_SIZE]
+    header = HEADER.pack(PROTOCOL_VERSION, flags, min(dropped, 0xFFFF),
+                         seq & 0xFFFFFFFF, client_ts & 0xFFFFFFFF, encoded_id)
+    # Single copy of the payload; jpeg_bytes may be bytes or a numpy buffer from cv2.imencode
+    return b"".join((header, memoryview(jpeg_bytes)))
+
+
+def pack_patch_frame(seq, product_id, jpeg_bytes, region, flags=0, client_ts=0, dropped=0):
+    """Header + patch region + JPEG payload; `region` (x, y, width, height) is None when nothing was drawn"""
+    if region is None:
+        region, jpeg_bytes = (0, 0, 0, 0), b""
+    payload = b"".join((PATCH_HEADER.pack(*region), memoryview(jpeg_bytes)))
+    return pack_frame(seq, product_id, payload, flags | FLAG_PATCH, client_ts, dropped)
+
+
+def unpack_frame(message):
+    """
+    Split a binary frame into its header fields and JPEG payload.
+    Returns: seq, client_ts, product_id, flags, payload (a memoryview, no copy)
+    """
+    if len(message) < HEADER_SIZE:
+        raise ProtocolError(f"Binary frame too short: {len(message)} bytes")
+    version, flags, _, seq, client_ts, encoded_id = HEADER.unpack_from(message)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported binary protocol version {version}")
+    product_id = encoded_id.rstrip(b"\0").decode("ascii", "replace")
+    return seq, client_ts, product_id, flags, memoryview(message)[HEADER_SIZE:]
+
+
+def negotiate_binary(hello):
+    """
+    Whether a client's hello message switches the session to binary frames.
+    Raises ProtocolError if it asks for binary frames in another protocol version.
+    """
+    if not hello.get("binary", False):
+        return False
+    version = hello.get("protocol_version")
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported binary protocol version {version} (server speaks {PROTOCOL_VERSION}); "
+                            f"continuing with text frames")
+    return True
+
+
+def hello_ack(binary):
+    """Reply to a client's hello message"""
+    return {
+        "type": "hello_ack",
+        "binary": binary,
+        "protocol_version": PROTOCOL_VERSION,
+        "header_size": HEADER_SIZE,
+        "flags": {"hat": FLAG_HAT, "face_detected": FLAG_FACE_DETECTED, "transform": FLAG_TRANSFORM,
+                  "patch": FLAG_PATCH}
+    }
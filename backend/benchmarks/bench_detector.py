@@ -0,0 +1,203 @@
+"""
+Detector backend comparison: ultralytics (PyTorch) vs ONNX Runtime fp32 vs
+ONNX Runtime int8.
+
+Every backend runs the same frames through yolo_service.predict() with the
+same inference profile (FACE_VALIDATION_PROFILE unless --all-classes), so
+the numbers include each backend's own pre/post-processing. Reported per
+backend: p50/p95/p99 latency of one single-frame call, and agreement with
+the reference backend (PyTorch when ultralytics is installed, otherwise
+ONNX fp32): a detection matches a reference detection of the same class
+with IoU >= --match-iou; recall and precision count matches, mean IoU and
+mean |confidence difference| are over matched pairs.
+
+Synthetic frames contain no people, so agreement is only meaningful with
+real images (--frames DIR). Export the ONNX model first, e.g.
+    yolo export model=yolov8n.pt format=onnx imgsz=320
+or pass --export to do it here (needs ultralytics).
+
+Run from the backend directory:
+    python -m benchmarks.bench_detector --frames path/to/photos
+    python -m benchmarks.bench_detector --all-classes --iterations 100 --json detector.json
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from api.config import ONNX_INTRA_OP_THREADS, ONNX_MODEL_PATH, YOLO_IMGSZ, YOLO_MODEL_PATH
+from api.services.onnx_detector import OnnxYoloDetector
+from api.services.yolo_service import FACE_VALIDATION_PROFILE, predict
+from benchmarks.bench_hotpath import camera_frame, percentile
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def load_frames(frames_dir, count):
+    """Up to `count` BGR images from `frames_dir`, or synthetic camera frames"""
+    if frames_dir:
+        paths = sorted(path for path in glob.glob(os.path.join(frames_dir, "*"))
+                       if path.lower().endswith(IMAGE_EXTENSIONS))
+        frames = [frame for frame in (cv2.imread(path) for path in paths[:count]) if frame is not None]
+        if not frames:
+            raise SystemExit(f"No readable images in {frames_dir}")
+        return frames
+    frame = camera_frame()
+    # Shift the synthetic frame so the frames are not identical
+    return [np.roll(frame, shift * 37, axis=1) for shift in range(count)]
+
+
+def export_onnx(weights, imgsz):
+    """Export the PyTorch weights to ONNX next to them; returns the exported path"""
+    from ultralytics import YOLO
+    return YOLO(weights).export(format="onnx", imgsz=imgsz)
+
+
+def load_backends(args):
+    """[(name, model)] for every backend that can be loaded here"""
+    backends = []
+    try:
+        from ultralytics import YOLO
+        if os.path.exists(args.weights):
+            backends.append(("pytorch", YOLO(args.weights)))
+        else:
+            print(f"Skipping pytorch: {args.weights} not found")
+    except ImportError:
+        print("Skipping pytorch: ultralytics is not installed")
+    if os.path.exists(args.onnx):
+        backends.append(("onnx_fp32", OnnxYoloDetector(args.onnx, intra_op_threads=args.threads).load()))
+        if not args.no_int8:
+            backends.append(("onnx_int8", OnnxYoloDetector(args.onnx, quantize=True, intra_op_threads=args.threads).load()))
+    else:
+        print(f"Skipping onnx: {args.onnx} not found (export it first, or pass --export)")
+    return backends
+
+
+def box_iou(a, b):
+    """IoU matrix between two sets of xyxy boxes, shape (len(a), len(b))"""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+
+def match_detections(reference, candidate, match_iou):
+    """Greedy same-class matching by IoU; returns [(iou, confidence difference)] of matched pairs"""
+    if not len(reference) or not len(candidate):
+        return []
+    ious = box_iou(reference.boxes_xyxy, candidate.boxes_xyxy)
+    ious[reference.class_ids[:, None] != candidate.class_ids[None, :]] = 0.0
+    pairs = []
+    while True:
+        i, j = np.unravel_index(np.argmax(ious), ious.shape)
+        if ious[i, j] < match_iou:
+            return pairs
+        pairs.append((float(ious[i, j]), abs(float(reference.confidences[i] - candidate.confidences[j]))))
+        ious[i, :] = 0.0
+        ious[:, j] = 0.0
+
+
+def agreement(reference_results, candidate_results, match_iou):
+    reference_total = sum(len(result) for result in reference_results)
+    candidate_total = sum(len(result) for result in candidate_results)
+    pairs = [pair for reference, candidate in zip(reference_results, candidate_results)
+             for pair in match_detections(reference, candidate, match_iou)]
+    return {
+        "detections": candidate_total,
+        "reference_detections": reference_total,
+        "recall": round(len(pairs) / reference_total, 3) if reference_total else None,
+        "precision": round(len(pairs) / candidate_total, 3) if candidate_total else None,
+        "mean_iou": round(float(np.mean([iou for iou, _ in pairs])), 3) if pairs else None,
+        "mean_confidence_delta": round(float(np.mean([delta for _, delta in pairs])), 4) if pairs else None
+    }
+
+
+def benchmark(model, frames, profile, iterations, warmup):
+    """Latency of single-frame calls (cycling through the frames) and one result per frame"""
+    for index in range(warmup):
+        predict(model, [frames[index % len(frames)]], profile)
+    samples = []
+    for index in range(iterations):
+        start = time.perf_counter()
+        predict(model, [frames[index % len(frames)]], profile)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    results = [predict(model, [frame], profile)[0] for frame in frames]
+    return {
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 2)
+    }, results
+
+
+def format_value(value, spec):
+    return "-" if value is None else format(value, spec)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--weights", default=YOLO_MODEL_PATH, help="ultralytics .pt weights")
+    parser.add_argument("--onnx", default=ONNX_MODEL_PATH, help="exported ONNX model")
+    parser.add_argument("--export", action="store_true", help="export --weights to ONNX first (needs ultralytics)")
+    parser.add_argument("--no-int8", action="store_true", help="skip the int8 quantized model")
+    parser.add_argument("--frames", help="directory of test images (default: synthetic frames)")
+    parser.add_argument("--count", type=int, default=20, help="frames to use")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=ONNX_INTRA_OP_THREADS, help="ONNX Runtime intra-op threads (0 = default)")
+    parser.add_argument("--all-classes", action="store_true",
+                        help="detect every class instead of the face-validation profile (more boxes to compare)")
+    parser.add_argument("--match-iou", type=float, default=0.5)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args(argv)
+
+    if args.export:
+        args.onnx = export_onnx(args.weights, YOLO_IMGSZ)
+    profile = dict(FACE_VALIDATION_PROFILE)
+    if args.all_classes:
+        profile["classes"] = None
+
+    frames = load_frames(args.frames, args.count)
+    backends = load_backends(args)
+    if not backends:
+        print("No detector backend could be loaded")
+        return 1
+
+    report = {"frames": len(frames), "profile": {k: v for k, v in profile.items() if k != "verbose"}, "backends": {}}
+    reference_name, reference_results = None, None
+    print(f"\n{'backend':<12}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'boxes':>7}{'recall':>8}{'precis.':>8}{'IoU':>7}{'dconf':>8}")
+    for name, model in backends:
+        latency, results = benchmark(model, frames, profile, args.iterations, args.warmup)
+        if reference_results is None:
+            reference_name, reference_results = name, results
+        match = agreement(reference_results, results, args.match_iou)
+        report["backends"][name] = dict(latency, **match)
+        print(f"{name:<12}{latency['p50_ms']:>9.2f}{latency['p95_ms']:>9.2f}{latency['p99_ms']:>9.2f}"
+              f"{match['detections']:>7}{format_value(match['recall'], '.3f'):>8}"
+              f"{format_value(match['precision'], '.3f'):>8}{format_value(match['mean_iou'], '.3f'):>7}"
+              f"{format_value(match['mean_confidence_delta'], '.4f'):>8}")
+    report["reference"] = reference_name
+    print(f"\nAgreement is against {reference_name} (IoU >= {args.match_iou}, same class)")
+    if not any(len(result) for result in reference_results):
+        print("The reference found nothing in these frames; pass --frames with real photos for a meaningful comparison")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Report written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
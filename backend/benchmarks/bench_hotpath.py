@@ -0,0 +1,294 @@
+"""
+Microbenchmarks for the try-on hot path, checked against a stored baseline.
+
+Covers the alpha blend, glasses/hat placement, facial measurements, the
+measurement overlay, decode/resize/encode at each tier's target size, the
+YOLO result parsing and the face detector's pre/post-processing. Everything
+runs offline: landmarks are synthetic and YOLO and the face detector are
+stubs returning fixed boxes, so neither MediaPipe nor ultralytics is
+needed. OpenCV runs single-threaded for repeatable numbers.
+
+Each case reports p50/p95/p99 latency and the peak memory allocated
+during one call (tracemalloc). The run fails (exit status 1) when a case's
+p50 or peak allocation exceeds the baseline by more than the tolerance
+(a regressed case is re-measured before it counts, to ride out noise).
+Baselines are machine specific: record one with --update-baseline on the
+machine that runs the comparison.
+
+Run from the backend directory:
+    python -m benchmarks.bench_hotpath
+    python -m benchmarks.bench_hotpath --filter yolo --iterations 500
+    python -m benchmarks.bench_hotpath --update-baseline
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from api.services import yolo_service
+from api.services.face_validation import detect_faces
+from api.services.mediapipe_service import get_facial_measurements, landmarks_to_pixels
+from api.services.yolo_service import FACE_VALIDATION_PROFILE, parse_yolo_result, run_yolo_detection
+from api.utils.alpha_blend import prepare_sprite
+from api.utils.file_utils import (
+    draw_measurement_overlay,
+    overlay_image_alpha,
+    place_glasses_accurately,
+    place_hat_accurately
+)
+from api.utils.image_decode import decode_image
+from benchmarks.stub_models import StubFaceDetection, StubYoloModel, synthetic_landmarks
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ACCESSORY_DIR = os.path.join(BENCHMARK_DIR, "..", "accessories")
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+# (tier, target size, resize interpolation, JPEG quality), as in api/routes/tryon.py
+TIERS = [
+    ("realtime", 256, cv2.INTER_LINEAR, 70),
+    ("high_accuracy", 320, cv2.INTER_LINEAR, 60),
+    ("single_image", 640, cv2.INTER_CUBIC, 95),
+]
+# Uploaded / streamed camera frame
+SOURCE_SIZE = (1280, 720)
+# Allocation peaks below this are noise (interpreter bookkeeping), not a regression
+PEAK_SLACK_KIB = 4.0
+
+GLASSES_DIMENSIONS = {"frame_width_mm": 135, "frame_height_mm": 50}
+HAT_DIMENSIONS = {"hat_width_mm": 220, "hat_height_mm": 120}
+
+
+def load_accessory(filename, fallback_shape):
+    accessory = cv2.imread(os.path.join(ACCESSORY_DIR, filename), cv2.IMREAD_UNCHANGED)
+    if accessory is None or accessory.ndim != 3 or accessory.shape[2] != 4:
+        # Synthetic sprite: an opaque ellipse on a transparent canvas
+        height, width = fallback_shape
+        accessory = np.zeros((height, width, 4), dtype=np.uint8)
+        cv2.ellipse(accessory, (width // 2, height // 2), (width // 2 - 10, height // 2 - 10),
+                    0, 0, 360, (30, 30, 30, 230), -1)
+    return accessory
+
+
+def camera_frame():
+    """Smooth synthetic frame (compresses like a camera image, unlike noise)"""
+    width, height = SOURCE_SIZE
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    frame = np.dstack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+                       np.full((height, width), 128, np.float32)]).astype(np.uint8)
+    cv2.circle(frame, (width // 2, height // 2), height // 3, (90, 120, 180), -1)
+    return frame
+
+
+def build_cases():
+    """[(name, fn)] where fn() runs one call; fn may be called many times on the same inputs"""
+    cases = []
+    frame = camera_frame()
+    landmarks_3d = synthetic_landmarks()
+    glasses = load_accessory("glasses.png", (400, 1000))
+    hat = load_accessory("hat.png", (600, 1000))
+
+    _, upload = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    upload = upload.tobytes()
+    cases.append((f"decode {SOURCE_SIZE[0]}x{SOURCE_SIZE[1]}", lambda: decode_image(upload)))
+
+    for tier, target_size, interpolation, quality in TIERS:
+        scale = target_size / max(SOURCE_SIZE)
+        size = (int(SOURCE_SIZE[0] * scale), int(SOURCE_SIZE[1] * scale))
+        resized = cv2.resize(frame, size, interpolation=interpolation)
+        # Transform-mode streams decode at a reduced scale when the frame is large enough
+        cases.append((f"decode reduced {tier}",
+                      lambda target_size=target_size: decode_image(upload, target_size)))
+        cases.append((f"resize {tier} {target_size}px",
+                      lambda size=size, interpolation=interpolation: cv2.resize(frame, size, interpolation=interpolation)))
+        cases.append((f"encode {tier} {target_size}px q{quality}",
+                      lambda resized=resized, quality=quality: cv2.imencode(".jpg", resized, [cv2.IMWRITE_JPEG_QUALITY, quality])))
+
+        sprite = cv2.resize(glasses, (int(size[0] * 0.45), int(size[0] * 0.45 * glasses.shape[0] / glasses.shape[1])))
+        prepared = prepare_sprite(sprite)
+        background = resized.copy()
+        x = (size[0] - sprite.shape[1]) // 2
+        y = size[1] // 3
+        cases.append((f"overlay_image_alpha {tier}",
+                       lambda background=background, prepared=prepared, x=x, y=y: overlay_image_alpha(background, prepared, x, y)))
+
+    # Placement and measurements on the full-resolution frame (the tiers composite at source resolution)
+    landmarks_2d = landmarks_to_pixels(landmarks_3d, frame.shape)
+    measurements = get_facial_measurements(landmarks_2d, landmarks_3d, frame.shape)
+    canvas = frame.copy()
+    cases.append(("get_facial_measurements", lambda: get_facial_measurements(landmarks_2d, landmarks_3d, frame.shape)))
+    cases.append(("place_glasses_accurately",
+                  lambda: place_glasses_accurately(canvas, glasses, measurements, GLASSES_DIMENSIONS, {})))
+    cases.append(("place_glasses_accurately cached",
+                  lambda: place_glasses_accurately(canvas, glasses, measurements, GLASSES_DIMENSIONS, {}, "bench_glasses")))
+    cases.append(("place_hat_accurately",
+                  lambda: place_hat_accurately(canvas, hat, measurements, HAT_DIMENSIONS, {})))
+    cases.append(("place_hat_accurately cached",
+                  lambda: place_hat_accurately(canvas, hat, measurements, HAT_DIMENSIONS, {}, "bench_hat")))
+    cases.append(("draw_measurement_overlay",
+                  lambda: draw_measurement_overlay(canvas, measurements, GLASSES_DIMENSIONS)))
+
+    # YOLO parsing with the stub model installed in place of the ultralytics one
+    stub = StubYoloModel()
+    yolo_service.yolo_model = stub
+    yolo_input = cv2.resize(frame, (640, 360))
+    stub_result = stub([yolo_input])[0]
+    parsed = parse_yolo_result(stub_result, stub.names)
+
+    def result_accessors():
+        # A fresh result each time: objects are memoized per result
+        result = parse_yolo_result(stub_result, stub.names)
+        return result.objects, result.faces, result.face_region()
+
+    cases.append(("yolo parse_yolo_result", lambda: parse_yolo_result(stub_result, stub.names)))
+    cases.append(("yolo result accessors", result_accessors))
+    cases.append(("yolo run_yolo_detection stub",
+                  lambda: run_yolo_detection(yolo_input, profile=FACE_VALIDATION_PROFILE)))
+    assert len(parsed) == len(stub.data) and parsed.face_region() is not None
+
+    # Face validation with the stub face detector: downscale, colour conversion, box mapping
+    face_detector = StubFaceDetection()
+    for tier, target_size, interpolation, _ in TIERS:
+        scale = target_size / max(SOURCE_SIZE)
+        tier_frame = cv2.resize(frame, (int(SOURCE_SIZE[0] * scale), int(SOURCE_SIZE[1] * scale)), interpolation=interpolation)
+        cases.append((f"detect_faces stub {tier}",
+                      lambda tier_frame=tier_frame: detect_faces(face_detector, tier_frame)))
+    assert detect_faces(face_detector, frame)[0]['class_name'] == 'face'
+    return cases
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    index = min(len(sorted_samples) - 1, max(0, int(round(fraction * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+def measure(fn, iterations, warmup):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "p50_us": round(percentile(samples, 0.50) * 1e6, 1),
+        "p95_us": round(percentile(samples, 0.95) * 1e6, 1),
+        "p99_us": round(percentile(samples, 0.99) * 1e6, 1),
+        "peak_kib": round(peak / 1024, 1)
+    }
+
+
+def compare(name, result, baseline, tolerance):
+    """Regression messages for one case (empty when within tolerance or not in the baseline)"""
+    reference = baseline.get(name)
+    if reference is None:
+        return []
+    problems = []
+    if result["p50_us"] > reference["p50_us"] * (1 + tolerance):
+        problems.append(f"{name}: p50 {result['p50_us']}us > baseline {reference['p50_us']}us (+{tolerance:.0%})")
+    if result["peak_kib"] > reference["peak_kib"] * (1 + tolerance) + PEAK_SLACK_KIB:
+        problems.append(f"{name}: peak {result['peak_kib']}KiB > baseline {reference['peak_kib']}KiB (+{tolerance:.0%})")
+    return problems
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f).get("cases", {})
+    except FileNotFoundError:
+        return {}
+
+
+def write_baseline(path, results):
+    data = {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor() or platform.machine()
+        },
+        "cases": results
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this text")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown / growth, as a fraction")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="re-measure a regressed case this many times before failing (filters out noisy neighbours)")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the baseline")
+    args = parser.parse_args(argv)
+
+    cv2.setNumThreads(1)
+    baseline = load_baseline(args.baseline)
+    results = {}
+    problems = []
+    print(f"{'case':<40}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}{'peak KiB':>10}{'vs base':>9}")
+    # The pipeline functions log every call; keep that out of the report (the write cost stays in the timings)
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            cases = build_cases()
+        for name, fn in cases:
+            if args.filter not in name:
+                continue
+            with contextlib.redirect_stdout(devnull):
+                result = measure(fn, args.iterations, args.warmup)
+                case_problems = compare(name, result, baseline, args.tolerance)
+                for _ in range(args.retries if case_problems else 0):
+                    result = measure(fn, args.iterations, args.warmup)
+                    case_problems = compare(name, result, baseline, args.tolerance)
+                    if not case_problems:
+                        break
+            results[name] = result
+            problems.extend(case_problems)
+            reference = baseline.get(name)
+            ratio = f"{result['p50_us'] / reference['p50_us']:.2f}x" if reference and reference["p50_us"] else "-"
+            flag = " !" if case_problems else ""
+            print(f"{name:<40}{result['p50_us']:>10.1f}{result['p95_us']:>10.1f}{result['p99_us']:>10.1f}"
+                  f"{result['peak_kib']:>10.1f}{ratio:>9}{flag}")
+
+    if args.update_baseline:
+        if args.filter:
+            # Keep the cases that were not re-run
+            baseline.update(results)
+            results = baseline
+        write_baseline(args.baseline, results)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not baseline:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+    if problems:
+        print("\nRegressions:")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+    print("\nNo regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Benchmark for the alpha blend used by overlay_image_alpha.
+
+Compares the original float64 implementation against the premultiplied
+uint16 kernel, both on a raw RGBA sprite (prepared per call, as in
+/single-tryon) and on a PreparedSprite (prepared once, as served by the
+sprite cache in the streaming tiers). Reports per-call latency and the
+peak memory allocated during a single call (tracemalloc).
+
+Run from the backend directory:
+    python -m benchmarks.bench_overlay
+"""
+import os
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from api.utils.alpha_blend import prepare_sprite
+from api.utils.file_utils import overlay_image_alpha
+
+ACCESSORY_PATH = os.path.join(os.path.dirname(__file__), "..", "accessories", "glasses.png")
+
+# (name, frame width, frame height, sprite width)
+CASES = [
+    ("realtime 256px", 256, 192, 110),
+    ("high-accuracy 320px", 320, 240, 140),
+    ("single-image 640px", 640, 480, 280),
+    ("full-res 1280x720", 1280, 720, 560),
+]
+
+
+def legacy_overlay_image_alpha(background, overlay, x, y):
+    """The float64 blend overlay_image_alpha used before the premultiplied kernel (logging removed)"""
+    bh, bw = background.shape[:2]
+    oh, ow = overlay.shape[:2]
+    if x >= bw or y >= bh or x + ow <= 0 or y + oh <= 0:
+        return background
+    start_x = max(0, x)
+    end_x = min(bw, x + ow)
+    start_y = max(0, y)
+    end_y = min(bh, y + oh)
+    overlay_start_x = start_x - x
+    overlay_start_y = start_y - y
+    overlay_end_x = overlay_start_x + (end_x - start_x)
+    overlay_end_y = overlay_start_y + (end_y - start_y)
+    overlay_visible = overlay[overlay_start_y:overlay_end_y, overlay_start_x:overlay_end_x]
+    overlay_img = overlay_visible[..., :3]
+    mask = overlay_visible[..., 3:] / 255.0
+    max_alpha = np.max(mask)
+    np.min(mask)
+    if max_alpha < 0.1:
+        return background
+    if mask.shape[2] == 1:
+        mask = np.repeat(mask, 3, axis=2)
+    background_region = background[start_y:end_y, start_x:end_x]
+    background[start_y:end_y, start_x:end_x] = (
+        background_region * (1 - mask) + overlay_img * mask
+    ).astype(np.uint8)
+    return background
+
+
+def load_sprite(width):
+    accessory = cv2.imread(ACCESSORY_PATH, cv2.IMREAD_UNCHANGED)
+    if accessory is None or accessory.ndim != 3 or accessory.shape[2] != 4:
+        # Synthetic glasses-like sprite: two opaque lenses on a transparent canvas
+        accessory = np.zeros((400, 1000, 4), dtype=np.uint8)
+        cv2.circle(accessory, (280, 200), 160, (30, 30, 30, 230), -1)
+        cv2.circle(accessory, (720, 200), 160, (30, 30, 30, 230), -1)
+    height = int(width * accessory.shape[0] / accessory.shape[1])
+    return cv2.resize(accessory, (width, height))
+
+
+def time_call(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1e6
+
+
+def peak_allocation(fn):
+    fn()  # warm-up (scratch buffers, caches)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def run(iterations=200):
+    rng = np.random.default_rng(0)
+    print(f"{'case':<22}{'variant':<18}{'median us':>12}{'peak KiB':>12}")
+    for name, frame_w, frame_h, sprite_w in CASES:
+        frame = rng.integers(0, 256, (frame_h, frame_w, 3), dtype=np.uint8)
+        sprite = load_sprite(sprite_w)
+        prepared = prepare_sprite(sprite)
+        x = (frame_w - sprite.shape[1]) // 2
+        y = (frame_h - sprite.shape[0]) // 3
+
+        expected = legacy_overlay_image_alpha(frame.copy(), sprite, x, y)
+        actual = overlay_image_alpha(frame.copy(), prepared, x, y)
+        max_error = int(np.abs(expected.astype(np.int16) - actual.astype(np.int16)).max())
+
+        variants = [
+            ("legacy float64", lambda b: legacy_overlay_image_alpha(b, sprite, x, y)),
+            ("premul raw RGBA", lambda b: overlay_image_alpha(b, sprite, x, y)),
+            ("premul prepared", lambda b: overlay_image_alpha(b, prepared, x, y)),
+        ]
+        for variant, blend in variants:
+            background = frame.copy()
+            latency = time_call(lambda: blend(background), iterations)
+            peak = peak_allocation(lambda: blend(background))
+            print(f"{name:<22}{variant:<18}{latency:>12.1f}{peak:>12.1f}")
+        print(f"{'':<22}{'max abs diff':<18}{max_error:>12}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,456 @@
+"""
+Load generator for the three try-on tiers.
+
+Replays a directory of face frames (JPEG/PNG, or synthetic frames when no
+directory is given) from N simulated clients, each sending at a fixed FPS
+the way the frontend does (on a timer, without waiting for the previous
+response):
+
+- realtime:       one /websocket-tryon connection per client (text or binary frames)
+- high_accuracy:  POST /tryon
+- single_image:   POST /single-tryon
+
+Reports, per client and overall: achieved FPS (processed responses per
+second), end-to-end latency percentiles (send to response received),
+skipped_multiple_requests / dropped-frame rates, errors, and the server's
+CPU use from the process_cpu_seconds_total delta on /metrics (all processes).
+
+Against a running server:
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --tier realtime --clients 8 --fps 10
+Launching a local uvicorn first, with stub models or the real ones:
+    python -m benchmarks.load_test --launch stub --tier all --clients 4 --duration 20
+    python -m benchmarks.load_test --launch real --tier high_accuracy --clients 2
+
+Requires httpx and websockets. Run from the backend directory.
+"""
+import argparse
+import asyncio
+import base64
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+import cv2
+import httpx
+import numpy as np
+import websockets
+
+from api.utils import ws_protocol
+
+TIER_PATHS = {
+    "realtime": "/websocket-tryon",
+    "high_accuracy": "/tryon",
+    "single_image": "/single-tryon"
+}
+# Server-side frame drop counters per tier (tryon_frames_dropped_total)
+TIER_METRIC_LABELS = {
+    "realtime": "realtime_stream",
+    "high_accuracy": "high_accuracy_stream",
+    "single_image": "single_image"
+}
+FRAME_EXTENSIONS = ("*.jpg", "*.jpeg", "*.png")
+SERVER_START_TIMEOUT = 60.0
+
+
+def load_frames(frames_dir, max_side, jpeg_quality):
+    """JPEG bytes of every image in `frames_dir` (sorted), or synthetic frames when it is not given"""
+    images = []
+    if frames_dir:
+        paths = sorted(path for pattern in FRAME_EXTENSIONS for path in glob.glob(os.path.join(frames_dir, pattern)))
+        images = [image for image in (cv2.imread(path, cv2.IMREAD_COLOR) for path in paths) if image is not None]
+        if not images:
+            raise SystemExit(f"No readable frames in {frames_dir}")
+    else:
+        images = synthetic_frames()
+
+    frames = []
+    for image in images:
+        height, width = image.shape[:2]
+        if max_side and max(height, width) > max_side:
+            scale = max_side / max(height, width)
+            image = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+        if ok:
+            frames.append(buf.tobytes())
+    return frames
+
+
+def synthetic_frames(count=30, width=1280, height=720):
+    """Camera-like frames with a face-sized blob drifting across them"""
+    x = np.linspace(40, 200, width, dtype=np.float32)
+    y = np.linspace(40, 200, height, dtype=np.float32)[:, None]
+    background = np.dstack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+                            np.full((height, width), 120, np.float32)]).astype(np.uint8)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        center = (width // 2 + int(40 * np.sin(i / count * 2 * np.pi)), height // 2)
+        cv2.ellipse(frame, center, (height // 5, height // 4), 0, 0, 360, (110, 140, 200), -1)
+        frames.append(frame)
+    return frames
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an ascending list (None when empty)"""
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, max(0, int(round(fraction * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+class ClientStats:
+    def __init__(self, tier, client_id):
+        self.tier = tier
+        self.client_id = client_id
+        self.sent = 0
+        # Processed responses (with a try-on result)
+        self.completed = 0
+        # /tryon answered skipped_multiple_requests
+        self.skipped = 0
+        # Frames the server dropped (websocket: superseded or past the deadline)
+        self.dropped = 0
+        # Frames the client did not send because too many requests were still in flight
+        self.not_sent = 0
+        self.errors = 0
+        self.status_codes = {}
+        self.latencies = []
+
+    def summary(self, duration):
+        latencies = sorted(self.latencies)
+        answered = self.completed + self.skipped + self.dropped
+        return {
+            "tier": self.tier,
+            "client": self.client_id,
+            "sent": self.sent,
+            "completed": self.completed,
+            "fps": round(self.completed / duration, 2) if duration else 0.0,
+            "skipped": self.skipped,
+            "skip_rate": round(self.skipped / answered, 3) if answered else 0.0,
+            "dropped": self.dropped,
+            "drop_rate": round(self.dropped / self.sent, 3) if self.sent else 0.0,
+            "not_sent": self.not_sent,
+            "errors": self.errors,
+            "status_codes": dict(sorted(self.status_codes.items())),
+            "p50_ms": _ms(percentile(latencies, 0.50)),
+            "p95_ms": _ms(percentile(latencies, 0.95)),
+            "p99_ms": _ms(percentile(latencies, 0.99)),
+            "latencies": latencies
+        }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+async def run_websocket_client(stats, args, frames, deadline):
+    """One /websocket-tryon session sending a frame every 1/fps seconds until `deadline`"""
+    url = args.url.replace("http://", "ws://").replace("https://", "wss://") + TIER_PATHS["realtime"]
+    flags = ws_protocol.FLAG_HAT if args.product_type == "hat" else 0
+    if args.response_mode == "transform":
+        flags |= ws_protocol.FLAG_TRANSFORM
+    elif args.response_mode == "patch":
+        flags |= ws_protocol.FLAG_PATCH
+    encoded = None if args.binary else [base64.b64encode(frame).decode("ascii") for frame in frames]
+    sent_at = {}
+    last_rtt = [None]
+
+    async with websockets.connect(url, max_size=None) as ws:
+        if args.binary:
+            await ws.send(json.dumps({"type": "hello", "binary": True, "protocol_version": ws_protocol.PROTOCOL_VERSION}))
+            while json.loads(await ws.recv()).get("type") != "hello_ack":
+                pass
+
+        async def receive():
+            async for message in ws:
+                received = time.perf_counter()
+                if isinstance(message, bytes):
+                    _, _, dropped, seq, _, _ = ws_protocol.HEADER.unpack_from(message)
+                    processed = True
+                else:
+                    data = json.loads(message)
+                    kind = data.get("type")
+                    if kind in ("hello_ack", "encoding", "pong"):
+                        continue
+                    seq = data.get("seq")
+                    dropped = data.get("dropped_frames", 0)
+                    processed = kind not in ("frame_dropped", "error")
+                    if kind == "error":
+                        stats.errors += 1
+                # Drops are reported with the next response (or a frame_dropped message)
+                stats.dropped += dropped
+                started = sent_at.pop(seq, None)
+                # Frames older than this one were superseded and will never be answered
+                for old_seq in [old for old in sent_at if seq is not None and old < seq]:
+                    del sent_at[old_seq]
+                if processed and started is not None:
+                    stats.completed += 1
+                    stats.latencies.append(received - started)
+                    last_rtt[0] = (received - started) * 1000
+
+        receiver = asyncio.create_task(receive())
+        interval = 1.0 / args.fps
+        next_send = time.perf_counter()
+        seq = 0
+        try:
+            while next_send < deadline:
+                index = (seq + stats.client_id) % len(frames)
+                client_ts = int(time.time() * 1000) & 0xFFFFFFFF
+                if args.binary:
+                    message = ws_protocol.pack_frame(seq, args.product_id, frames[index], flags, client_ts=client_ts)
+                    if last_rtt[0] is not None and seq % 10 == 0:
+                        await ws.send(json.dumps({"type": "stats", "rtt_ms": last_rtt[0]}))
+                else:
+                    message = json.dumps({
+                        "type": "frame", "image_base64": encoded[index], "seq": seq, "client_ts": client_ts,
+                        "product_type": args.product_type, "product_id": args.product_id,
+                        "response_mode": args.response_mode, "rtt_ms": last_rtt[0]
+                    })
+                sent_at[seq] = time.perf_counter()
+                await ws.send(message)
+                stats.sent += 1
+                seq += 1
+                next_send += interval
+                await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+
+            # Let the last answers arrive
+            drain_until = time.perf_counter() + args.drain
+            while sent_at and time.perf_counter() < drain_until:
+                await asyncio.sleep(0.02)
+        finally:
+            receiver.cancel()
+
+
+async def run_http_client(stats, args, client, tier, frames, deadline):
+    """One HTTP client posting a frame every 1/fps seconds until `deadline`, up to --max-inflight at a time"""
+    path = TIER_PATHS[tier]
+    form = {"product_type": args.product_type, "product_id": args.product_id}
+    if tier == "high_accuracy":
+        form["response_mode"] = args.response_mode
+        form["session_id"] = f"load-test-{stats.client_id}"
+    else:
+        form["show_measurements"] = "true" if args.show_measurements else "false"
+    last_rtt = [None]
+    inflight = set()
+
+    async def post(frame):
+        data = dict(form)
+        if tier == "high_accuracy" and last_rtt[0] is not None:
+            data["rtt_ms"] = str(last_rtt[0])
+        started = time.perf_counter()
+        try:
+            response = await client.post(path, files={"file": ("frame.jpg", frame, "image/jpeg")}, data=data)
+        except httpx.HTTPError:
+            stats.errors += 1
+            return
+        latency = time.perf_counter() - started
+        stats.status_codes[response.status_code] = stats.status_codes.get(response.status_code, 0) + 1
+        if response.status_code != 200:
+            stats.errors += 1
+            return
+        if response.json().get("status") == "skipped_multiple_requests":
+            stats.skipped += 1
+            return
+        stats.completed += 1
+        stats.latencies.append(latency)
+        last_rtt[0] = latency * 1000
+
+    interval = 1.0 / args.fps
+    next_send = time.perf_counter()
+    index = stats.client_id
+    while next_send < deadline:
+        if len(inflight) < args.max_inflight:
+            task = asyncio.create_task(post(frames[index % len(frames)]))
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+            stats.sent += 1
+        else:
+            stats.not_sent += 1
+        index += 1
+        next_send += interval
+        await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+    if inflight:
+        await asyncio.wait(inflight, timeout=args.drain)
+
+
+async def scrape_metrics(client):
+    """{sample name with labels: value} from /metrics, or None when it is unavailable"""
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        return None
+    samples = {}
+    for line in response.text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name, _, value = line.rpartition(" ")
+        try:
+            samples[name] = float(value)
+        except ValueError:
+            pass
+    return samples
+
+
+def server_usage(before, after, tier, wall):
+    """Server CPU and drop counters between two /metrics scrapes"""
+    if before is None or after is None:
+        return None
+    # One series per process (API process and inference children); processes may appear between scrapes
+    cpu = sum(value - before.get(name, 0.0) for name, value in after.items()
+              if name.startswith("process_cpu_seconds_total"))
+    prefix = f'tryon_frames_dropped_total{{tier="{TIER_METRIC_LABELS[tier]}",reason="'
+    drops = {
+        name[len(prefix):].rstrip('"}'): after[name] - before.get(name, 0.0)
+        for name in after if name.startswith(prefix)
+    }
+    return {
+        "cpu_seconds": round(cpu, 2),
+        "cpu_cores": round(cpu / wall, 2) if wall else None,
+        "frames_dropped": {reason: int(count) for reason, count in drops.items() if count}
+    }
+
+
+async def run_tier(args, tier, frames):
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout,
+                                 limits=httpx.Limits(max_connections=args.clients * args.max_inflight + 1)) as client:
+        before = await scrape_metrics(client)
+        stats = [ClientStats(tier, client_id) for client_id in range(args.clients)]
+        started = time.perf_counter()
+        deadline = started + args.duration
+        if tier == "realtime":
+            jobs = [run_websocket_client(client_stats, args, frames, deadline) for client_stats in stats]
+        else:
+            jobs = [run_http_client(client_stats, args, client, tier, frames, deadline) for client_stats in stats]
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+        for client_stats, result in zip(stats, results):
+            if isinstance(result, Exception):
+                print(f"client {client_stats.client_id} failed: {result!r}")
+                client_stats.errors += 1
+        # Rates are per second of sending; draining the last responses does not count
+        wall = time.perf_counter() - started
+        after = await scrape_metrics(client)
+
+    clients = [client_stats.summary(args.duration) for client_stats in stats]
+    total = ClientStats(tier, "all")
+    for client_stats in stats:
+        for field in ("sent", "completed", "skipped", "dropped", "not_sent", "errors"):
+            setattr(total, field, getattr(total, field) + getattr(client_stats, field))
+        for code, count in client_stats.status_codes.items():
+            total.status_codes[code] = total.status_codes.get(code, 0) + count
+        total.latencies.extend(client_stats.latencies)
+    return {"tier": tier, "clients": clients, "total": total.summary(args.duration),
+            "server": server_usage(before, after, tier, wall)}
+
+
+def print_report(report, args):
+    tier = report["tier"]
+    print(f"\n{tier}: {args.clients} clients x {args.fps} fps for {args.duration}s")
+    header = f"{'client':<8}{'sent':>7}{'done':>7}{'fps':>8}{'skip%':>7}{'drop%':>7}{'err':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    print(header)
+    for row in report["clients"] + [report["total"]]:
+        if row["client"] == "all":
+            print("-" * len(header))
+        print(f"{row['client']!s:<8}{row['sent']:>7}{row['completed']:>7}{row['fps']:>8.2f}"
+              f"{row['skip_rate'] * 100:>7.1f}{row['drop_rate'] * 100:>7.1f}{row['errors']:>6}"
+              f"{_fmt(row['p50_ms']):>9}{_fmt(row['p95_ms']):>9}{_fmt(row['p99_ms']):>9}")
+    total = report["total"]
+    if total["not_sent"]:
+        print(f"not sent (client in-flight limit): {total['not_sent']}")
+    if total["status_codes"] and set(total["status_codes"]) != {200}:
+        print(f"status codes: {total['status_codes']}")
+    server = report["server"]
+    if server is None:
+        print("server: /metrics unavailable")
+    else:
+        print(f"server: {server['cpu_seconds']} CPU s, {server['cpu_cores']} cores busy"
+              + (f", dropped {server['frames_dropped']}" if server["frames_dropped"] else ""))
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+def launch_server(args):
+    """Start a local uvicorn (stub or real models) and wait until /ready reports its models warm"""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if args.launch == "stub":
+        command = [sys.executable, "-m", "benchmarks.stub_models", "--port", str(args.port),
+                   "--facemesh-ms", str(args.stub_facemesh_ms), "--yolo-ms", str(args.stub_yolo_ms),
+                   "--face-detector-ms", str(args.stub_face_detector_ms)]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(args.port), "--log-level", "warning"]
+    log = open(args.server_log, "ab") if args.server_log else subprocess.DEVNULL
+    process = subprocess.Popen(command, cwd=backend_dir, stdout=log, stderr=subprocess.STDOUT)
+    args.url = f"http://127.0.0.1:{args.port}"
+
+    started = time.monotonic()
+    while time.monotonic() - started < SERVER_START_TIMEOUT:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited with status {process.returncode} (see --server-log)")
+        try:
+            if httpx.get(args.url + "/ready", timeout=1.0).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise SystemExit(f"Server not ready within {SERVER_START_TIMEOUT:.0f}s (see --server-log and /ready)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load generator for the try-on tiers")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="server to load (ignored with --launch)")
+    parser.add_argument("--tier", choices=list(TIER_PATHS) + ["all"], default="realtime")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--fps", type=float, default=10.0, help="frames per second per client")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds of sending per tier")
+    parser.add_argument("--frames", help="directory of face frames (JPEG/PNG); synthetic frames when omitted")
+    parser.add_argument("--max-side", type=int, default=1280, help="downscale frames whose longer side exceeds this")
+    parser.add_argument("--jpeg-quality", type=int, default=85, help="quality of the uploaded frames")
+    parser.add_argument("--product-type", default="glasses", choices=("glasses", "hat"))
+    parser.add_argument("--product-id", default="product_1")
+    parser.add_argument("--response-mode", default="image", choices=("image", "transform", "patch"),
+                        help="realtime and high_accuracy tiers")
+    parser.add_argument("--binary", action="store_true", help="realtime tier: use binary WebSocket frames")
+    parser.add_argument("--show-measurements", action="store_true", help="single_image tier: draw the overlay")
+    parser.add_argument("--max-inflight", type=int, default=4, help="HTTP requests one client may have open")
+    parser.add_argument("--timeout", type=float, default=30.0, help="HTTP request timeout (s)")
+    parser.add_argument("--drain", type=float, default=5.0, help="seconds to wait for outstanding responses")
+    parser.add_argument("--launch", choices=("stub", "real"), help="start a local uvicorn with stub or real models")
+    parser.add_argument("--port", type=int, default=8077, help="port of the launched server")
+    parser.add_argument("--stub-facemesh-ms", type=float, default=8.0, help="simulated FaceMesh time (--launch stub)")
+    parser.add_argument("--stub-yolo-ms", type=float, default=25.0, help="simulated YOLO time (--launch stub)")
+    parser.add_argument("--stub-face-detector-ms", type=float, default=2.0,
+                        help="simulated MediaPipe face detector time (--launch stub)")
+    parser.add_argument("--server-log", help="file for the launched server's output")
+    parser.add_argument("--json", help="also write the full report (with raw latencies) to this file")
+    args = parser.parse_args(argv)
+    if args.clients < 1 or args.fps <= 0 or args.duration <= 0:
+        parser.error("--clients, --fps and --duration must be positive")
+
+    frames = load_frames(args.frames, args.max_side, args.jpeg_quality)
+    server = launch_server(args) if args.launch else None
+    tiers = list(TIER_PATHS) if args.tier == "all" else [args.tier]
+    reports = []
+    try:
+        for tier in tiers:
+            report = asyncio.run(run_tier(args, tier, frames))
+            print_report(report, args)
+            reports.append(report)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": vars(args), "tiers": reports}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
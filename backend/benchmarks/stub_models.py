@@ -0,0 +1,165 @@
+"""
+Stand-in models for offline benchmarks and load tests.
+
+`install()` registers fake `mediapipe` and `ultralytics` modules, so the API
+runs without the MediaPipe runtime, ultralytics or model weights: FaceMesh
+always finds the same synthetic face, the face detector returns its box and
+YOLO returns fixed boxes. An
+optional sleep per call stands in for inference time (it releases the GIL
+like native inference does, but uses no CPU).
+
+Serve the API with the stub models (from the backend directory):
+    python -m benchmarks.stub_models --port 8000 --facemesh-ms 8 --face-detector-ms 2 --yolo-ms 25
+"""
+import argparse
+import sys
+import time
+import types
+
+import numpy as np
+
+# Landmark indices (api.services.mediapipe_service.FACIAL_LANDMARKS) of the synthetic face's anchor points
+_ANCHORS = {
+    33: (0.36, 0.40), 133: (0.45, 0.41), 362: (0.55, 0.42), 263: (0.64, 0.43),  # eyes outer/inner
+    1: (0.50, 0.52), 168: (0.50, 0.42),  # nose tip, bridge
+    123: (0.32, 0.52), 352: (0.68, 0.53),  # cheeks
+    234: (0.27, 0.46), 454: (0.73, 0.47),  # ears
+    10: (0.50, 0.22), 338: (0.56, 0.24), 151: (0.50, 0.28),  # forehead / head top center
+    8: (0.44, 0.24), 9: (0.56, 0.24), 152: (0.50, 0.80),  # head top left/right, chin
+    159: (0.40, 0.39), 145: (0.40, 0.42), 386: (0.60, 0.41), 374: (0.60, 0.44)  # eyelids
+}
+
+
+def synthetic_landmarks():
+    """Normalized (478, 3) landmarks of a frontal face, slightly rolled, filling the middle of the frame"""
+    rng = np.random.default_rng(0)
+    landmarks = rng.uniform(0.3, 0.7, (478, 3)).astype(np.float32)
+    landmarks[:, 2] *= 0.1
+    for index, (x, y) in _ANCHORS.items():
+        landmarks[index] = (x, y, 0.0)
+    return landmarks
+
+
+class _Landmark:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+class StubFaceMesh:
+    """mediapipe.solutions.face_mesh.FaceMesh stand-in: one fixed face in every frame"""
+    delay = 0.0
+
+    def __init__(self, **kwargs):
+        face = types.SimpleNamespace(landmark=[_Landmark(*point) for point in synthetic_landmarks().tolist()])
+        self._results = types.SimpleNamespace(multi_face_landmarks=[face])
+
+    def process(self, image):
+        if self.delay:
+            time.sleep(self.delay)
+        return self._results
+
+    def close(self):
+        pass
+
+
+class StubFaceDetection:
+    """mediapipe.solutions.face_detection.FaceDetection stand-in: the synthetic face's box in every frame"""
+    delay = 0.0
+
+    def __init__(self, **kwargs):
+        box = types.SimpleNamespace(xmin=0.27, ymin=0.18, width=0.46, height=0.66)
+        detection = types.SimpleNamespace(score=[0.94], location_data=types.SimpleNamespace(relative_bounding_box=box))
+        self._results = types.SimpleNamespace(detections=[detection])
+
+    def process(self, image):
+        if self.delay:
+            time.sleep(self.delay)
+        return self._results
+
+    def close(self):
+        pass
+
+
+class _StubTensor:
+    def __init__(self, array):
+        self._array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self._array
+
+
+class _StubBoxes:
+    def __init__(self, data):
+        self.data = _StubTensor(data)
+
+    def __len__(self):
+        return len(self.data.numpy())
+
+
+class _StubResult:
+    def __init__(self, data):
+        self.boxes = _StubBoxes(data)
+
+
+class StubYoloModel:
+    """ultralytics YOLO stand-in: fixed detections, same result shape"""
+    names = {0: 'person', 1: 'bicycle', 2: 'car', 27: 'tie', 67: 'cell phone'}
+    delay = 0.0
+
+    def __init__(self, model_path=None):
+        # [x1, y1, x2, y2, confidence, class]
+        self.data = np.array([
+            [120, 40, 520, 470, 0.91, 0],
+            [400, 60, 630, 470, 0.55, 0],
+            [260, 300, 330, 420, 0.40, 27],
+            [10, 10, 90, 150, 0.33, 67],
+            [500, 380, 640, 480, 0.26, 2],
+        ], dtype=np.float32)
+
+    def __call__(self, images, **kwargs):
+        if self.delay:
+            time.sleep(self.delay)
+        count = len(images) if isinstance(images, list) else 1
+        return [_StubResult(self.data) for _ in range(count)]
+
+
+def install(facemesh_ms=0.0, yolo_ms=0.0, face_detector_ms=0.0):
+    """Register the stub `mediapipe` and `ultralytics` modules (call before the API imports them)"""
+    StubFaceMesh.delay = facemesh_ms / 1000.0
+    StubFaceDetection.delay = face_detector_ms / 1000.0
+    StubYoloModel.delay = yolo_ms / 1000.0
+    mediapipe = types.ModuleType("mediapipe")
+    mediapipe.solutions = types.SimpleNamespace(
+        face_mesh=types.SimpleNamespace(FaceMesh=StubFaceMesh),
+        face_detection=types.SimpleNamespace(FaceDetection=StubFaceDetection)
+    )
+    ultralytics = types.ModuleType("ultralytics")
+    ultralytics.YOLO = StubYoloModel
+    sys.modules["mediapipe"] = mediapipe
+    sys.modules["ultralytics"] = ultralytics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the try-on API with stub models")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--facemesh-ms", type=float, default=0.0, help="simulated FaceMesh inference time")
+    parser.add_argument("--yolo-ms", type=float, default=0.0, help="simulated YOLO inference time")
+    parser.add_argument("--face-detector-ms", type=float, default=0.0, help="simulated face detector inference time")
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args(argv)
+
+    install(args.facemesh_ms, args.yolo_ms, args.face_detector_ms)
+    import uvicorn
+    uvicorn.run("api.main:app", host=args.host, port=args.port, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import os
+
+import cv2
+import numpy as np
+
+from api.services.accessory_store import AccessoryStore
+
+# 16x16 RGBA: 1 KiB of decoded pixels
+PNG_BYTES = 16 * 16 * 4
+
+
+def _write_png(path, value, size=16):
+    cv2.imwrite(str(path), np.full((size, size, 4), value, np.uint8))
+    return str(path)
+
+
+def _touch(path, seconds_later):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds_later * 1_000_000_000))
+
+
+def test_decodes_once_and_shares_a_read_only_array(tmp_path):
+    store = AccessoryStore(max_bytes=10 * PNG_BYTES, stat_interval=60)
+    path = _write_png(tmp_path / "a.png", 50)
+
+    image = store.get("a", path)
+    assert image.shape == (16, 16, 4) and (image == 50).all()
+    assert not image.flags.writeable
+    assert store.get("a", path) is image
+    assert store.stats()["hits"] == 1 and store.stats()["misses"] == 1
+
+
+def test_large_images_are_downscaled_at_load(tmp_path):
+    store = AccessoryStore(max_dimension=8)
+    image = store.get("big", _write_png(tmp_path / "big.png", 10, size=32))
+    assert image.shape == (8, 8, 4)
+
+
+def test_least_recently_used_entries_are_evicted_at_the_byte_cap(tmp_path):
+    store = AccessoryStore(max_bytes=2 * PNG_BYTES, stat_interval=60)
+    paths = {name: _write_png(tmp_path / f"{name}.png", 1) for name in "abc"}
+
+    store.get("a", paths["a"])
+    store.get("b", paths["b"])
+    store.get("a", paths["a"])  # "b" is now the least recently used
+    store.get("c", paths["c"])
+
+    stats = store.stats()
+    assert stats["entries"] == 2 and stats["bytes"] == 2 * PNG_BYTES
+    assert stats["evictions"] == 1
+    misses = stats["misses"]
+    store.get("a", paths["a"])
+    assert store.stats()["misses"] == misses
+    store.get("b", paths["b"])
+    assert store.stats()["misses"] == misses + 1
+
+
+def test_an_entry_larger_than_the_cap_is_still_kept(tmp_path):
+    store = AccessoryStore(max_bytes=PNG_BYTES // 2)
+    store.get("a", _write_png(tmp_path / "a.png", 1))
+    assert store.stats()["entries"] == 1
+
+
+def test_edited_files_are_reloaded_after_the_stat_interval(tmp_path):
+    store = AccessoryStore(stat_interval=0)
+    path = _write_png(tmp_path / "a.png", 10)
+    assert (store.get("a", path) == 10).all()
+
+    # Unchanged mtime: the cached array is reused after the stat
+    first = store.get("a", path)
+    assert store.get("a", path) is first
+
+    _write_png(path, 200)
+    _touch(path, 5)
+    assert (store.get("a", path) == 200).all()
+    assert store.stats()["misses"] == 2
+
+
+def test_files_are_not_restatted_within_the_interval(tmp_path):
+    store = AccessoryStore(stat_interval=60)
+    path = _write_png(tmp_path / "a.png", 10)
+    first = store.get("a", path)
+    _write_png(path, 200)
+    _touch(path, 5)
+    assert store.get("a", path) is first
+
+
+def test_missing_files_are_cached_as_none(tmp_path):
+    store = AccessoryStore(stat_interval=60)
+    path = str(tmp_path / "missing.png")
+    assert store.get("m", path) is None
+    _write_png(path, 1)
+    # Still None until the interval passes
+    assert store.get("m", path) is None
+    assert store.stats()["entries"] == 1 and store.stats()["bytes"] == 0
@@ -0,0 +1,74 @@
+import numpy as np
+
+from api.utils.alpha_blend import MIN_VISIBLE_ALPHA, blend_prepared_sprite, prepare_sprite
+
+
+def _float_reference(background, rgba, x, y):
+    """Straight float blend of a whole sprite at (x, y), clipped to the background"""
+    out = background.astype(np.float64)
+    bh, bw = background.shape[:2]
+    sh, sw = rgba.shape[:2]
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(bw, x + sw), min(bh, y + sh)
+    sprite = rgba[y0 - y:y1 - y, x0 - x:x1 - x].astype(np.float64)
+    alpha = sprite[..., 3:]
+    region = out[y0:y1, x0:x1]
+    out[y0:y1, x0:x1] = (region * (255 - alpha) + sprite[..., :3] * alpha) / 255
+    return np.round(out).astype(np.uint8)
+
+
+def _random_case(seed, sprite_shape=(40, 50)):
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 256, (60, 80, 3), dtype=np.uint8)
+    rgba = rng.integers(0, 256, sprite_shape + (4,), dtype=np.uint8)
+    # Transparent border, so the sprite is cropped before blending
+    rgba[:5] = 0
+    rgba[:, -7:] = 0
+    return background, rgba
+
+
+def test_blend_matches_float_reference():
+    for seed, (x, y) in enumerate([(10, 8), (-12, -9), (55, 40), (0, 0)]):
+        background, rgba = _random_case(seed)
+        expected = _float_reference(background, rgba, x, y)
+        sprite = prepare_sprite(rgba)
+
+        assert blend_prepared_sprite(background, sprite, x, y) is True
+        np.testing.assert_array_equal(background, expected)
+
+
+def test_blend_every_alpha_value_exactly():
+    # One pixel per (alpha, background, foreground) triple on a coarse grid
+    alpha, bg, fg = np.meshgrid(np.arange(256), np.arange(0, 256, 17), np.arange(0, 256, 15), indexing="ij")
+    count = alpha.size
+    background = np.repeat(bg.reshape(1, count, 1), 3, axis=2).astype(np.uint8)
+    rgba = np.zeros((1, count, 4), np.uint8)
+    rgba[..., :3] = fg.reshape(1, count, 1)
+    rgba[..., 3] = alpha.reshape(1, count)
+    expected = _float_reference(background, rgba, 0, 0)
+
+    blend_prepared_sprite(background, prepare_sprite(rgba), 0, 0)
+    np.testing.assert_array_equal(background, expected)
+
+
+def test_prepare_sprite_crops_to_visible_pixels():
+    rgba = np.zeros((20, 30, 4), np.uint8)
+    rgba[4:9, 6:16] = 200
+    sprite = prepare_sprite(rgba)
+
+    assert (sprite.offset_x, sprite.offset_y) == (6, 4)
+    assert sprite.premultiplied.shape[:2] == (5, 10)
+    assert sprite.shape == (20, 30, 4)
+    assert prepare_sprite(np.zeros((4, 4, 3), np.uint8)) is None
+
+
+def test_invisible_and_offscreen_sprites_draw_nothing():
+    background = np.full((10, 10, 3), 7, np.uint8)
+    faint = np.zeros((4, 4, 4), np.uint8)
+    faint[..., 3] = MIN_VISIBLE_ALPHA - 1
+    opaque = np.full((4, 4, 4), 255, np.uint8)
+
+    assert blend_prepared_sprite(background, prepare_sprite(faint), 0, 0) is False
+    assert blend_prepared_sprite(background, prepare_sprite(np.zeros((4, 4, 4), np.uint8)), 0, 0) is False
+    assert blend_prepared_sprite(background, prepare_sprite(opaque), 20, 0) is False
+    assert (background == 7).all()
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from api.services.face_roi import detect_face_landmarks_in_roi, roi_from_landmarks
+
+
+class _CropFaceMesh:
+    """Stands in for a FaceMesh: records the crop it gets and finds one landmark at a fixed spot in it"""
+
+    def __init__(self, point):
+        self.point = point
+        self.shape = None
+
+    def process(self, rgb):
+        self.shape = rgb.shape
+        landmark = SimpleNamespace(x=self.point[0], y=self.point[1], z=self.point[2])
+        return SimpleNamespace(multi_face_landmarks=[SimpleNamespace(landmark=[landmark])])
+
+
+def _face(min_x, min_y, max_x, max_y):
+    return np.array([(min_x, min_y, 0.0), (max_x, max_y, 0.0)], np.float32)
+
+
+def test_roi_is_a_square_in_pixels_around_the_face():
+    # A 0.1 x 0.2 (normalized) face in a 400x200 frame is 40x40 pixels
+    roi = roi_from_landmarks(_face(0.45, 0.4, 0.55, 0.6), (200, 400, 3), expand=2.0, max_coverage=1.0)
+    x0, y0, x1, y1 = roi
+    assert ((x1 - x0) * 400, (y1 - y0) * 200) == pytest.approx((80, 80))
+    assert ((x0 + x1) / 2, (y0 + y1) / 2) == pytest.approx((0.5, 0.5))
+
+
+def test_roi_is_clipped_to_the_frame():
+    roi = roi_from_landmarks(_face(0.0, 0.0, 0.2, 0.2), (100, 100, 3), expand=2.0, max_coverage=1.0)
+    assert roi == pytest.approx((0.0, 0.0, 0.3, 0.3))
+
+
+def test_no_roi_without_a_face_or_for_a_face_filling_the_frame():
+    assert roi_from_landmarks(None, (100, 100, 3)) is None
+    assert roi_from_landmarks(np.zeros((0, 3), np.float32), (100, 100, 3)) is None
+    assert roi_from_landmarks(_face(0.2, 0.2, 0.8, 0.8), (100, 100, 3), expand=1.5, max_coverage=0.6) is None
+
+
+def test_crop_landmarks_map_back_to_whole_frame_coordinates():
+    image = np.zeros((200, 400, 3), np.uint8)
+    roi = (0.25, 0.5, 0.75, 1.0)  # pixels x 100-300, y 100-200
+    face_mesh = _CropFaceMesh((0.5, 0.25, 0.1))
+
+    landmarks_2d, landmarks_3d = detect_face_landmarks_in_roi(image, roi, (100, 200, 3), face_mesh=face_mesh)
+
+    assert face_mesh.shape == (100, 200, 3)
+    # Crop pixel (100, 25) is frame pixel (200, 125); z scales with x (crop width / frame width)
+    assert landmarks_3d[0] == pytest.approx((0.5, 0.625, 0.05))
+    # 2D landmarks are in pixels of the output shape (the half-size working frame)
+    assert landmarks_2d[0].tolist() == [100, 62]
+
+
+def test_large_crops_are_downscaled_before_detection():
+    image = np.zeros((400, 800, 3), np.uint8)
+    face_mesh = _CropFaceMesh((0.5, 0.5, 0.0))
+    _, landmarks_3d = detect_face_landmarks_in_roi(image, (0.0, 0.0, 0.5, 1.0), image.shape, max_size=100,
+                                                   face_mesh=face_mesh)
+    assert face_mesh.shape == (100, 100, 3)
+    assert landmarks_3d[0] == pytest.approx((0.25, 0.5, 0.0))
@@ -0,0 +1,81 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from api.services import face_validation, yolo_service
+from api.services.face_validation import enhance_face_detection, validate_face
+from benchmarks import stub_models
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def stub_detectors(monkeypatch):
+    stub_models.install()
+    # Models loaded here must not leak into other tests
+    monkeypatch.setattr(face_validation, "face_detector_pool",
+                        face_validation.GraphPool(face_validation.create_face_detector, 1))
+    monkeypatch.setattr(yolo_service, "yolo_model", None)
+    yield
+    yolo_service.yolo_batcher.shutdown()
+
+
+def _frame():
+    return np.zeros((480, 640, 3), np.uint8)
+
+
+def test_mediapipe_backend_returns_the_face_box(stub_detectors):
+    result = validate_face(_frame(), backend="mediapipe")
+    assert result.backend == "mediapipe"
+    assert result.face_region() == [172, 86, 467, 403]
+    assert result.face_score() == pytest.approx(0.94)
+    assert result.objects == result.faces
+
+
+def test_yolo_backend_returns_the_best_person_box(stub_detectors):
+    result = validate_face(_frame(), backend="yolo")
+    assert result.backend == "yolo"
+    assert [face["class_name"] for face in result.faces] == ["person", "person"]
+    assert result.face_region() == [120, 40, 520, 470]
+    assert len(result.objects) == 5
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown face validation backend"):
+        validate_face(_frame(), backend="haar")
+
+
+def test_enhanced_detection_combines_landmarks_and_validation():
+    landmarks = np.zeros((478, 2), np.int32)
+    face = {"bbox": [1, 2, 3, 4], "confidence": 0.9, "class_name": "face"}
+    both = enhance_face_detection(landmarks, face_validation.FaceValidationResult("mediapipe", [face]))
+    assert both["confidence"] == "high" and both["validation_face_bbox"] == [1, 2, 3, 4]
+    assert enhance_face_detection(None, face_validation.FaceValidationResult("yolo", [face]))["confidence"] == "medium"
+    assert enhance_face_detection(None, face_validation.FaceValidationResult("yolo", []))["confidence"] == "low"
+
+
+def _registered_models(backend):
+    """Models registered for startup when the app is imported with TRYON_FACE_VALIDATION=backend"""
+    script = (
+        "import json; from benchmarks import stub_models; stub_models.install(); "
+        "import api.services.face_validation; "
+        "from api.services.model_registry import model_registry; "
+        "print(json.dumps(model_registry.stats()['models']))"
+    )
+    env = dict(os.environ, TRYON_FACE_VALIDATION=backend)
+    output = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True, timeout=60).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_only_the_selected_backend_is_loaded_at_startup():
+    assert set(_registered_models("mediapipe")) == {"face_detector"}
+    assert set(_registered_models("yolo")) == {"yolo"}
+
+
+def test_unknown_backend_setting_is_reported_as_a_model_error():
+    assert set(_registered_models("haar")) == {"face_validation"}
@@ -0,0 +1,42 @@
+import asyncio
+
+from api.utils.frame_slot import LatestFrameSlot
+
+
+def test_put_replaces_waiting_frame():
+    async def scenario():
+        slot = LatestFrameSlot()
+        assert slot.put("frame-1") is None
+        assert slot.put("frame-2") == "frame-1"
+        assert await slot.get() == "frame-2"
+        assert slot.put("frame-3") is None
+
+    asyncio.run(scenario())
+
+
+def test_get_waits_for_put():
+    async def scenario():
+        slot = LatestFrameSlot()
+        waiter = asyncio.create_task(slot.get())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        slot.put("frame")
+        assert await asyncio.wait_for(waiter, 1) == "frame"
+
+    asyncio.run(scenario())
+
+
+def test_close_drops_frame_and_wakes_waiter():
+    async def scenario():
+        slot = LatestFrameSlot()
+        slot.put("frame")
+        assert slot.close() == "frame"
+        assert await slot.get() is None
+
+        slot = LatestFrameSlot()
+        waiter = asyncio.create_task(slot.get())
+        await asyncio.sleep(0)
+        assert slot.close() is None
+        assert await asyncio.wait_for(waiter, 1) is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,136 @@
+import threading
+
+import numpy as np
+import pytest
+
+from api.services.graph_pool import GraphPool
+from api.services.mediapipe_service import FaceMeshManager
+from benchmarks import stub_models
+
+
+class _Factory:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.created = 0
+
+    def __call__(self):
+        if self.fail:
+            raise RuntimeError("no graph")
+        self.created += 1
+        return f"graph-{self.created}"
+
+
+@pytest.fixture
+def stub_mediapipe():
+    stub_models.install()
+
+
+def test_borrow_reuses_idle_graphs():
+    factory = _Factory()
+    pool = GraphPool(factory, 2)
+    with pool.borrow() as first:
+        assert pool.stats() == {"pool_size": 2, "created": 1, "in_use": 1}
+    with pool.borrow() as again:
+        assert again == first
+    assert factory.created == 1
+    assert pool.stats()["in_use"] == 0
+
+
+def test_borrow_blocks_until_a_graph_is_returned():
+    pool = GraphPool(_Factory(), 1)
+    with pool.borrow() as graph:
+        with pytest.raises(TimeoutError):
+            with pool.borrow(timeout=0.05):
+                pass
+
+        borrowed = []
+
+        def wait_for_graph():
+            with pool.borrow(timeout=5) as waited:
+                borrowed.append(waited)
+
+        waiter = threading.Thread(target=wait_for_graph)
+        waiter.start()
+    waiter.join(5)
+    assert borrowed == [graph]
+    assert pool.stats() == {"pool_size": 1, "created": 1, "in_use": 0}
+
+
+def test_failed_factory_releases_its_reservation():
+    factory = _Factory(fail=True)
+    pool = GraphPool(factory, 1)
+    with pytest.raises(RuntimeError):
+        with pool.borrow():
+            pass
+    assert pool.stats() == {"pool_size": 1, "created": 0, "in_use": 0}
+
+    factory.fail = False
+    with pool.borrow() as graph:
+        assert graph == "graph-1"
+
+
+def test_preload_creates_up_to_the_pool_size():
+    factory = _Factory()
+    pool = GraphPool(factory, 3)
+    pool.preload(2)
+    assert pool.stats()["created"] == 2
+    pool.preload(10)
+    assert factory.created == 3
+
+    seen = []
+    pool.for_each_idle(seen.append)
+    assert sorted(seen) == ["graph-1", "graph-2", "graph-3"]
+
+
+def test_sessions_are_capped_and_released(stub_mediapipe):
+    manager = FaceMeshManager(static_pool_size=1, max_sessions=2)
+    first = manager.open_session()
+    second = manager.open_session()
+    assert first is not second
+    with pytest.raises(RuntimeError, match="session limit"):
+        manager.open_session()
+
+    manager.close_session(first)
+    third = manager.open_session()
+    assert manager.stats()["active_sessions"] == 2
+    manager.close_session(second)
+    manager.close_session(third)
+    assert manager.stats()["active_sessions"] == 0
+
+
+def test_session_reservation_counts_while_the_graph_is_built(stub_mediapipe, monkeypatch):
+    manager = FaceMeshManager(max_sessions=1)
+    building = threading.Event()
+    release = threading.Event()
+    real_init = stub_models.StubFaceMesh.__init__
+
+    def slow_init(self, **kwargs):
+        building.set()
+        release.wait(5)
+        real_init(self, **kwargs)
+
+    monkeypatch.setattr(stub_models.StubFaceMesh, "__init__", slow_init)
+    opened = []
+    opener = threading.Thread(target=lambda: opened.append(manager.open_session()))
+    opener.start()
+    assert building.wait(5)
+    # The slot is taken before the graph exists, so a second session cannot race past the cap
+    assert manager.stats()["active_sessions"] == 1
+    with pytest.raises(RuntimeError, match="session limit"):
+        manager.open_session()
+    release.set()
+    opener.join(5)
+    assert len(opened) == 1
+    manager.close_session(opened[0])
+
+
+def test_preload_and_warm_up_the_static_pool(stub_mediapipe):
+    manager = FaceMeshManager(static_pool_size=2)
+    manager.preload()
+    assert manager.stats()["static_created"] == 2
+    manager.warm_up(np.zeros((48, 64, 3), np.uint8))
+
+    with manager.static_face_mesh() as face_mesh:
+        assert face_mesh.process(None).multi_face_landmarks
+        assert manager.stats()["static_in_use"] == 1
+    assert manager.stats()["static_created"] == 2
@@ -0,0 +1,69 @@
+import struct
+
+import cv2
+import numpy as np
+
+from api.utils.image_decode import DecodedFrame, decode_image, jpeg_dimensions, reduced_decode_factor
+
+
+def _jpeg(width, height):
+    image = np.zeros((height, width, 3), np.uint8)
+    image[:, : width // 2] = 255
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+def _with_exif_orientation(jpeg, orientation):
+    """Insert an APP1 Exif segment holding only the orientation tag after SOI"""
+    tiff = b"MM\x00*" + struct.pack(">I", 8) + struct.pack(">H", 1)
+    tiff += struct.pack(">HHIHH", 0x0112, 3, 1, orientation, 0) + struct.pack(">I", 0)
+    body = b"Exif\x00\x00" + tiff
+    return jpeg[:2] + b"\xff\xe1" + struct.pack(">H", len(body) + 2) + body + jpeg[2:]
+
+
+def test_jpeg_dimensions_reads_sof_header():
+    assert jpeg_dimensions(_jpeg(64, 48)) == (64, 48)
+    # Other segments before the SOF are skipped
+    assert jpeg_dimensions(_with_exif_orientation(_jpeg(64, 48), 1)) == (64, 48)
+
+
+def test_jpeg_dimensions_rejects_other_data():
+    png = cv2.imencode(".png", np.zeros((4, 4, 3), np.uint8))[1].tobytes()
+    assert jpeg_dimensions(png) is None
+    assert jpeg_dimensions(b"") is None
+    # Truncated before the SOF segment
+    assert jpeg_dimensions(_jpeg(64, 48)[:4]) is None
+
+
+def test_reduced_decode_factor():
+    assert reduced_decode_factor(1280, 720, 256) == 4
+    assert reduced_decode_factor(1280, 720, 160) == 8
+    assert reduced_decode_factor(1280, 720, 640) == 2
+    assert reduced_decode_factor(640, 480, 640) == 1
+    # libjpeg rounds scaled sizes up: ceil(1270 / 8) = 159
+    assert reduced_decode_factor(1270, 720, 159) == 8
+
+
+def test_reduced_decode_keeps_original_size():
+    image, original_size = decode_image(_jpeg(1280, 720), min_side=256)
+    assert original_size == (1280, 720)
+    assert image.shape[:2] == (180, 320)
+
+
+def test_exif_rotation_swaps_header_dimensions():
+    data = _with_exif_orientation(_jpeg(80, 40), 6)
+    image, original_size = decode_image(data, min_side=40)
+    # OpenCV applies the orientation while decoding (here at half size), so the
+    # header's landscape size is swapped to match the portrait image
+    assert image.shape[:2] == (40, 20)
+    assert original_size == (40, 80)
+
+
+def test_decoded_frame_passes_through():
+    image = np.zeros((10, 20, 3), np.uint8)
+    decoded, original_size = decode_image(DecodedFrame(image, (40, 20)))
+    assert decoded is image
+    assert original_size == (40, 20)
+
+
+def test_undecodable_data():
+    assert decode_image(b"not an image") == (None, None)
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+import pytest
+
+from api.services.inference_executor import InferenceExecutor, InferenceQueueFull
+
+
+def test_unknown_kind_is_rejected():
+    with pytest.raises(ValueError):
+        InferenceExecutor(kind="fibers")
+
+
+def test_runs_jobs_and_raises_their_errors():
+    executor = InferenceExecutor(kind="thread", max_workers=2, max_queue=0)
+
+    async def scenario():
+        assert await executor.run(pow, 2, 10) == 1024
+        with pytest.raises(ValueError):
+            await executor.run(int, "not a number")
+
+    try:
+        asyncio.run(scenario())
+        stats = executor.stats()
+        assert stats["pending"] == 0
+        assert stats["completed"] == 2
+    finally:
+        executor.shutdown()
+
+
+def test_jobs_beyond_capacity_are_rejected():
+    executor = InferenceExecutor(kind="thread", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        # One job running and one queued fill the capacity
+        busy = [asyncio.ensure_future(executor.run(release.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert executor.stats()["pending"] == 2
+        with pytest.raises(InferenceQueueFull):
+            await executor.run(pow, 2, 2)
+        release.set()
+        assert await asyncio.gather(*busy) == [True, True]
+        # Capacity frees up once the jobs finish
+        assert await executor.run(pow, 2, 2) == 4
+
+    try:
+        asyncio.run(scenario())
+        stats = executor.stats()
+        assert stats["rejected"] == 1
+        assert stats["pending"] == 0
+        assert stats["completed"] == 3
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_prepare_frame_passes_data_through_without_workers():
+    executor = InferenceExecutor(kind="thread", max_workers=1)
+    assert asyncio.run(executor.prepare_frame(b"jpeg bytes")) == b"jpeg bytes"
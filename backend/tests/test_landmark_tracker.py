@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from api.services.landmark_tracker import LandmarkTracker, TRACKED_INDICES
+
+WIDTH, HEIGHT = 320, 240
+
+
+class _FakeFaceMesh:
+    """Stands in for a MediaPipe FaceMesh: the same 478 normalized landmarks for every frame"""
+
+    def __init__(self, landmarks_3d=None):
+        self.landmarks_3d = landmarks_3d
+        self.calls = 0
+
+    def process(self, rgb):
+        self.calls += 1
+        if self.landmarks_3d is None:
+            return SimpleNamespace(multi_face_landmarks=None)
+        points = [SimpleNamespace(x=x, y=y, z=z) for x, y, z in self.landmarks_3d]
+        return SimpleNamespace(multi_face_landmarks=[SimpleNamespace(landmark=points)])
+
+
+def _textured_frame(seed):
+    rng = np.random.default_rng(seed)
+    noise = rng.integers(0, 256, (HEIGHT, WIDTH), dtype=np.uint8)
+    return cv2.cvtColor(cv2.GaussianBlur(noise, (7, 7), 2), cv2.COLOR_GRAY2BGR)
+
+
+def _landmarks():
+    rng = np.random.default_rng(0)
+    landmarks = np.zeros((478, 3), np.float32)
+    landmarks[:, 0] = rng.uniform(0.3, 0.7, 478)
+    landmarks[:, 1] = rng.uniform(0.3, 0.7, 478)
+    return landmarks
+
+
+def test_shifted_frame_is_tracked_without_detection():
+    face_mesh = _FakeFaceMesh(_landmarks())
+    tracker = LandmarkTracker(face_mesh, enabled=True, max_interval=8, motion_threshold=0.5, max_fb_error=1.0)
+    frame = _textured_frame(1)
+
+    landmarks_2d, _, keyframe = tracker.process(frame)
+    assert keyframe is True
+    landmarks_2d = np.asarray(landmarks_2d)
+    shifted = np.roll(frame, (2, 3), axis=(0, 1))
+    tracked_2d, tracked_3d, keyframe = tracker.process(shifted)
+    tracked_2d, tracked_3d = np.asarray(tracked_2d), np.asarray(tracked_3d)
+
+    assert keyframe is False
+    assert face_mesh.calls == 1
+    assert (tracker.keyframes, tracker.tracked_frames) == (1, 1)
+    motion = tracked_2d[TRACKED_INDICES] - landmarks_2d[TRACKED_INDICES]
+    assert np.abs(np.median(motion, axis=0) - (3, 2)).max() <= 1
+    np.testing.assert_allclose(tracked_3d[TRACKED_INDICES, 0] * WIDTH, tracked_2d[TRACKED_INDICES, 0], atol=1)
+
+
+def test_forward_backward_failure_forces_keyframe():
+    face_mesh = _FakeFaceMesh(_landmarks())
+    tracker = LandmarkTracker(face_mesh, enabled=True, max_interval=8, motion_threshold=0.5, max_fb_error=1.0)
+    tracker.process(_textured_frame(1))
+
+    # An unrelated frame: flow finds no consistent match and the tracker re-detects on it
+    _, _, keyframe = tracker.process(_textured_frame(2))
+
+    assert keyframe is True
+    assert face_mesh.calls == 2
+    assert (tracker.keyframes, tracker.tracked_frames) == (2, 0)
+    assert tracker.interval == 1
+
+
+def test_disabled_tracker_detects_every_frame():
+    face_mesh = _FakeFaceMesh(_landmarks())
+    tracker = LandmarkTracker(face_mesh, enabled=False, max_interval=8, motion_threshold=0.5, max_fb_error=1.0)
+    frame = _textured_frame(1)
+
+    assert all(tracker.process(frame)[2] for _ in range(3))
+    assert face_mesh.calls == 3
+
+
+def test_no_face_keeps_detecting():
+    face_mesh = _FakeFaceMesh(None)
+    tracker = LandmarkTracker(face_mesh, enabled=True, max_interval=8, motion_threshold=0.5, max_fb_error=1.0)
+    frame = _textured_frame(1)
+
+    assert tracker.process(frame) == (None, None, True)
+    assert tracker.process(frame) == (None, None, True)
+    assert face_mesh.calls == 2
@@ -0,0 +1,90 @@
+import pytest
+
+from api.services.metrics import Counter, Gauge, Histogram, MetricsRegistry, StageTimer
+
+
+def _registry():
+    registry = MetricsRegistry()
+    requests = registry.register(Counter("requests_total", "Requests handled", ("tier", "status")))
+    latency = registry.register(Histogram("latency_seconds", "Latency", ("tier",), buckets=(0.1, 1.0)))
+    sessions = registry.register(Gauge("sessions", "Open sessions"))
+    return registry, requests, latency, sessions
+
+
+def test_render_text_format():
+    registry, requests, latency, sessions = _registry()
+    requests.inc(tier="realtime", status="ok")
+    requests.inc(2, tier="basic", status="error")
+    latency.observe(0.05, tier="basic")
+    latency.observe(0.5, tier="basic")
+    latency.observe(3.0, tier="basic")
+    sessions.set(4)
+
+    assert registry.render() == "\n".join([
+        "# HELP requests_total Requests handled",
+        "# TYPE requests_total counter",
+        'requests_total{tier="basic",status="error"} 2',
+        'requests_total{tier="realtime",status="ok"} 1',
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{tier="basic",le="0.1"} 1',
+        'latency_seconds_bucket{tier="basic",le="1.0"} 2',
+        'latency_seconds_bucket{tier="basic",le="+Inf"} 3',
+        'latency_seconds_sum{tier="basic"} 3.55',
+        'latency_seconds_count{tier="basic"} 3',
+        "# HELP sessions Open sessions",
+        "# TYPE sessions gauge",
+        "sessions 4",
+    ]) + "\n"
+
+
+def test_label_values_are_escaped():
+    counter = Counter("errors_total", "Errors", ("reason",))
+    counter.inc(reason='bad "frame"\n')
+    assert counter.render().endswith('errors_total{reason="bad \\"frame\\"\\n"} 1')
+
+
+def test_labels_must_match():
+    counter = Counter("requests_total", "Requests handled", ("tier",))
+    with pytest.raises(ValueError):
+        counter.inc(status="ok")
+
+
+def test_callback_counter_is_read_at_render_time():
+    values = {("api",): 1.5}
+    counter = Counter("cpu_seconds_total", "CPU", ("process",), callback=lambda: values)
+    values[("worker",)] = 2.0
+    assert counter.render().splitlines()[2:] == ['cpu_seconds_total{process="api"} 1.5',
+                                                 'cpu_seconds_total{process="worker"} 2.0']
+
+
+def test_drain_and_merge_move_updates_between_registries():
+    child, child_requests, child_latency, child_sessions = _registry()
+    parent, parent_requests, parent_latency, _ = _registry()
+    parent_requests.inc(tier="basic", status="ok")
+    parent_latency.observe(0.05, tier="basic")
+
+    child_requests.inc(3, tier="basic", status="ok")
+    child_latency.observe(0.5, tier="basic")
+    child_sessions.set(9)
+    updates = child.drain()
+    # Gauges are per-process state and are not sent
+    assert set(updates) == {"requests_total", "latency_seconds"}
+    # Draining starts the child's counts again from zero
+    assert child.drain() == {}
+    assert child_requests.value(tier="basic", status="ok") == 0
+
+    parent.merge(updates)
+    assert parent_requests.value(tier="basic", status="ok") == 4
+    assert 'latency_seconds_bucket{tier="basic",le="0.1"} 1' in parent.render()
+    assert 'latency_seconds_bucket{tier="basic",le="1.0"} 2' in parent.render()
+    assert 'latency_seconds_count{tier="basic"} 2' in parent.render()
+
+
+def test_stage_timer_accumulates_repeated_stages():
+    timer = StageTimer()
+    timer.lap("decode")
+    timer.lap("detect")
+    timer.lap("decode")
+    assert set(timer.stages) == {"decode", "detect"}
+    assert all(seconds >= 0 for seconds in timer.stages.values())
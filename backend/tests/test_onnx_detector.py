@@ -0,0 +1,85 @@
+import numpy as np
+
+from api.services.onnx_detector import LETTERBOX_COLOR, OnnxYoloDetector, letterbox, non_max_suppression
+
+
+def _predictions(boxes_cxcywh, scores):
+    """Raw YOLOv8 layout: (4 + classes, anchors)"""
+    return np.concatenate([np.asarray(boxes_cxcywh, np.float32), np.asarray(scores, np.float32)], axis=1).T
+
+
+class _FakeSession:
+    """Returns canned raw predictions in network-input coordinates"""
+
+    def __init__(self, predictions):
+        self.predictions = predictions
+        self.batches = []
+
+    def run(self, output_names, feeds):
+        batch = next(iter(feeds.values()))
+        self.batches.append(batch.shape)
+        return [np.repeat(self.predictions[None], len(batch), axis=0)]
+
+
+def _detector(predictions, input_size=(640, 640), fixed_batch=None):
+    detector = OnnxYoloDetector("unused.onnx")
+    detector.session = _FakeSession(predictions)
+    detector._input_name = "images"
+    detector._input_size = input_size
+    detector._fixed_batch = fixed_batch
+    detector.names = {0: "person", 1: "bicycle"}
+    return detector
+
+
+def test_letterbox_pads_the_short_side():
+    image = np.full((480, 1280, 3), 200, np.uint8)
+    padded, ratio, (left, top) = letterbox(image, (640, 640))
+
+    assert padded.shape == (640, 640, 3)
+    assert ratio == 0.5
+    assert (left, top) == (0, 200)
+    assert (padded[:200] == LETTERBOX_COLOR).all()
+    assert (padded[200:440] == 200).all()
+    assert (padded[440:] == LETTERBOX_COLOR).all()
+
+
+def test_non_max_suppression_filters_and_suppresses():
+    predictions = _predictions(
+        [[100, 100, 50, 50], [102, 101, 50, 50], [100, 100, 50, 50], [300, 300, 20, 20]],
+        [[0.9, 0.0], [0.8, 0.0], [0.0, 0.7], [0.1, 0.0]]
+    )
+    boxes, confidences, class_ids = non_max_suppression(predictions, conf=0.25, iou=0.45)
+
+    # The overlapping person box is suppressed; the same box of another class is kept;
+    # the low-confidence anchor is filtered out
+    assert class_ids.tolist() == [0, 1]
+    np.testing.assert_allclose(confidences, [0.9, 0.7])
+    np.testing.assert_allclose(boxes[0], [75, 75, 125, 125])
+
+    _, _, class_ids = non_max_suppression(predictions, conf=0.25, iou=0.45, classes=[1])
+    assert class_ids.tolist() == [1]
+
+
+def test_non_max_suppression_without_detections():
+    boxes, confidences, class_ids = non_max_suppression(_predictions([[1, 1, 1, 1]], [[0.1, 0.1]]), 0.25, 0.45)
+    assert boxes.shape == (0, 4) and not len(confidences) and not len(class_ids)
+
+
+def test_predict_maps_boxes_back_to_the_image():
+    # 1280x480 letterboxed into 640x640: ratio 0.5, 200 px padding on top
+    predictions = _predictions([[320, 320, 100, 60], [20, 210, 60, 40]], [[0.9, 0.0], [0.0, 0.8]])
+    detector = _detector(predictions)
+    result = detector.predict([np.zeros((480, 1280, 3), np.uint8)])[0]
+
+    assert result.boxes_xyxy.dtype == np.int32
+    assert result.boxes_xyxy.tolist() == [[540, 180, 740, 300], [0, 0, 100, 60]]
+    assert result.class_ids.tolist() == [0, 1]
+    assert detector.session.batches == [(1, 3, 640, 640)]
+
+
+def test_predict_runs_image_by_image_for_fixed_batch_models():
+    detector = _detector(_predictions([[320, 320, 100, 60]], [[0.9, 0.0]]), fixed_batch=1)
+    results = detector.predict([np.zeros((640, 640, 3), np.uint8)] * 3, classes=[1])
+
+    assert detector.session.batches == [(1, 3, 640, 640)] * 3
+    assert all(not len(result.class_ids) for result in results)
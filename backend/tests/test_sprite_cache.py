@@ -0,0 +1,74 @@
+import numpy as np
+
+from api.utils import sprite_cache as module
+from api.utils.alpha_blend import PreparedSprite
+from api.utils.sprite_cache import SpriteCache, quantize_pixels, quantize_roll_degrees, sprite_geometry
+
+
+def _sprite(value):
+    return np.full((2, 2, 4), value, np.uint8)
+
+
+def _accessory():
+    accessory = np.zeros((20, 40, 4), np.uint8)
+    accessory[5:15, 5:35] = 255
+    return accessory
+
+
+def test_lru_eviction():
+    cache = SpriteCache(max_entries=2)
+    sprite_a = cache.get_or_create("a", lambda: _sprite(1))
+    cache.get_or_create("b", lambda: _sprite(2))
+    # Touching "a" makes "b" the least recently used entry
+    assert cache.get_or_create("a", lambda: _sprite(9)) is sprite_a
+    cache.get_or_create("c", lambda: _sprite(3))
+
+    assert cache.get_or_create("a", lambda: _sprite(9)) is sprite_a
+    assert cache.get_or_create("b", lambda: _sprite(9))[0, 0, 0] == 9
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert (stats["hits"], stats["misses"]) == (2, 4)
+
+
+def test_different_source_is_a_miss():
+    cache = SpriteCache(max_entries=4)
+    original = _accessory()
+    reloaded = original.copy()
+    old = cache.get_or_create("key", lambda: _sprite(1), original)
+
+    assert cache.get_or_create("key", lambda: _sprite(2), original) is old
+    new = cache.get_or_create("key", lambda: _sprite(2), reloaded)
+    assert new is not old
+    assert cache.get_or_create("key", lambda: _sprite(3), reloaded) is new
+
+
+def test_quantization():
+    assert quantize_pixels(101, step=4) == 100
+    assert quantize_pixels(1, step=4) == 4
+    assert quantize_roll_degrees(0.05, step=2) == 0.0
+    assert quantize_roll_degrees(np.radians(12.7), step=2) == 12
+    width, height, roll = sprite_geometry(101, 47, 0.05, quantized=False)
+    assert (width, height, roll) == (101, 47, 0.0)
+
+
+def test_get_transformed_sprite_uses_cache():
+    accessory = _accessory()
+    module.sprite_cache.clear()
+    first, width, height = module.get_transformed_sprite(accessory, 81, 41, 0.0, sprite_key="product")
+    second, _, _ = module.get_transformed_sprite(accessory, 81, 41, 0.0, sprite_key="product")
+
+    assert isinstance(first, PreparedSprite)
+    assert second is first
+    assert (first.width, first.height) == (width, height)
+    module.sprite_cache.clear()
+
+
+def test_reloaded_accessory_is_a_miss():
+    accessory = _accessory()
+    reloaded = accessory.copy()
+    module.sprite_cache.clear()
+    first, _, _ = module.get_transformed_sprite(accessory, 81, 41, 0.0, sprite_key="product")
+    second, _, _ = module.get_transformed_sprite(reloaded, 81, 41, 0.0, sprite_key="product")
+
+    assert second is not first
+    module.sprite_cache.clear()
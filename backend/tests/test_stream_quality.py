@@ -0,0 +1,77 @@
+from api.services.stream_quality import (
+    COOLDOWN_FRAMES,
+    QUALITY_STEP,
+    SCALE_STEP,
+    StreamQualityController
+)
+
+
+def _controller(**kwargs):
+    options = dict(target_latency_ms=100, initial_quality=80, min_quality=50,
+                   max_quality=90, min_scale=0.5, enabled=True)
+    options.update(kwargs)
+    return StreamQualityController(**options)
+
+
+def test_degrade_steps_quality_then_cools_down():
+    controller = _controller()
+    assert controller.observe(0.5, encode_time=0.001) is True
+    assert controller.settings() == (80 - QUALITY_STEP, 1.0)
+
+    # Changes wait out the cooldown even while latency stays high
+    for _ in range(COOLDOWN_FRAMES):
+        assert controller.observe(0.5, encode_time=0.001) is False
+    assert controller.settings() == (80 - QUALITY_STEP, 1.0)
+    assert controller.observe(0.5, encode_time=0.001) is True
+    assert controller.settings() == (80 - 2 * QUALITY_STEP, 1.0)
+
+
+def test_encode_bound_degrades_scale_first():
+    controller = _controller()
+    # Encoding takes 50% of the 100 ms target, over the encode budget
+    assert controller.observe(0.5, encode_time=0.05) is True
+    assert controller.settings() == (80, round(1.0 - SCALE_STEP, 2))
+
+
+def test_quality_floor_falls_back_to_scale():
+    controller = _controller(initial_quality=50)
+    controller.observe(0.5)
+    assert controller.settings() == (50, round(1.0 - SCALE_STEP, 2))
+
+
+def test_upgrade_restores_scale_before_quality():
+    controller = _controller(initial_quality=60)
+    controller.scale = 0.8
+    assert controller.observe(0.01) is True
+    assert controller.settings() == (60, 0.9)
+    for _ in range(COOLDOWN_FRAMES):
+        controller.observe(0.01)
+    controller.observe(0.01)
+    assert controller.settings() == (60, 1.0)
+    for _ in range(COOLDOWN_FRAMES):
+        controller.observe(0.01)
+    controller.observe(0.01)
+    assert controller.settings() == (60 + QUALITY_STEP, 1.0)
+
+
+def test_steady_latency_keeps_settings():
+    controller = _controller()
+    for _ in range(10):
+        assert controller.observe(0.1) is False
+    assert controller.settings() == (80, 1.0)
+
+
+def test_client_rtt_counts_as_latency():
+    controller = _controller()
+    controller.observe_rtt(500)
+    controller.observe_rtt("not a number")
+    assert controller.observe(0.01) is True
+    assert controller.settings()[0] == 80 - QUALITY_STEP
+    assert controller.report()["rtt_ms"] == 500.0
+
+
+def test_disabled_controller_never_changes():
+    controller = _controller(enabled=False, initial_quality=95)
+    assert controller.observe(1.0) is False
+    assert controller.settings() == (95, 1.0)
+    assert controller.report()["latency_ms"] == 1000.0
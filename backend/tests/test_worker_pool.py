@@ -0,0 +1,141 @@
+import asyncio
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from api.services import worker_pool as worker_pool_module
+from api.services.worker_pool import WorkerPool
+from api.utils.image_decode import DecodedFrame, decode_image
+from benchmarks import stub_models
+
+
+def _worker_info(landmark_tracker=None):
+    """Runs in a worker: which process it is and which session tracker it was given"""
+    return os.getpid(), id(landmark_tracker)
+
+
+def _frame(value):
+    return DecodedFrame(np.full((8, 12, 3), value, np.uint8), (12, 8))
+
+
+def _wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = WorkerPool(2, slots_per_worker=1, slot_bytes=4096, initializer=stub_models.install)
+    pool.start(timeout=120)
+    yield pool
+    pool.shutdown()
+
+
+def test_frames_travel_through_shared_memory(pool):
+    shared_before = pool.stats()["shared_frames"]
+    image, original_size = asyncio.run(pool.run(decode_image, (_frame(7),), {}))
+
+    assert (image == 7).all() and image.shape == (8, 12, 3)
+    assert original_size == (12, 8)
+    assert pool.stats()["shared_frames"] == shared_before + 1
+
+
+def test_oversized_frames_are_pickled(pool):
+    pickled_before = pool.stats()["pickled_frames"]
+    frame = DecodedFrame(np.full((64, 64, 3), 3, np.uint8), (64, 64))
+    image, _ = asyncio.run(pool.run(decode_image, (frame,), {}))
+
+    assert (image == 3).all()
+    assert pool.stats()["pickled_frames"] == pickled_before + 1
+
+
+def test_errors_are_raised_in_the_caller(pool):
+    with pytest.raises(ValueError):
+        asyncio.run(pool.run(int, ("not a number",), {}))
+
+
+def test_sessions_stick_to_their_worker(pool):
+    async def scenario():
+        first = await pool.run(_worker_info, (), {}, session_id="a")
+        again = await pool.run(_worker_info, (), {}, session_id="a")
+        other = await pool.run(_worker_info, (), {}, session_id="b")
+        return first, again, other
+
+    first, again, other = asyncio.run(scenario())
+    # Same process and same tracker for a session; a new session goes to the worker with fewer sessions
+    assert first == again
+    assert other[0] != first[0]
+    assert pool.stats()["sessions"] == 2
+    pool.close_session("a")
+    pool.close_session("b")
+    assert pool.stats()["sessions"] == 0
+
+
+def test_dead_worker_is_restarted_with_fresh_sessions(pool):
+    async def scenario():
+        pid, _ = await pool.run(_worker_info, (), {}, session_id="a")
+        index = next(i for i, worker in enumerate(pool._workers) if worker["process"].pid == pid)
+        restarts = pool.stats()["restarts"]
+        pool._workers[index]["process"].kill()
+        await asyncio.to_thread(_wait_for, lambda: pool.stats()["restarts"] == restarts + 1)
+
+        # The session's tracker died with the worker; its next frame starts over on a live worker
+        assert pool.stats()["sessions"] == 0
+        new_pid, _ = await pool.run(_worker_info, (), {}, session_id="a")
+        assert new_pid != pid
+        image, _ = await pool.run(decode_image, (_frame(5),), {})
+        assert (image == 5).all()
+        pool.close_session("a")
+
+    asyncio.run(scenario())
+    assert all(worker["alive"] and worker["pending"] == 0 for worker in pool.stats()["per_worker"])
+
+
+def test_worker_killed_during_frame_copy(monkeypatch):
+    copy_started = threading.Event()
+    release_copy = threading.Event()
+    real_copyto = np.copyto
+
+    def blocking_copyto(destination, source):
+        if not copy_started.is_set():
+            copy_started.set()
+            release_copy.wait(30)
+        real_copyto(destination, source)
+
+    monkeypatch.setattr(worker_pool_module.np, "copyto", blocking_copyto)
+    pool = WorkerPool(1, slots_per_worker=1, slot_bytes=4096, initializer=stub_models.install)
+    pool.start(timeout=120)
+
+    async def scenario():
+        stale = asyncio.ensure_future(pool.run(decode_image, (_frame(1),), {}))
+        await asyncio.to_thread(copy_started.wait, 30)
+        pool._workers[0]["process"].kill()
+        await asyncio.to_thread(_wait_for, lambda: pool.stats()["restarts"] == 1)
+
+        # The restarted worker must not hand out the buffer the copy is still writing into
+        assert pool.stats()["per_worker"][0]["free_slots"] == 0
+        image, _ = await pool.run(decode_image, (_frame(2),), {})
+        assert (image == 2).all()
+
+        release_copy.set()
+        with pytest.raises(RuntimeError, match="exited"):
+            await stale
+        # The stale job was not queued on the new worker, and its buffer is free again
+        image, _ = await pool.run(decode_image, (_frame(3),), {})
+        assert (image == 3).all()
+
+    try:
+        asyncio.run(scenario())
+        stats = pool.stats()
+        assert stats["per_worker"][0]["pending"] == 0
+        assert stats["per_worker"][0]["free_slots"] == 1
+        assert stats["shared_frames"] == 2
+        assert stats["pickled_frames"] == 1
+    finally:
+        release_copy.set()
+        pool.shutdown()
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from api.utils import ws_protocol
+
+
+def test_pack_unpack_round_trip():
+    jpeg = b"\xff\xd8jpeg-bytes\xff\xd9"
+    message = ws_protocol.pack_frame(42, "product_4", jpeg, ws_protocol.FLAG_HAT, client_ts=1234)
+
+    assert len(message) == ws_protocol.HEADER_SIZE + len(jpeg)
+    seq, client_ts, product_id, flags, payload = ws_protocol.unpack_frame(message)
+    assert (seq, client_ts, product_id, flags) == (42, 1234, "product_4", ws_protocol.FLAG_HAT)
+    assert bytes(payload) == jpeg
+
+
+def test_pack_accepts_numpy_buffer_and_wraps_counters():
+    jpeg = np.frombuffer(b"\xff\xd8abc", np.uint8)
+    message = ws_protocol.pack_frame(2 ** 32 + 5, "p", jpeg, client_ts=2 ** 32 + 7, dropped=70000)
+
+    version, _, dropped, seq, client_ts, _ = ws_protocol.HEADER.unpack_from(message)
+    assert version == ws_protocol.PROTOCOL_VERSION
+    assert (seq, client_ts, dropped) == (5, 7, 0xFFFF)
+    assert bytes(ws_protocol.unpack_frame(message)[4]) == b"\xff\xd8abc"
+
+
+def test_product_id_is_truncated_to_field():
+    message = ws_protocol.pack_frame(1, "x" * 40, b"")
+    assert ws_protocol.unpack_frame(message)[2] == "x" * ws_protocol.PRODUCT_ID_SIZE
+
+
+def test_patch_frame_carries_region():
+    message = ws_protocol.pack_patch_frame(3, "p", b"jpeg", (10, 20, 30, 40))
+    _, _, _, flags, payload = ws_protocol.unpack_frame(message)
+
+    assert flags & ws_protocol.FLAG_PATCH
+    assert ws_protocol.PATCH_HEADER.unpack_from(payload) == (10, 20, 30, 40)
+    assert bytes(payload[ws_protocol.PATCH_HEADER.size:]) == b"jpeg"
+
+
+def test_empty_patch_frame():
+    _, _, _, _, payload = ws_protocol.unpack_frame(ws_protocol.pack_patch_frame(3, "p", b"jpeg", None))
+    assert bytes(payload) == ws_protocol.PATCH_HEADER.pack(0, 0, 0, 0)
+
+
+def test_unpack_rejects_short_and_foreign_frames():
+    with pytest.raises(ws_protocol.ProtocolError):
+        ws_protocol.unpack_frame(b"\x02\x00")
+    message = bytearray(ws_protocol.pack_frame(1, "p", b""))
+    message[0] = ws_protocol.PROTOCOL_VERSION + 1
+    with pytest.raises(ws_protocol.ProtocolError):
+        ws_protocol.unpack_frame(bytes(message))
+
+
+def test_negotiate_binary():
+    assert ws_protocol.negotiate_binary({"type": "hello"}) is False
+    assert ws_protocol.negotiate_binary(
+        {"type": "hello", "binary": True, "protocol_version": ws_protocol.PROTOCOL_VERSION}
+    ) is True
+    for version in (None, ws_protocol.PROTOCOL_VERSION - 1):
+        with pytest.raises(ws_protocol.ProtocolError):
+            ws_protocol.negotiate_binary({"type": "hello", "binary": True, "protocol_version": version})
@@ -0,0 +1,100 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from api.services.yolo_batcher import YoloBatcher
+
+
+class _Model:
+    """Records the batch sizes it is called with; results are the inputs doubled"""
+
+    def __init__(self, gate=None, fail=False):
+        self.batches = []
+        self.gate = gate
+        self.fail = fail
+
+    def __call__(self, images):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.batches.append(len(images))
+        if self.fail:
+            raise RuntimeError("inference failed")
+        return [image * 2 for image in images]
+
+
+def _run_concurrently(batcher, images):
+    with ThreadPoolExecutor(len(images)) as pool:
+        return list(pool.map(lambda image: batcher.detect(image, timeout=5), images))
+
+
+def test_each_caller_gets_its_own_result():
+    model = _Model()
+    batcher = YoloBatcher(model, max_batch=4, max_wait_ms=50)
+    try:
+        assert _run_concurrently(batcher, list(range(8))) == [image * 2 for image in range(8)]
+        assert sum(model.batches) == 8
+    finally:
+        batcher.shutdown()
+
+
+def test_batches_are_capped_at_max_batch():
+    model = _Model()
+    batcher = YoloBatcher(model, max_batch=3, max_wait_ms=200)
+    try:
+        futures = [batcher.submit(image) for image in range(8)]
+        assert [future.result(5) for future in futures] == [image * 2 for image in range(8)]
+        # Full batches go as soon as they fill; the last one after the wait
+        assert model.batches == [3, 3, 2]
+        assert batcher.stats()["largest_batch"] == 3
+    finally:
+        batcher.shutdown()
+
+
+def test_a_lone_frame_waits_at_most_max_wait():
+    model = _Model()
+    batcher = YoloBatcher(model, max_batch=8, max_wait_ms=20)
+    try:
+        start = time.perf_counter()
+        assert batcher.detect(21, timeout=5) == 42
+        assert time.perf_counter() - start < 1.0
+        assert model.batches == [1]
+    finally:
+        batcher.shutdown()
+
+
+def test_errors_reach_every_caller_in_the_batch():
+    batcher = YoloBatcher(_Model(fail=True), max_batch=4, max_wait_ms=50)
+    try:
+        futures = [batcher.submit(image) for image in range(3)]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="inference failed"):
+                future.result(5)
+        # The batcher thread survives and serves the next frames
+        batcher.infer_batch = _Model()
+        assert batcher.detect(1, timeout=5) == 2
+    finally:
+        batcher.shutdown()
+
+
+def test_wrong_result_count_is_an_error():
+    batcher = YoloBatcher(lambda images: [], max_batch=2, max_wait_ms=0)
+    try:
+        with pytest.raises(RuntimeError, match="0 results for 1 frames"):
+            batcher.detect(1, timeout=5)
+    finally:
+        batcher.shutdown()
+
+
+def test_shutdown_finishes_queued_frames_and_submit_restarts():
+    gate = threading.Event()
+    batcher = YoloBatcher(_Model(gate), max_batch=2, max_wait_ms=0)
+    futures = [batcher.submit(image) for image in range(3)]
+    gate.set()
+    batcher.shutdown()
+    assert [future.result(0) for future in futures] == [0, 2, 4]
+    try:
+        assert batcher.detect(5, timeout=5) == 10
+    finally:
+        batcher.shutdown()
@@ -15,6 +15,8 @@ const ThreeTierTryOn = () => {
   
   const webcamRef = useRef(null);
   const canvasRef = useRef(null);
+  // Stable id for the high-accuracy stream, so /tryon can crop to the last face and adapt its encoding
+  const tryonSessionRef = useRef(null);
 
   // AR System options
   const arSystems = [
@@ -193,6 +195,10 @@ const ThreeTierTryOn = () => {
       formData.append('product_type', selectedProduct.type);
       formData.append('product_id', selectedProduct.id);
       formData.append('show_measurements', showMeasurements);
+      if (!tryonSessionRef.current) {
+        tryonSessionRef.current = window.crypto?.randomUUID?.() || `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+      }
+      formData.append('session_id', tryonSessionRef.current);
       
       console.log('Sending to backend:', { product_type: selectedProduct.type, product_id: selectedProduct.id });
       